@@ -0,0 +1,69 @@
+import pandas as pd
+from sqlalchemy import func
+from sqlmodel import Session, select
+from user_models import Workout, Exercise, ExerciseRollup
+from engines import attached_catalog
+
+# TOTAL() skips NULL products and yields 0.0 for an empty group, which matches
+# both the Python `(weight or 0) * (reps or 0)` sum and pandas' NaN-skipping sum.
+set_volume = func.total(Exercise.weight * Exercise.reps)
+set_count = func.count(Exercise.id)
+rep_total = func.coalesce(func.sum(Exercise.reps), 0)
+
+
+def workout_volume_query():
+    per_workout = (
+        select(
+            Exercise.workout_uuid,
+            set_volume.label("volume"),
+            set_count.label("sets"),
+            rep_total.label("reps"),
+        )
+        .group_by(Exercise.workout_uuid)
+        .subquery()
+    )
+    # Outer join so workouts without any logged sets still show up with 0 volume
+    return select(
+        Workout.date.label("Date"),
+        func.substr(Workout.uuid, 1, 8).label("Workout"),
+        func.coalesce(per_workout.c.volume, 0).label("Volume"),
+        func.coalesce(per_workout.c.sets, 0).label("Sets"),
+        func.coalesce(per_workout.c.reps, 0).label("Reps"),
+    ).outerjoin(per_workout, per_workout.c.workout_uuid == Workout.uuid)
+
+
+# Date-level charts read the trigger-maintained rollup table, so their cost
+# scales with the number of (date, exercise) pairs rather than logged sets.
+def daily_exercise_volume_query():
+    return select(
+        ExerciseRollup.date.label("Date"),
+        ExerciseRollup.exercise_id,
+        attached_catalog.c.name.label("Exercise"),
+        ExerciseRollup.volume.label("Volume"),
+        ExerciseRollup.set_count.label("Sets"),
+        ExerciseRollup.rep_count.label("Reps"),
+    ).outerjoin(attached_catalog, attached_catalog.c.id == ExerciseRollup.exercise_id)
+
+
+def daily_volume_query():
+    return (
+        select(
+            ExerciseRollup.date.label("Date"),
+            func.total(ExerciseRollup.volume).label("Volume"),
+            func.sum(ExerciseRollup.set_count).label("Sets"),
+            func.sum(ExerciseRollup.rep_count).label("Reps"),
+        )
+        .group_by(ExerciseRollup.date)
+    )
+
+
+def get_workout_volume_df(session: Session) -> pd.DataFrame:
+    return pd.read_sql(workout_volume_query(), session.connection())
+
+
+def get_daily_exercise_volume_df(session: Session) -> pd.DataFrame:
+    return pd.read_sql(daily_exercise_volume_query(), session.connection())
+
+
+def get_daily_volume_df(session: Session) -> pd.DataFrame:
+    return pd.read_sql(daily_volume_query(), session.connection())
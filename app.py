@@ -1,13 +1,99 @@
+import json
+import os
+
+import pandas as pd
 import streamlit as st
 
-from logic import UserService, SystemService, get_exercise_df, get_plotly_volume_chart, get_all_exercises_df
+from logic import (UserService, SystemService, get_volume_series_chart,
+                   get_records_table, get_e1rm_progression_chart,
+                   get_muscle_heatmap, MUSCLE_METRICS)
+from migrations import migrate_databases
+from cache import cached, query_cache, search_cache
+from instrumentation import recorder
+from snapshot import refresh_snapshot
+
+# ?debug=1 or LIFT_DEBUG=1 times every statement and render and shows the results in the sidebar
+DEBUG = bool(os.environ.get("LIFT_DEBUG")) or st.query_params.get("debug") == "1"
+if DEBUG:
+    recorder.enable()
+
+migrate_databases()
+
+
+@cached("user", "system")
+def load_log_filter_options():
+    with UserService() as usr_svc:
+        return usr_svc.get_log_filter_options()
+
+
+@cached("user", "system")
+def load_log_page(start, end, exercise_ids, after, limit):
+    with UserService() as usr_svc:
+        return usr_svc.get_log_page(start, end, exercise_ids, after, limit)
+
+
+@cached("user", "system")
+def load_volume_chart(bucket, exercises, top_n, max_points):
+    return get_volume_series_chart(bucket, exercises, top_n, max_points)
+
+
+@cached("user", "system")
+def refresh_log_snapshot():
+    # Only re-run after a write, and then only changed months are rewritten
+    return refresh_snapshot()
+
+
+@cached()
+def load_snapshot_volume_chart(generation, bucket, exercises, top_n, max_points):
+    return get_volume_series_chart(bucket, exercises, top_n, max_points, use_snapshot=True)
+
+
+@cached("user", "system")
+def load_muscle_heatmap(metric, weeks):
+    return get_muscle_heatmap(metric, weeks)
+
+
+@cached("user", "system")
+def load_records_table():
+    return get_records_table()
+
+
+@cached("user", "system")
+def load_record_details(exercise_id, name):
+    with UserService() as usr_svc:
+        rep_records = usr_svc.get_rep_records_df(exercise_id)
+    return rep_records, get_e1rm_progression_chart(exercise_id, name)
+
+
+@cached("system")
+def load_exercise_name_map():
+    with SystemService() as sys_svc:
+        return sys_svc.get_exercise_name_map()
+
+
+@cached("system", cache=search_cache)
+def search_exercise_names(query, among=None):
+    with SystemService() as sys_svc:
+        return [result.name for result in sys_svc.search_exercises(query, among=among)]
+
+
+def exercise_picker(label, key, placeholder="Choose options", among=None):
+    # Only the search hits (plus what is already selected) go to the browser, not the whole catalog;
+    # `among` (a tuple of catalog ids) limits the hits to those exercises
+    query = st.text_input("Search exercises", key=f"{key}_query", placeholder="Name, equipment or muscle group")
+    selected = st.session_state.get(key, [])
+    options = list(dict.fromkeys([*selected, *search_exercise_names(query, among)]))
+    return st.multiselect(label, options=options, key=key, placeholder=placeholder)
+
+
+LOG_PAGE_SIZE = 100
 
 st.title("🏋️ Tidy Workout Tracker")
 
 tab1, tab2, tab3 = st.tabs(["Edit", "View", "Analyze"])
 
-with tab1:
-    with UserService() as usr_svc, SystemService() as sys_svc:
+with tab1, recorder.span("Edit"):
+    with UserService() as usr_svc:
         workouts = usr_svc.get_all_workouts()
 
         if not workouts:
@@ -17,33 +103,108 @@ with tab1:
             selected_uuid = st.selectbox("Select a workout", dropdown_options)
 
             lookup_uuid = usr_svc.get_workout_uuid_map()[selected_uuid]
-            exercises = usr_svc.get_exercises_for_workout(lookup_uuid)
+            df = usr_svc.get_workout_exercise_df(lookup_uuid, load_exercise_name_map())
 
-            if exercises:
-                name_map = sys_svc.get_exercise_name_map()
-                df = get_exercise_df(exercises, name_map)
+            if not df.empty:
                 st.dataframe(df)
             else:
                 st.warning("No exercises logged for this workout.")
 
-with tab2:
-    all_exercises_df = get_all_exercises_df()
+with tab2, recorder.span("View"):
+    first_date, last_date, logged_exercises = load_log_filter_options()
 
-    selected_dates = st.multiselect("Filter by Date",
-                                    options=sorted(all_exercises_df["Date"].unique()))
-    selected_exercises = st.multiselect("Filter by Exercise",
-                                        options= sorted(all_exercises_df["Exercise"].unique()))
+    if first_date is None:
+        st.info("No exercises logged yet.")
+    else:
+        date_range = st.date_input("Filter by Date", value=(first_date, last_date),
+                                   min_value=first_date, max_value=last_date)
+        # Only exercises that appear in the log can narrow it
+        selected_exercises = exercise_picker("Filter by Exercise", "log_exercises",
+                                             among=tuple(sorted(logged_exercises.values())))
 
-    filtered_df = all_exercises_df
+        start_date = date_range[0] if len(date_range) > 0 else None
+        end_date = date_range[1] if len(date_range) > 1 else None
+        exercise_ids = tuple(logged_exercises[name] for name in selected_exercises if name in logged_exercises)
 
-    if selected_dates:
-        filtered_df = filtered_df[filtered_df["Date"].isin(selected_dates)]
+        # Page cursors for the current filters; changing a filter starts over at page one
+        filters = (start_date, end_date, exercise_ids)
+        if st.session_state.get("log_filters") != filters:
+            st.session_state.log_filters = filters
+            st.session_state.log_cursors = [None]
 
-    if selected_exercises:
-        filtered_df = filtered_df[filtered_df["Exercise"].isin(selected_exercises)]
+        cursors = st.session_state.log_cursors
+        page_df, next_cursor = load_log_page(start_date, end_date, exercise_ids, cursors[-1], LOG_PAGE_SIZE)
+        st.dataframe(page_df, hide_index=True)
 
-    st.dataframe(filtered_df)
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        page_col.caption(f"Page {len(cursors)}")
+        if prev_col.button("Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+        if next_col.button("Next", disabled=next_cursor is None):
+            cursors.append(next_cursor)
+            st.rerun()
 
-with tab3:
-    plotly_chart = get_plotly_volume_chart()
+with tab3, recorder.span("Analyze"):
+    bucket_col, points_col = st.columns(2)
+    bucket = bucket_col.radio("Bucket", ["day", "week", "month"], index=1, horizontal=True,
+                              format_func=str.title)
+    max_points = points_col.slider("Points per exercise", 50, 1000, 300, step=50)
+    chart_exercises = tuple(exercise_picker("Exercises", "chart_exercises", placeholder="Top exercises by volume"))
+    top_n = None if chart_exercises else st.slider("Top exercises", 1, 20, 8)
+
+    if st.toggle("Read from Parquet snapshot", help="Loads only the needed columns from a memory-mapped "
+                 "columnar copy of the log instead of querying SQLite"):
+        manifest = refresh_log_snapshot()
+        plotly_chart = load_snapshot_volume_chart(manifest["generation"], bucket, chart_exercises, top_n, max_points)
+    else:
+        plotly_chart = load_volume_chart(bucket, chart_exercises, top_n, max_points)
     st.plotly_chart(plotly_chart, use_container_width=True)
+
+    st.subheader("Muscle groups")
+    metric_col, weeks_col = st.columns(2)
+    muscle_metric = metric_col.radio("Load", MUSCLE_METRICS, horizontal=True)
+    muscle_weeks = weeks_col.slider("Weeks", 4, 260, 52, step=4)
+    st.plotly_chart(load_muscle_heatmap(muscle_metric, muscle_weeks), use_container_width=True)
+
+    st.subheader("Personal records")
+    records_table = load_records_table()
+    if records_table.empty:
+        st.info("No weighted sets logged yet.")
+    else:
+        st.dataframe(records_table, hide_index=True)
+
+        name_to_id = {name: exercise_id for exercise_id, name in load_exercise_name_map().items()}
+        record_exercise = st.selectbox("Rep records for", records_table["Exercise"].dropna())
+        if record_exercise in name_to_id:
+            rep_records, progression_chart = load_record_details(name_to_id[record_exercise], record_exercise)
+            st.dataframe(rep_records, hide_index=True)
+            st.plotly_chart(progression_chart, use_container_width=True)
+
+with st.sidebar.expander("Query cache"):
+    stats = query_cache.stats()
+    st.caption(f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+               f"{stats['entries']} entries, {stats['evictions']} evicted")
+
+if DEBUG:
+    with st.sidebar.expander("Instrumentation", expanded=True):
+        snapshot = recorder.snapshot()
+        for finding in snapshot["n_plus_one"]:
+            st.warning(f"Possible N+1 in {finding['span']}: {finding['count']} identical statements "
+                       f"from {', '.join(finding['sites'])}\n\n`{' '.join(finding['sql'].split())[:200]}`")
+
+        st.caption("Renders (ms)")
+        st.dataframe(pd.DataFrame([
+            {"Tab": name, "Runs": r["count"], "Mean": r["mean_ms"], "p95": r["p95_ms"], "Max": r["max_ms"]}
+            for name, r in snapshot["renders"].items()
+        ]), hide_index=True)
+
+        st.caption("Statements by total time (ms)")
+        st.dataframe(pd.DataFrame([
+            {"DB": q["db"], "Calls": q["count"], "Total": q["total_ms"] + q["fetch_ms"], "p95": q["p95_ms"],
+             "Rows": q["rows"], "Statement": " ".join(q["sql"].split()), "Site": next(iter(q["sites"]), "")}
+            for q in snapshot["queries"]
+        ]), hide_index=True)
+
+        st.download_button("Download JSON", json.dumps(snapshot, indent=2),
+                           file_name="instrumentation.json", mime="application/json")
@@ -0,0 +1,283 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+import cache
+import catalog
+import db
+import engines
+import logic
+from bulk_import import bulk_import_user_log, bulk_seed_system_db
+from migrations import migrate_databases
+from seed import seed_user_db
+from sync import sync_user_log
+from synthetic import write_log_csv
+
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = "bench_results"
+CONFIG_DIR = os.path.abspath("config")
+
+
+def measure(fn, repeat: int = 5, setup=None) -> dict:
+    """Wall-clock timings over `repeat` runs, then one extra run under tracemalloc for peak memory.
+
+    `setup` runs untimed before every call and its return value is passed to `fn`.
+    tracemalloc only sees Python allocations, so SQLite's own page cache is not counted.
+    """
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        started = time.perf_counter()
+        fn(arg) if setup else fn()
+        timings.append(time.perf_counter() - started)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        fn(arg) if setup else fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "max_s": max(timings),
+        "peak_mb": peak / 1024 / 1024,
+    }
+
+
+class Workspace:
+    """Fresh database directories under one temp root; the app's relative DB paths resolve inside them."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._count = 0
+
+    def fresh(self, name: str) -> str:
+        self._count += 1
+        path = os.path.join(self.root, f"{self._count:03d}-{name}")
+        shutil.copytree(CONFIG_DIR, os.path.join(path, "config"))
+        self.enter(path)
+        return path
+
+    def enter(self, path: str):
+        # Engines, pools and caches hold connections to (and results from) whichever
+        # directory was current before
+        engines.dispose_all()
+        db.user_pool.close_all()
+        db.system_pool.close_all()
+        cache.reset_all()
+        catalog.reset()
+        os.chdir(path)
+
+
+def _orm_database(workspace: Workspace) -> str:
+    path = workspace.fresh("orm")
+    migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    return path
+
+
+def _legacy_database(workspace: Workspace) -> str:
+    path = workspace.fresh("legacy")
+    db.create_tables()
+    return path
+
+
+def _legacy_rows(csv_path: str):
+    df = pd.read_csv(csv_path)
+    df = df.astype(object).where(df.notna(), None)
+    return list(df[["date", "exercise", "set_number", "weight", "reps", "duration", "rest", "note"]]
+                .itertuples(index=False, name=None))
+
+
+def bench_writes(workspace: Workspace, csv_path: str, n_sets: int, repeat: int, orm_seed_limit: int) -> dict:
+    results = {}
+
+    def fresh_orm():
+        _orm_database(workspace)
+        return engines.get_user_engine(), engines.get_system_engine()
+
+    results["bulk_import_user_log"] = measure(
+        lambda e: bulk_import_user_log(e[0], e[1], csv_path), repeat=1, setup=fresh_orm)
+
+    results["sync_user_log"] = measure(
+        lambda e: sync_user_log(e[0], e[1], csv_path), repeat=1, setup=fresh_orm)
+    # The engines still point at the database just synced: a re-run over an unchanged CSV
+    results["sync_user_log (unchanged)"] = measure(
+        lambda: sync_user_log(engines.get_user_engine(), engines.get_system_engine(), csv_path), repeat)
+
+    if n_sets <= orm_seed_limit:
+        results["seed_user_db"] = measure(
+            lambda e: seed_user_db(e[0], e[1], csv_path), repeat=1, setup=fresh_orm)
+
+    rows = _legacy_rows(csv_path)
+    results["db.insert_exercises"] = measure(
+        lambda _: db.insert_exercises(rows), repeat=1, setup=lambda: _legacy_database(workspace))
+    return results
+
+
+def bench_orm_reads(workspace: Workspace, csv_path: str, repeat: int) -> dict:
+    _orm_database(workspace)
+    bulk_import_user_log(engines.get_user_engine(), engines.get_system_engine(), csv_path)
+
+    with logic.SystemService() as sys_svc:
+        name_map = sys_svc.get_exercise_name_map()
+    with logic.UserService() as usr_svc:
+        # The biggest workout is the worst case for the Edit tab
+        counts = pd.read_sql("SELECT workout_uuid, COUNT(*) AS n FROM exercises GROUP BY workout_uuid "
+                             "ORDER BY n DESC LIMIT 1", usr_svc.session.connection())
+        workout_uuid = counts["workout_uuid"].iloc[0]
+        exercise_id = usr_svc.session.connection().exec_driver_sql("SELECT exercise_id FROM exercises LIMIT 1").scalar()
+
+    def workout_exercise_df():
+        with logic.UserService() as usr_svc:
+            return usr_svc.get_workout_exercise_df(workout_uuid, name_map)
+
+    def workout_volume_chart():
+        with logic.UserService() as usr_svc:
+            return usr_svc.get_plotly_volume_chart()
+
+    def search(query):
+        with logic.SystemService() as sys_svc:
+            return sys_svc.search_exercises(query)
+
+    def last_performance(_=None):
+        with logic.UserService() as usr_svc:
+            return usr_svc.get_last_performance(exercise_id, sessions=3)
+
+    def muscle_load():
+        with logic.UserService() as usr_svc:
+            return usr_svc.get_muscle_load_df()
+
+    return {
+        "logic.get_all_exercises_df": measure(logic.get_all_exercises_df, repeat),
+        "logic.get_plotly_volume_chart": measure(logic.get_plotly_volume_chart, repeat),
+        "UserService.get_plotly_volume_chart": measure(workout_volume_chart, repeat),
+        "logic.get_volume_series_chart": measure(logic.get_volume_series_chart, repeat),
+        "UserService.get_workout_exercise_df": measure(workout_exercise_df, repeat),
+        "UserService.get_muscle_load_df": measure(muscle_load, repeat),
+        # Cold clears the cache before each call, so it times the index lookup itself
+        "UserService.get_last_performance (cold)": measure(last_performance, repeat,
+                                                           setup=logic._last_performance.clear),
+        "UserService.get_last_performance (warm)": measure(last_performance, repeat),
+        "SystemService.search_exercises": measure(lambda: search("bench"), repeat),
+        "SystemService.search_exercises (typo)": measure(lambda: search("bensh pres"), repeat),
+    }
+
+
+def bench_legacy_reads(workspace: Workspace, csv_path: str, repeat: int) -> dict:
+    _legacy_database(workspace)
+    rows = _legacy_rows(csv_path)
+    db.insert_exercises(rows)
+    busiest_date = pd.Series([row[0] for row in rows]).value_counts().index[0]
+    exercise_name = rows[0][1]
+
+    return {
+        "db.get_exercise_log": measure(db.get_exercise_log, repeat),
+        "db.get_exercises_for_date": measure(lambda: db.get_exercises_for_date(busiest_date), repeat),
+        "db.get_catalog_entry": measure(lambda: db.get_catalog_entry(exercise_name), repeat),
+        "db.get_last_performance (cold)": measure(lambda _: db.get_last_performance(exercise_name, 3), repeat,
+                                                  setup=db._last_performance.clear),
+        "db.get_last_performance (warm)": measure(lambda: db.get_last_performance(exercise_name, 3), repeat),
+        "db.get_catalog_with_muscle_groups": measure(db.get_catalog_with_muscle_groups, repeat),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(scales, repeat: int = 5, orm_seed_limit: int = 100_000, seed: int = 0) -> dict:
+    origin = os.getcwd()
+    report = {
+        "revision": git_revision(),
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="lift-bench-") as root:
+        workspace = Workspace(root)
+        try:
+            for n_sets in scales:
+                csv_path = os.path.join(root, f"log-{n_sets}.csv")
+                write_log_csv(csv_path, n_sets, catalog_yaml=os.path.join(CONFIG_DIR, "default_catalog.yaml"),
+                              seed=seed)
+                results = {}
+                results.update(bench_writes(workspace, csv_path, n_sets, repeat, orm_seed_limit))
+                results.update(bench_orm_reads(workspace, csv_path, repeat))
+                results.update(bench_legacy_reads(workspace, csv_path, repeat))
+                report["scales"][str(n_sets)] = results
+                print_results(n_sets, results)
+        finally:
+            workspace.enter(origin)
+    return report
+
+
+def save(report: dict, results_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = report["started"].replace(":", "").replace("-", "")
+    path = os.path.join(results_dir, f"{stamp}-{report['revision']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def print_results(n_sets: int, results: dict):
+    print(f"\n{n_sets:,} sets")
+    print(f"  {'case':40} {'median':>10} {'min':>10} {'peak MB':>9}")
+    for name, r in results.items():
+        print(f"  {name:40} {r['median_s'] * 1000:>8.1f}ms {r['min_s'] * 1000:>8.1f}ms {r['peak_mb']:>9.1f}")
+
+
+def compare(old: dict, new: dict):
+    print(f"\n{old['revision']} -> {new['revision']} (median time, peak memory)")
+    for scale, results in new["scales"].items():
+        baseline = old["scales"].get(scale, {})
+        print(f"\n{int(scale):,} sets")
+        for name, r in results.items():
+            b = baseline.get(name)
+            if b is None:
+                print(f"  {name:40} {'new':>10}")
+                continue
+            speedup = b["median_s"] / r["median_s"] if r["median_s"] else float("inf")
+            print(f"  {name:40} {b['median_s'] * 1000:>8.1f}ms -> {r['median_s'] * 1000:>8.1f}ms "
+                  f"({speedup:.2f}x)  {b['peak_mb']:>7.1f} -> {r['peak_mb']:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the logic.py and db.py hot paths on synthetic logs")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--orm-seed-limit", type=int, default=100_000,
+                        help="skip the row-at-a-time seed_user_db above this many sets")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print a comparison against a saved run")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    report = run(args.scales, args.repeat, args.orm_seed_limit, args.seed)
+    if not args.no_save:
+        print(f"\nSaved {save(report)}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
@@ -0,0 +1,130 @@
+import time
+import uuid
+import yaml
+import pandas as pd
+from sqlalchemy import insert, select
+from system_models import Equipment, MuscleGroup, ExerciseCatalog, ExerciseMuscleLink
+from user_models import Workout, Exercise, WorkoutSequence
+
+SET_COLUMNS = ["set_number", "weight", "reps", "duration", "rest", "note"]
+
+
+def _records(df: pd.DataFrame):
+    # NaN -> None so SQLite stores NULL; to_dict boxes numpy scalars to Python types
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def bulk_seed_system_db(
+    system_engine,
+    equipment_yaml="config/equipment.yaml",
+    muscle_groups_yaml="config/muscle_groups.yaml",
+    catalog_yaml="config/default_catalog.yaml"
+):
+    with system_engine.begin() as conn:
+        if conn.execute(select(Equipment.id).limit(1)).first() is None:
+            with open(equipment_yaml) as f:
+                equipment_items = yaml.safe_load(f)
+            conn.execute(insert(Equipment), [{
+                "name": item["name"],
+                "default_weight": item.get("default_weight", 0.0),
+                "track_weight": item.get("track_weight", True),
+                "has_resistance_levels": item.get("has_resistance_levels", False),
+            } for item in equipment_items])
+
+        if conn.execute(select(MuscleGroup.id).limit(1)).first() is None:
+            with open(muscle_groups_yaml) as f:
+                muscle_names = yaml.safe_load(f)
+            conn.execute(insert(MuscleGroup), [{"name": name} for name in muscle_names])
+
+        if conn.execute(select(ExerciseCatalog.id).limit(1)).first() is None:
+            with open(catalog_yaml) as f:
+                catalog_entries = yaml.safe_load(f)
+            equipment_ids = dict(conn.execute(select(Equipment.name, Equipment.id)).all())
+            muscle_ids = dict(conn.execute(select(MuscleGroup.name, MuscleGroup.id)).all())
+
+            conn.execute(insert(ExerciseCatalog), [{
+                "name": entry["exercise"],
+                "equipment_id": equipment_ids[entry["equipment"]],
+                "weight": entry.get("weight", 0.0),
+                "measured_by": entry.get("measured_by", "Reps"),
+            } for entry in catalog_entries])
+
+            # One lookup for all generated ids instead of a flush per entry
+            catalog_ids = dict(conn.execute(select(ExerciseCatalog.name, ExerciseCatalog.id)).all())
+            links = [
+                {"exercise_id": catalog_ids[entry["exercise"]], "muscle_group_id": muscle_ids[muscle]}
+                for entry in catalog_entries
+                for muscle in entry.get("muscle_groups", [])
+                if muscle in muscle_ids
+            ]
+            if links:
+                conn.execute(insert(ExerciseMuscleLink), links)
+
+
+def bulk_import_user_log(user_engine, system_engine,
+                         csv_path="exercises_clean.csv", chunksize=50_000) -> dict:
+    with system_engine.connect() as conn:
+        catalog_ids = pd.Series(dict(conn.execute(select(ExerciseCatalog.name, ExerciseCatalog.id)).all()),
+                                dtype="Int64")
+
+    started = time.perf_counter()
+    imported = skipped = 0
+    unknown_names = {}      # exercise name missing from the catalog -> rows skipped
+    workout_uuids = {}      # CSV date string -> workout uuid
+    pairs = []              # (workout uuid, exercise name, exercise_id) of each chunk
+
+    with user_engine.begin() as conn:
+        if conn.execute(select(Workout.uuid).limit(1)).first() is not None:
+            return {"rows": 0, "skipped": 0, "unknown": {}, "seconds": 0.0, "rows_per_sec": 0.0}
+
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            chunk["exercise_id"] = chunk["exercise"].map(catalog_ids)
+            unknown = chunk["exercise_id"].isna()
+            skipped += int(unknown.sum())
+            for name, count in chunk.loc[unknown, "exercise"].value_counts().items():
+                unknown_names[name] = unknown_names.get(name, 0) + int(count)
+            chunk = chunk[~unknown]
+            if chunk.empty:
+                continue
+
+            new_dates = chunk["date"].drop_duplicates()
+            new_dates = new_dates[~new_dates.isin(workout_uuids.keys())]
+            if not new_dates.empty:
+                iso_dates = pd.to_datetime(new_dates, format="%m/%d/%Y").dt.strftime("%Y-%m-%d")
+                workouts = pd.DataFrame({
+                    "uuid": [str(uuid.uuid5(uuid.NAMESPACE_DNS, d)) for d in new_dates],
+                    "date": iso_dates.to_numpy(),
+                })
+                workout_uuids.update(zip(new_dates, workouts["uuid"]))
+                conn.execute(insert(Workout), _records(workouts))
+
+            chunk["workout_uuid"] = chunk["date"].map(workout_uuids)
+
+            pairs.append(chunk[["workout_uuid", "exercise", "exercise_id"]]
+                         .drop_duplicates(["workout_uuid", "exercise_id"]))
+
+            sets = chunk.reindex(columns=["workout_uuid", "exercise_id"] + SET_COLUMNS).assign(seeded=True)
+            conn.execute(insert(Exercise), _records(sets))
+            imported += len(sets)
+
+        if pairs:
+            # Sequence exercises by name within each workout, as seed_user_db does; only
+            # once every chunk is read, since a workout's sets can span chunks
+            pairs = (pd.concat(pairs).drop_duplicates(["workout_uuid", "exercise_id"])
+                     .sort_values(["workout_uuid", "exercise"]))
+            pairs["sequence_number"] = pairs.groupby("workout_uuid").cumcount() + 1
+            conn.execute(insert(WorkoutSequence), _records(pairs[["workout_uuid", "exercise_id", "sequence_number"]]))
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": imported,
+        "skipped": skipped,
+        "unknown": unknown_names,
+        "seconds": seconds,
+        "rows_per_sec": imported / seconds if seconds else 0.0,
+    }
+
+
+def bulk_seed_all(system_engine, user_engine) -> dict:
+    bulk_seed_system_db(system_engine)
+    return bulk_import_user_log(user_engine, system_engine)
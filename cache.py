@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from functools import wraps
+
+# PRAGMA data_version changes whenever *another* connection commits to the
+# database file. Each watcher keeps its own connection that never writes, so
+# every commit from the app, main.py or anything else bumps its token.
+
+_caches = weakref.WeakSet()
+
+
+class DataVersionWatcher:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def token(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Drop the connection; the next token() reopens `path`, e.g. after a chdir."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class DataVersionCache:
+    def __init__(self, watchers, max_entries: int = 64):
+        self.watchers = watchers
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def token(self, dbs) -> tuple:
+        return tuple(self.watchers[db].token() for db in dbs)
+
+    def get_or_compute(self, key, dbs, compute):
+        token = self.token(dbs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (token, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset(self):
+        """Clear, and close the watchers so they reopen their (relative) paths on the next lookup."""
+        self.clear()
+        for watcher in self.watchers.values():
+            watcher.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+query_cache = DataVersionCache({
+    "user": DataVersionWatcher("user_log.db"),
+    "system": DataVersionWatcher("system.db"),
+})
+
+
+# Search-as-you-type makes a new key per keystroke; kept apart so it never
+# evicts the chart and table entries above
+search_cache = DataVersionCache(query_cache.watchers, max_entries=256)
+
+
+def reset_all():
+    """reset() every cache in the process, e.g. after a chdir to another set of databases."""
+    for cache in list(_caches):
+        cache.reset()
+
+
+def cached(*dbs, cache: DataVersionCache = None):
+    """Memoize a query function until one of the named databases is written to."""
+    cache = cache or query_cache
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_compute(key, dbs, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from cache import DataVersionWatcher
+
+# A read-only, process-wide copy of the catalog in system.db. Lookups are plain
+# dict hits; at most every CHECK_INTERVAL the file's inode and cache.py's PRAGMA
+# data_version token are checked, and a change to either triggers a reload.
+
+
+class Equipment:
+    __slots__ = ("id", "name", "default_weight", "track_weight", "has_resistance_levels")
+
+    def __init__(self, id, name, default_weight, track_weight, has_resistance_levels):
+        self.id = id
+        self.name = name
+        self.default_weight = default_weight
+        self.track_weight = bool(track_weight)
+        self.has_resistance_levels = bool(has_resistance_levels)
+
+
+class MuscleGroup:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+
+class CatalogExercise:
+    __slots__ = ("id", "name", "equipment", "weight", "measured_by", "muscle_groups")
+
+    def __init__(self, id, name, equipment: Optional[Equipment], weight, measured_by,
+                 muscle_groups: Tuple[MuscleGroup, ...]):
+        self.id = id
+        self.name = name
+        self.equipment = equipment
+        self.weight = weight
+        self.measured_by = measured_by
+        self.muscle_groups = muscle_groups
+
+
+# Both schemas in use: the SQLModel one (logic.py) and the one db.py creates
+_SCHEMAS = {
+    "name": ("name", "exercise_muscle_link"),
+    "exercise": ("exercise", "exercise_muscle_map"),
+}
+
+
+def detect_schema(conn) -> Optional[Tuple[str, str]]:
+    """(name column, muscle link table) of the catalog in a sqlite3 connection, or None without one."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(exercise_catalog)")}
+    if not columns:
+        return None
+    return _SCHEMAS["name" if "name" in columns else "exercise"]
+
+
+class CatalogSnapshot:
+    def __init__(self, equipment, muscle_groups, exercises):
+        self.equipment_by_id: Mapping[int, Equipment] = MappingProxyType({e.id: e for e in equipment})
+        self.equipment_by_name: Mapping[str, Equipment] = MappingProxyType({e.name: e for e in equipment})
+        self.muscle_groups_by_id: Mapping[int, MuscleGroup] = MappingProxyType({m.id: m for m in muscle_groups})
+        self.muscle_groups_by_name: Mapping[str, MuscleGroup] = MappingProxyType({m.name: m for m in muscle_groups})
+        self.by_id: Mapping[int, CatalogExercise] = MappingProxyType({e.id: e for e in exercises})
+        self.by_name: Mapping[str, CatalogExercise] = MappingProxyType({e.name: e for e in exercises})
+        self.names: Mapping[int, str] = MappingProxyType({e.id: e.name for e in exercises})
+        self.exercise_muscles: Mapping[int, Tuple[str, ...]] = MappingProxyType(
+            {e.id: tuple(m.name for m in e.muscle_groups) for e in exercises})
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogSnapshot":
+        if not os.path.exists(path):
+            return cls((), (), ())
+        conn = sqlite3.connect(path)
+        try:
+            schema = detect_schema(conn)
+            if schema is None:
+                return cls((), (), ())
+            name_col, link_table = schema
+
+            equipment = [Equipment(*row) for row in conn.execute(
+                "SELECT id, name, default_weight, track_weight, has_resistance_levels FROM equipment")]
+            muscle_groups = [MuscleGroup(*row) for row in conn.execute("SELECT id, name FROM muscle_groups")]
+
+            equipment_by_id = {e.id: e for e in equipment}
+            groups_by_id = {m.id: m for m in muscle_groups}
+            exercise_groups: Dict[int, list] = {}
+            for exercise_id, group_id in conn.execute(
+                    f"SELECT exercise_id, muscle_group_id FROM {link_table} ORDER BY exercise_id, muscle_group_id"):
+                if group_id in groups_by_id:
+                    exercise_groups.setdefault(exercise_id, []).append(groups_by_id[group_id])
+
+            exercises = [
+                CatalogExercise(id, name, equipment_by_id.get(equipment_id), weight, measured_by,
+                                tuple(exercise_groups.get(id, ())))
+                for id, name, equipment_id, weight, measured_by in conn.execute(
+                    f"SELECT id, {name_col}, equipment_id, weight, measured_by FROM exercise_catalog ORDER BY id")
+            ]
+        finally:
+            conn.close()
+        return cls(equipment, muscle_groups, exercises)
+
+
+# How long a checked snapshot is served without looking at the file again, so
+# per-row lookups (db.get_catalog_entry in a loop) cost a dict hit and a clock read
+CHECK_INTERVAL = 0.05
+
+_watchers = {}  # absolute path -> (inode, DataVersionWatcher)
+_snapshots = {}  # absolute path -> (version, CatalogSnapshot)
+_checked = {}  # path as given -> (monotonic deadline, CatalogSnapshot)
+_lock = threading.Lock()
+
+
+def _version(path: str) -> Optional[tuple]:
+    # The inode catches a database deleted and recreated under the watcher's open connection
+    try:
+        inode = os.stat(path).st_ino
+    except FileNotFoundError:
+        return None
+    watched = _watchers.get(path)
+    if watched is None or watched[0] != inode:
+        with _lock:
+            watched = _watchers.get(path)
+            if watched is None or watched[0] != inode:
+                if watched is not None:
+                    watched[1].close()
+                watched = _watchers[path] = (inode, DataVersionWatcher(path))
+    return inode, watched[1].token()
+
+
+def get_catalog(path: str) -> CatalogSnapshot:
+    """The catalog in `path`, reloaded only after something has committed to the database."""
+    now = time.monotonic()
+    checked = _checked.get(path)
+    if checked is not None and now < checked[0]:
+        return checked[1]
+
+    abs_path = os.path.abspath(path)
+    version = _version(abs_path)
+    cached = _snapshots.get(abs_path)
+    if cached is None or cached[0] != version:
+        with _lock:
+            cached = _snapshots.get(abs_path)
+            if cached is None or cached[0] != version:
+                cached = _snapshots[abs_path] = (version, CatalogSnapshot.load(abs_path))
+    _checked[path] = (now + CHECK_INTERVAL, cached[1])
+    return cached[1]
+
+
+def reset():
+    """Forget every snapshot and close the watchers, e.g. after a chdir or when a write must be seen at once."""
+    with _lock:
+        for _, watcher in _watchers.values():
+            watcher.close()
+        _watchers.clear()
+        _snapshots.clear()
+        _checked.clear()
@@ -0,0 +1,59 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Read path that skips ORM hydration and SQLAlchemy Row objects: a Core
+# statement is compiled once, run on the raw sqlite3 cursor, and the result
+# tuples are transposed straight into typed numpy/pandas columns.
+
+
+def fetch_columns(conn, stmt) -> List[tuple]:
+    """Run a Core select on `conn` (a SQLAlchemy Connection) and return one tuple per selected column."""
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    params = [compiled.params[name] for name in compiled.positiontup or ()]
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(str(compiled), params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not rows:
+        return [() for _ in stmt.selected_columns]
+    return list(zip(*rows))
+
+
+def int_column(values: Sequence, dtype: str = "int16"):
+    """Small ints; columns with NULLs become the matching nullable pandas dtype."""
+    floats = np.array(values, dtype=np.float64)  # None -> NaN in C, no per-row Python
+    missing = np.isnan(floats)
+    if not missing.any():
+        return floats.astype(dtype)
+    return pd.arrays.IntegerArray(np.where(missing, 0, floats).astype(dtype), missing)
+
+
+def float_column(values: Sequence):
+    return np.array(values, dtype=np.float64)
+
+
+def date_column(values: Sequence):
+    # Dates repeat once per set, so parse each distinct ISO string once
+    return pd.to_datetime(pd.Series(values, dtype=object), format="%Y-%m-%d", cache=True).to_numpy()
+
+
+def name_column(ids: Sequence, name_map: Dict[int, str], unknown: Optional[str] = None) -> pd.Categorical:
+    """Categorical names for catalog ids via an id -> code lookup array, without a dict lookup per row."""
+    ids = np.array(ids, dtype=np.float64)
+    present = ~np.isnan(ids)
+    ids = np.where(present, ids, -1).astype(np.int64)
+
+    categories = sorted(set(name_map.values()) | ({unknown} if unknown is not None else set()))
+    position = {name: i for i, name in enumerate(categories)}
+    size = max(max(name_map, default=0), int(ids.max(initial=0))) + 2
+    unknown_code = position[unknown] if unknown is not None else -1
+    lookup = np.full(size, unknown_code, dtype=np.int32)
+    for exercise_id, name in name_map.items():
+        lookup[exercise_id] = position[name]
+
+    codes = np.where(present, lookup[ids], unknown_code)
+    return pd.Categorical.from_codes(codes, categories=categories)
@@ -1,6 +1,12 @@
-import sqlite3
+import argparse
+
 import pandas as pd
 import yaml
+from cache import DataVersionCache, DataVersionWatcher
+from catalog import get_catalog
+from pool import ConnectionPool
+from search import DEFAULT_K, install_search_index, search
+from write_behind import WriteBehindQueue
 
 COLUMN_LABELS = {
     "date": "Date",
@@ -20,18 +26,45 @@ COLUMN_LABELS = {
     "has_resistance_levels": "Has Resistance Levels"
 }
 
-def get_user_conn():
-    return sqlite3.connect("user_log.db", check_same_thread=False)
+# Log dates are MM/DD/YYYY; this is the sortable form, spelled exactly as ix_exercises_exercise_iso_date indexes it
+ISO_DATE = "(substr(date, 7, 4) || substr(date, 1, 2) || substr(date, 4, 2))"
+
+user_pool = ConnectionPool("user_log.db")
+system_pool = ConnectionPool("system.db")
+
+# Last-performance lookups, dropped by any commit to the log from any connection
+_last_performance = DataVersionCache({"user": DataVersionWatcher(user_pool.path)}, max_entries=256)
+
+# Optional: when enabled, inserts are queued and group-committed by a background thread
+_write_behind = None
 
-def get_system_conn():
-    return sqlite3.connect("system.db", check_same_thread=False)
+def enable_write_behind(max_batch=500, max_latency=0.05):
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindQueue(_insert_rows, max_batch, max_latency, name="db-write-behind")
 
-user_conn = get_user_conn()
-system_conn = get_system_conn()
-user_c = user_conn.cursor()
-system_c = system_conn.cursor()
+def disable_write_behind():
+    global _write_behind
+    if _write_behind is not None:
+        queue, _write_behind = _write_behind, None
+        queue.close()
+
+def flush_writes():
+    """Wait until every queued insert is committed; a no-op unless write-behind is enabled."""
+    if _write_behind is not None:
+        _write_behind.flush()
 
 def create_tables():
+    with user_pool.transaction() as user_c, system_pool.transaction() as system_c:
+        _create_tables(user_c, system_c)
+    initialize_muscle_groups()
+    initialize_equipment()
+    # Before the default catalog, so its triggers index the seeded rows
+    with system_pool.transaction() as system_c:
+        install_search_index(system_c)
+    initialize_default_catalog_if_empty()
+
+def _create_tables(user_c, system_c):
     user_c.execute('''
     CREATE TABLE IF NOT EXISTS exercises (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,6 +79,13 @@ def create_tables():
     )
     ''')
 
+    # user_log.db may already hold the ORM schema (main.py / migrations.py), whose
+    # exercises table has no date or exercise name; leave that database alone
+    if is_legacy_log(user_c):
+        user_c.execute('CREATE INDEX IF NOT EXISTS ix_exercises_date_exercise ON exercises (date, exercise)')
+        user_c.execute(f'CREATE INDEX IF NOT EXISTS ix_exercises_exercise_iso_date ON exercises (exercise, {ISO_DATE}, set_number)')
+        _create_rollup(user_c)
+
     system_c.execute('''
     CREATE TABLE IF NOT EXISTS exercise_catalog (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -74,25 +114,99 @@ def create_tables():
     )
     ''')
 
-    user_conn.commit()  # Commit user-related changes
-    system_conn.commit()  # Commit system-related changes
-    initialize_muscle_groups()
-    initialize_equipment()
-    initialize_default_catalog_if_empty()
+# The legacy log's rollup, per (date, exercise name): named apart from rollups.py's
+# exercise_rollup, which is keyed by catalog id. Triggers keep it current inside
+# the transaction of every write, whichever function or connection makes it.
+ROLLUP_SELECT = '''
+    SELECT date, exercise, TOTAL(weight * reps), COUNT(*), COALESCE(SUM(reps), 0),
+           MAX(weight), COALESCE(SUM(duration), 0)
+    FROM exercises
+'''
 
-def insert_exercise(date, exercise, set_number, total_weight, reps, duration, rest, note=""):
+def _refresh_rollup(date_expr, exercise_expr):
+    return f'''
+        DELETE FROM exercise_name_rollup WHERE date = {date_expr} AND exercise = {exercise_expr};
+        INSERT INTO exercise_name_rollup {ROLLUP_SELECT}
+        WHERE date = {date_expr} AND exercise = {exercise_expr} GROUP BY date, exercise;
+    '''
+
+ROLLUP_TRIGGERS = [
+    '''
+    CREATE TRIGGER IF NOT EXISTS exercise_name_rollup_insert AFTER INSERT ON exercises BEGIN
+        INSERT INTO exercise_name_rollup VALUES (
+            NEW.date, NEW.exercise, COALESCE(NEW.weight * NEW.reps, 0), 1,
+            COALESCE(NEW.reps, 0), NEW.weight, COALESCE(NEW.duration, 0))
+        ON CONFLICT (date, exercise) DO UPDATE SET
+            volume = volume + excluded.volume,
+            set_count = set_count + 1,
+            rep_count = rep_count + excluded.rep_count,
+            top_weight = CASE
+                WHEN top_weight IS NULL OR excluded.top_weight > top_weight THEN excluded.top_weight
+                ELSE top_weight
+            END,
+            total_duration = total_duration + excluded.total_duration;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS exercise_name_rollup_update AFTER UPDATE ON exercises BEGIN
+        {_refresh_rollup("OLD.date", "OLD.exercise")}
+        {_refresh_rollup("NEW.date", "NEW.exercise")}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS exercise_name_rollup_delete AFTER DELETE ON exercises BEGIN
+        {_refresh_rollup("OLD.date", "OLD.exercise")}
+    END
+    ''',
+]
+
+def _create_rollup(user_c):
+    exists = user_c.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'exercise_name_rollup'").fetchone()
     user_c.execute('''
+    CREATE TABLE IF NOT EXISTS exercise_name_rollup (
+        date TEXT NOT NULL,
+        exercise TEXT NOT NULL,
+        volume REAL DEFAULT 0,
+        set_count INTEGER DEFAULT 0,
+        rep_count INTEGER DEFAULT 0,
+        top_weight REAL,
+        total_duration INTEGER DEFAULT 0,
+        PRIMARY KEY (date, exercise)
+    )
+    ''')
+    for ddl in ROLLUP_TRIGGERS:
+        user_c.execute(ddl)
+    if not exists:
+        _rebuild_rollup(user_c)  # a log from before the rollup existed
+
+def _rebuild_rollup(user_c):
+    user_c.execute("DELETE FROM exercise_name_rollup")
+    user_c.execute(f"INSERT INTO exercise_name_rollup {ROLLUP_SELECT} GROUP BY date, exercise")
+
+def rebuild_rollups():
+    """Recompute the legacy log's rollup from its sets."""
+    with user_pool.transaction() as user_c:
+        _rebuild_rollup(user_c)
+
+def is_legacy_log(user_c):
+    """True if user_log.db's exercises table is db.py's (date, exercise name) schema."""
+    columns = {row[1] for row in user_c.execute("PRAGMA table_info(exercises)")}
+    return {"date", "exercise"} <= columns
+
+INSERT_EXERCISE = '''
     INSERT INTO exercises (date, exercise, set_number, weight, reps, duration, rest, note)
     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (date, exercise, set_number, total_weight, reps, duration, rest, note))
-    user_conn.commit()
+'''
 
-def update_exercise_row(row):
-    user_c.execute('''
-        UPDATE exercises 
-        SET date = ?, exercise = ?, set_number = ?, weight = ?, reps = ?, duration = ?, rest = ?, note = ?
-        WHERE id = ?
-    ''', (
+UPDATE_EXERCISE = '''
+    UPDATE exercises 
+    SET date = ?, exercise = ?, set_number = ?, weight = ?, reps = ?, duration = ?, rest = ?, note = ?
+    WHERE id = ?
+'''
+
+def _update_params(row):
+    return (
         str(row["Date"]),
         str(row["Exercise"]),
         int(row["Set"]),
@@ -102,21 +216,67 @@ def update_exercise_row(row):
         None if pd.isna(row.get("Rest")) else int(row["Rest"]),
         str(row["Note"]),
         int(row["id"])
-    ))
-    user_conn.commit()
+    )
+
+def insert_exercises(rows):
+    """Insert many sets in one transaction.
+
+    Each row is a (date, exercise, set_number, total_weight, reps, duration, rest, note) tuple.
+    """
+    rows = [tuple(row) for row in rows]
+    if _write_behind is not None:
+        for row in rows:
+            _write_behind.put(row)
+        return
+    _insert_rows(rows)
+
+def _insert_rows(rows):
+    with user_pool.transaction() as user_c:
+        user_c.executemany(INSERT_EXERCISE, rows)
+
+def apply_log_changes(inserts=(), updates=(), deletes=()):
+    """Apply a whole log diff atomically: either every change is saved or none is.
+
+    `inserts` are tuples as for insert_exercises, `updates` are labelled rows as
+    for update_exercise_row, and `deletes` are exercise ids.
+    """
+    inserts = [tuple(row) for row in inserts]
+    update_params = [_update_params(row) for row in updates]
+    deletes = [int(row_id) for row_id in deletes]
+    flush_writes()  # edits must apply after any inserts still queued
+
+    with user_pool.transaction() as user_c:
+        user_c.executemany(UPDATE_EXERCISE, update_params)
+        user_c.executemany("DELETE FROM exercises WHERE id = ?", [(row_id,) for row_id in deletes])
+        user_c.executemany(INSERT_EXERCISE, inserts)
+
+def insert_exercise(date, exercise, set_number, total_weight, reps, duration, rest, note=""):
+    insert_exercises([(date, exercise, set_number, total_weight, reps, duration, rest, note)])
+
+def update_exercise_row(row):
+    apply_log_changes(updates=[row])
 
 def delete_exercise_row(row_id):
-    user_c.execute("DELETE FROM exercises WHERE id = ?", (row_id,))
-    user_conn.commit()
+    apply_log_changes(deletes=[row_id])
 
 def get_catalog_entry(exercise_name):
-    query = '''
-    SELECT ec.id, ec.exercise, eq.name AS equipment, ec.weight, ec.measured_by
-    FROM exercise_catalog ec
-    JOIN equipment eq ON ec.equipment_id = eq.id
-    WHERE ec.exercise = ?
-    '''
-    return pd.read_sql_query(query, system_conn, params=(exercise_name,)).iloc[0]
+    # Served from the in-memory catalog, shaped like the first row of the old
+    # catalog-join-equipment query: IndexError without a matching row
+    entry = get_catalog(system_pool.path).by_name.get(exercise_name)
+    if entry is None or entry.equipment is None:
+        raise IndexError(f"no catalog entry with equipment named {exercise_name!r}")
+    return pd.Series({
+        "id": entry.id,
+        "exercise": entry.name,
+        "equipment": entry.equipment.name,
+        "weight": entry.weight,
+        "measured_by": entry.measured_by,
+    }, name=0)
+
+def search_exercises(query, k=DEFAULT_K):
+    """Names of the top `k` catalog exercises for a free-text, typo-tolerant query."""
+    with system_pool.connection() as system_conn:
+        return [result.name for result in search(system_conn, query, k)]
 
 def get_catalog_with_muscle_groups():
     query = """
@@ -129,95 +289,130 @@ def get_catalog_with_muscle_groups():
     GROUP BY ec.id
     ORDER BY ec.exercise ASC
     """
-    return pd.read_sql_query(query, system_conn)
+    with system_pool.connection() as system_conn:
+        return pd.read_sql_query(query, system_conn)
 
 def get_exercise_log():
-    df = pd.read_sql_query("SELECT * FROM exercises", user_conn)
+    with user_pool.connection() as user_conn:
+        df = pd.read_sql_query("SELECT * FROM exercises", user_conn)
     if not df.empty:
         df.rename(columns=COLUMN_LABELS, inplace=True)
     return df
 
+def get_exercises_for_date(date):
+    query = "SELECT exercise, set_number, weight, reps, rest, note, duration FROM exercises WHERE date = ?"
+    with user_pool.connection() as user_conn:
+        return pd.read_sql_query(query, user_conn, params=(date,))
+
+def get_last_performance(exercise, sessions=1):
+    """Sets from the last `sessions` dates `exercise` was logged, newest first, read off the end of its index.
+
+    Cached until the log is next written to.
+    """
+    return _last_performance.get_or_compute((exercise, sessions), ("user",),
+                                            lambda: _read_last_performance(exercise, sessions))
+
+def _read_last_performance(exercise, sessions):
+    query = f"""
+    SELECT date, set_number, weight, reps, duration, rest, note FROM exercises
+    WHERE exercise = ? AND {ISO_DATE} IN (
+        SELECT DISTINCT {ISO_DATE} FROM exercises WHERE exercise = ? ORDER BY {ISO_DATE} DESC LIMIT ?)
+    ORDER BY {ISO_DATE} DESC, set_number
+    """
+    with user_pool.connection() as user_conn:
+        return pd.read_sql_query(query, user_conn, params=(exercise, exercise, sessions))
+
 def initialize_default_catalog_if_empty():
-    result = system_c.execute('SELECT COUNT(*) FROM exercise_catalog').fetchone()
-    if result[0] == 0:
-        with open("config/default_catalog.yaml", "r") as f:
-            default_catalog = yaml.safe_load(f)
-        eq_lookup = dict(system_c.execute("SELECT name, id FROM equipment").fetchall())
-        mg_lookup = dict(system_c.execute("SELECT name, id FROM muscle_groups").fetchall())
-        for entry in default_catalog:
-            exercise = entry.get("exercise")
-            equipment_name = entry.get("equipment")
-            weight = entry.get("weight", 0.0)
-            measured_by = entry.get("measured_by", "Reps")
-
-            if not exercise or not equipment_name:
-                continue  # Skip invalid entries
-
-            eq_id = eq_lookup.get(equipment_name)
-            if eq_id is None:
-                continue  # Equipment not found
-
-            system_c.execute(
-                "INSERT INTO exercise_catalog (exercise, equipment_id, weight, measured_by) VALUES (?, ?, ?, ?)",
-                (exercise, eq_id, weight, measured_by)
-            )
-            ex_id = system_c.execute("SELECT id FROM exercise_catalog WHERE exercise = ?", (exercise,)).fetchone()[0]
-
-            for mg_name in entry.get("muscle_groups", []):
-                mg_id = mg_lookup.get(mg_name)
-                if mg_id is not None:
-                    system_c.execute(
-                        "INSERT OR IGNORE INTO exercise_muscle_map (exercise_id, muscle_group_id) VALUES (?, ?)",
-                        (ex_id, mg_id)
-                    )
-
-            # Optional: If you reintroduce optional equipment later
-            for opt_eq in entry.get("optional_equipment", []):
-                opt_eq_id = eq_lookup.get(opt_eq)
-                if opt_eq_id is not None:
-                    system_c.execute(
-                        "INSERT OR IGNORE INTO exercise_optional_equipment (exercise_id, equipment_id) VALUES (?, ?)",
-                        (ex_id, opt_eq_id)
-                    )
-
-        system_conn.commit()
+    with system_pool.transaction() as system_c:
+        result = system_c.execute('SELECT COUNT(*) FROM exercise_catalog').fetchone()
+        if result[0] == 0:
+            with open("config/default_catalog.yaml", "r") as f:
+                default_catalog = yaml.safe_load(f)
+            eq_lookup = dict(system_c.execute("SELECT name, id FROM equipment").fetchall())
+            mg_lookup = dict(system_c.execute("SELECT name, id FROM muscle_groups").fetchall())
+            for entry in default_catalog:
+                exercise = entry.get("exercise")
+                equipment_name = entry.get("equipment")
+                weight = entry.get("weight", 0.0)
+                measured_by = entry.get("measured_by", "Reps")
+
+                if not exercise or not equipment_name:
+                    continue  # Skip invalid entries
+
+                eq_id = eq_lookup.get(equipment_name)
+                if eq_id is None:
+                    continue  # Equipment not found
+
+                system_c.execute(
+                    "INSERT INTO exercise_catalog (exercise, equipment_id, weight, measured_by) VALUES (?, ?, ?, ?)",
+                    (exercise, eq_id, weight, measured_by)
+                )
+                ex_id = system_c.execute("SELECT id FROM exercise_catalog WHERE exercise = ?", (exercise,)).fetchone()[0]
+
+                for mg_name in entry.get("muscle_groups", []):
+                    mg_id = mg_lookup.get(mg_name)
+                    if mg_id is not None:
+                        system_c.execute(
+                            "INSERT OR IGNORE INTO exercise_muscle_map (exercise_id, muscle_group_id) VALUES (?, ?)",
+                            (ex_id, mg_id)
+                        )
+
+                # Optional: If you reintroduce optional equipment later
+                for opt_eq in entry.get("optional_equipment", []):
+                    opt_eq_id = eq_lookup.get(opt_eq)
+                    if opt_eq_id is not None:
+                        system_c.execute(
+                            "INSERT OR IGNORE INTO exercise_optional_equipment (exercise_id, equipment_id) VALUES (?, ?)",
+                            (ex_id, opt_eq_id)
+                        )
 
 def initialize_muscle_groups():
-    existing = system_c.execute('SELECT COUNT(*) FROM muscle_groups').fetchone()[0]
-    if existing == 0:
-        with open("config/muscle_groups.yaml", "r") as f:
-            groups = yaml.safe_load(f)
-        system_c.executemany('INSERT INTO muscle_groups (name) VALUES (?)', [(g,) for g in groups])
-        system_conn.commit()
+    with system_pool.transaction() as system_c:
+        existing = system_c.execute('SELECT COUNT(*) FROM muscle_groups').fetchone()[0]
+        if existing == 0:
+            with open("config/muscle_groups.yaml", "r") as f:
+                groups = yaml.safe_load(f)
+            system_c.executemany('INSERT INTO muscle_groups (name) VALUES (?)', [(g,) for g in groups])
 
 def initialize_equipment():
-    system_c.execute('''
-    CREATE TABLE IF NOT EXISTS equipment (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE NOT NULL,
-        default_weight REAL DEFAULT 0,
-        track_weight BOOLEAN DEFAULT 1,
-        has_resistance_levels BOOLEAN DEFAULT 0
-    )
-    ''')
-    existing = system_c.execute('SELECT COUNT(*) FROM equipment').fetchone()[0]
-    if existing == 0:
-        with open("config/equipment.yaml", "r") as f:
-            equipment = yaml.safe_load(f)
-        for item in equipment:
-            if item["name"] != "Resistance Band":  # Skip Resistance Band
-                system_c.execute('''
-                INSERT INTO equipment (name, default_weight, track_weight, has_resistance_levels)
-                VALUES (?, ?, ?, ?)
-                ''', (item["name"], item["default_weight"], item["track_weight"], item["has_resistance_levels"]))
-        system_conn.commit()
+    with system_pool.transaction() as system_c:
+        system_c.execute('''
+        CREATE TABLE IF NOT EXISTS equipment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            default_weight REAL DEFAULT 0,
+            track_weight BOOLEAN DEFAULT 1,
+            has_resistance_levels BOOLEAN DEFAULT 0
+        )
+        ''')
+        existing = system_c.execute('SELECT COUNT(*) FROM equipment').fetchone()[0]
+        if existing == 0:
+            with open("config/equipment.yaml", "r") as f:
+                equipment = yaml.safe_load(f)
+            for item in equipment:
+                if item["name"] != "Resistance Band":  # Skip Resistance Band
+                    system_c.execute('''
+                    INSERT INTO equipment (name, default_weight, track_weight, has_resistance_levels)
+                    VALUES (?, ?, ?, ?)
+                    ''', (item["name"], item["default_weight"], item["track_weight"], item["has_resistance_levels"]))
 
 def get_muscle_groups():
-    return pd.read_sql("SELECT * FROM muscle_groups", system_conn)
+    with system_pool.connection() as system_conn:
+        return pd.read_sql("SELECT * FROM muscle_groups", system_conn)
 
 def get_tag_map():
-    return pd.read_sql("""
-        SELECT em.exercise_id, mg.name AS muscle
-        FROM exercise_muscle_map em
-        JOIN muscle_groups mg ON em.muscle_group_id = mg.id
-    """, system_conn)
\ No newline at end of file
+    with system_pool.connection() as system_conn:
+        return pd.read_sql("""
+            SELECT em.exercise_id, mg.name AS muscle
+            FROM exercise_muscle_map em
+            JOIN muscle_groups mg ON em.muscle_group_id = mg.id
+        """, system_conn)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance for the db.py (legacy) workout log")
+    parser.add_argument("command", choices=["rebuild-rollups"])
+    args = parser.parse_args()
+
+    if args.command == "rebuild-rollups":
+        create_tables()
+        rebuild_rollups()
@@ -0,0 +1,72 @@
+import threading
+from sqlalchemy import MetaData, create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session
+from pool import apply_pragmas
+from instrumentation import TracedConnection
+from system_models import ExerciseCatalog
+
+USER_DB_PATH = "user_log.db"
+SYSTEM_DB_PATH = "system.db"
+
+# Connections from the user engine see system.db under this schema name, so
+# catalog lookups can be joined into user-log queries instead of done in Python.
+SYSTEM_SCHEMA = "system"
+attached_catalog = ExerciseCatalog.__table__.to_metadata(MetaData(), schema=SYSTEM_SCHEMA)
+
+USER_ATTACHMENTS = ((SYSTEM_SCHEMA, SYSTEM_DB_PATH),)
+
+_registry = {}
+_lock = threading.Lock()
+
+
+def _install_connect_hook(engine, attachments):
+    @event.listens_for(engine, "do_connect")
+    def on_do_connect(_dialect, _record, _cargs, cparams):
+        # Statements are timed by the sqlite3 cursor (see instrumentation.py)
+        cparams["factory"] = TracedConnection
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_conn, _record):
+        apply_pragmas(dbapi_conn)
+        for schema, path in attachments:
+            dbapi_conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+
+
+def _registered(path: str, attachments):
+    key = (path, tuple(attachments))
+    with _lock:
+        entry = _registry.get(key)
+        if entry is None:
+            engine = create_engine(f"sqlite:///{path}")
+            _install_connect_hook(engine, key[1])
+            entry = _registry[key] = (engine, sessionmaker(engine, class_=Session))
+        return entry
+
+
+def get_engine(path: str, attachments=()):
+    """Return the process-wide engine for `path`, creating it on first use."""
+    return _registered(path, attachments)[0]
+
+
+def get_user_engine():
+    return get_engine(USER_DB_PATH, USER_ATTACHMENTS)
+
+
+def get_system_engine():
+    return get_engine(SYSTEM_DB_PATH)
+
+
+def user_session() -> Session:
+    return _registered(USER_DB_PATH, USER_ATTACHMENTS)[1]()
+
+
+def system_session() -> Session:
+    return _registered(SYSTEM_DB_PATH, ())[1]()
+
+
+def dispose_all():
+    with _lock:
+        for engine, _ in _registry.values():
+            engine.dispose()
+        _registry.clear()
@@ -0,0 +1,299 @@
+import bisect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in milliseconds; anything slower lands in the last bucket
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+BUCKET_LABELS = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+
+# A SELECT run this many times inside one render is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = 3
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = {os.path.join(_REPO_DIR, name) for name in ("instrumentation.py", "pool.py", "engines.py")}
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": self.max_ms,
+            "buckets": {label: n for label, n in zip(BUCKET_LABELS, self.counts) if n},
+        }
+
+
+class QueryStats:
+    def __init__(self, db: str, sql: str):
+        self.db = db
+        self.sql = sql
+        self.latency = Histogram()
+        self.fetch_ms = 0.0
+        self.rows = 0
+        self.sites = Counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "db": self.db,
+            "sql": self.sql,
+            "rows": self.rows,
+            "fetch_ms": self.fetch_ms,
+            "sites": dict(self.sites.most_common(5)),
+            **self.latency.to_dict(),
+        }
+
+
+class _Span:
+    def __init__(self, name: str):
+        self.name = name
+        self.statements = Counter()
+        self.sites = defaultdict(set)
+
+
+class Recorder:
+    """Collects statement and render timings while enabled; a no-op otherwise."""
+
+    def __init__(self):
+        self.enabled = False
+        self._queries = {}
+        self._renders = defaultdict(Histogram)
+        self._n_plus_one = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._renders.clear()
+            self._n_plus_one.clear()
+
+    def record_query(self, db: str, sql: str, seconds: float, rows: int) -> QueryStats:
+        site = call_site()
+        with self._lock:
+            stats = self._queries.get((db, sql))
+            if stats is None:
+                stats = self._queries[(db, sql)] = QueryStats(db, sql)
+            stats.latency.add(seconds * 1000)
+            stats.rows += rows
+            stats.sites[site] += 1
+        for span in getattr(self._local, "spans", ()):
+            span.statements[(db, sql)] += 1
+            span.sites[(db, sql)].add(site)
+        return stats
+
+    def record_fetch(self, stats: QueryStats, seconds: float, rows: int):
+        with self._lock:
+            stats.fetch_ms += seconds * 1000
+            stats.rows += rows
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block (e.g. one tab render) and check the statements it ran for N+1 patterns."""
+        if not self.enabled:
+            yield
+            return
+
+        spans = self._local.__dict__.setdefault("spans", [])
+        span = _Span(name)
+        spans.append(span)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            spans.pop()
+            findings = [
+                {"db": db, "sql": sql, "count": count, "sites": sorted(span.sites[(db, sql)])}
+                for (db, sql), count in span.statements.most_common()
+                if count >= N_PLUS_ONE_THRESHOLD and sql.lstrip().upper().startswith("SELECT")
+            ]
+            with self._lock:
+                self._renders[name].add(elapsed * 1000)
+                # Latest render only, so a fixed pattern drops out on the next rerun
+                self._n_plus_one[name] = findings
+
+    def n_plus_one(self) -> list:
+        with self._lock:
+            return [{"span": name, **f} for name, findings in self._n_plus_one.items() for f in findings]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            queries = sorted((s.to_dict() for s in self._queries.values()),
+                             key=lambda q: q["total_ms"], reverse=True)
+            renders = {name: h.to_dict() for name, h in self._renders.items()}
+        return {
+            "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "queries": queries,
+            "renders": renders,
+            "n_plus_one": self.n_plus_one(),
+        }
+
+    def dump(self, path: str) -> str:
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        return path
+
+
+recorder = Recorder()
+
+
+_own_code = {}  # filename -> whether frames from it count as call sites
+
+
+def _is_own_code(filename: str) -> bool:
+    own = _own_code.get(filename)
+    if own is None:
+        path = os.path.abspath(filename)
+        own = _own_code[filename] = (path.startswith(_REPO_DIR) and path not in _SKIP_FILES
+                                     and "site-packages" not in path)
+    return own
+
+
+def call_site() -> str:
+    """The innermost frame in this repo's own code outside the database plumbing."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        if _is_own_code(frame.f_code.co_filename):
+            return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<external>"
+
+
+class TracedCursor(sqlite3.Cursor):
+    # Hooked at the DB-API cursor rather than SQLAlchemy's cursor events so
+    # SELECT row counts are visible; sqlite3 reports rowcount -1 for queries.
+    _stats = None
+
+    def execute(self, sql, parameters=()):
+        if not recorder.enabled:
+            self._stats = None
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._stats = recorder.record_query(self.connection.label, sql, time.perf_counter() - started,
+                                                max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        if not recorder.enabled:
+            self._stats = None
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._stats = recorder.record_query(self.connection.label, sql, time.perf_counter() - started,
+                                                max(self.rowcount, 0))
+
+    def _tracing_fetch(self) -> bool:
+        return self._stats is not None and recorder.enabled
+
+    def _fetched(self, started, rows):
+        recorder.record_fetch(self._stats, time.perf_counter() - started, rows)
+
+    # Straight through when not recording: the app fetches far more often than it executes
+    def fetchone(self):
+        if not self._tracing_fetch():
+            return super().fetchone()
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        if not self._tracing_fetch():
+            return super().fetchmany(self.arraysize if size is None else size)
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        if not self._tracing_fetch():
+            return super().fetchall()
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors report to `recorder`; pass as `factory=`."""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        self.label = os.path.splitext(os.path.basename(str(database)))[0]
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3's own shortcuts build their cursor in C and would bypass cursor() above
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        cursor = self.cursor()
+        if not recorder.enabled:
+            return cursor.executescript(sql_script)
+        started = time.perf_counter()
+        try:
+            return cursor.executescript(sql_script)
+        finally:
+            recorder.record_query(self.label, sql_script, time.perf_counter() - started, 0)
+
+
+def format_report(snapshot: dict, top: int = 15) -> str:
+    lines = [f"{'calls':>6} {'total ms':>10} {'p95 ms':>8} {'rows':>9}  statement"]
+    for q in snapshot["queries"][:top]:
+        sql = " ".join(q["sql"].split())
+        lines.append(f"{q['count']:>6} {q['total_ms'] + q['fetch_ms']:>10.1f} {q['p95_ms']:>8} {q['rows']:>9}  "
+                     f"[{q['db']}] {sql[:90]}")
+    for name, r in snapshot["renders"].items():
+        lines.append(f"span {name}: {r['count']} runs, mean {r['mean_ms']:.1f} ms, max {r['max_ms']:.1f} ms")
+    for f in snapshot["n_plus_one"]:
+        lines.append(f"possible N+1 in {f['span']}: {f['count']}x [{f['db']}] {' '.join(f['sql'].split())[:90]} "
+                     f"from {', '.join(f['sites'])}")
+    return "\n".join(lines)
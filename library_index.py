@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+
+FACETS = ("muscle_group", "equipment", "difficulty")
+
+
+class LibraryIndex:
+    """Facet posting sets and a name lookup over the exercise library."""
+
+    def __init__(self, exercises):
+        self.exercises = exercises
+        self.names = [e["name"] for e in exercises]
+        self.by_name = {}
+        self.postings = {facet: {} for facet in FACETS}
+
+        # Postings hold list positions, so sorted intersections keep file order
+        for position, e in enumerate(exercises):
+            self.by_name.setdefault(e["name"], e)
+            for facet in FACETS:
+                self.postings[facet].setdefault(e[facet], set()).add(position)
+
+        self.options = {facet: sorted(self.postings[facet]) for facet in FACETS}
+
+    def filter(self, **selected):
+        """Names matching every given facet value; a value of None leaves that facet unfiltered."""
+        matches = [self.postings[facet].get(value, set())
+                   for facet, value in selected.items() if value is not None]
+        if not matches:
+            return list(self.names)
+        positions = set.intersection(*sorted(matches, key=len))
+        return [self.names[i] for i in sorted(positions)]
+
+    def get(self, name: str) -> dict:
+        return self.by_name[name]
+
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def load_library_index(path: str = "exercises.json") -> LibraryIndex:
+    # Built once per process and rebuilt only when the file's mtime changes
+    mtime = os.stat(path).st_mtime_ns
+    with _lock:
+        cached = _indexes.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(path) as f:
+        index = LibraryIndex(json.load(f))
+    with _lock:
+        _indexes[path] = (mtime, index)
+    return index
@@ -1,17 +1,59 @@
-from typing import List, Dict
-from sqlmodel import Session, select
-from user_models import Workout, Exercise
+from typing import List, Dict, Mapping, Optional, Sequence, Tuple
+from datetime import date
+from sqlalchemy import bindparam, delete, func, insert, tuple_, update
+from sqlmodel import select
+from user_models import Workout, Exercise, ExerciseRollup, ExerciseRecord, RepRecord
 from system_models import ExerciseCatalog
+import aggregates
+import columnar
+import muscle_load
+import records
+import search
+import series
+import snapshot
+from write_behind import WriteBehindQueue
+from cache import DataVersionCache, DataVersionWatcher
+from catalog import get_catalog
+from engines import (SYSTEM_DB_PATH, USER_DB_PATH, attached_catalog, get_system_engine, get_user_engine,
+                     system_session, user_session)
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
 import plotly.express as px
 
+# Optional: when enabled, add_sets() queues and a background thread group-commits
+_write_behind = None
+
+# Last-performance lookups, shared by every session and dropped by any commit to the
+# log, whichever path made it (apply_log_diff, write-behind, sync, another process)
+_last_performance = DataVersionCache({"user": DataVersionWatcher(USER_DB_PATH)}, max_entries=256)
+
+def _insert_sets(sets: List[dict]):
+    with user_session() as session:
+        session.execute(insert(Exercise), sets)
+        session.commit()
+
+def enable_write_behind(max_batch: int = 500, max_latency: float = 0.05):
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindQueue(_insert_sets, max_batch, max_latency, name="user-write-behind")
+
+def disable_write_behind():
+    global _write_behind
+    if _write_behind is not None:
+        queue, _write_behind = _write_behind, None
+        queue.close()
+
+def flush_writes():
+    """Wait until every queued set is committed; a no-op unless write-behind is enabled."""
+    if _write_behind is not None:
+        _write_behind.flush()
+
 class SystemService:
     def __init__(self):
-        self.engine = create_engine("sqlite:///system.db")
+        self.engine = get_system_engine()
 
     def __enter__(self):
-        self.session = Session(self.engine)
+        self.session = system_session()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -20,22 +62,35 @@ class SystemService:
     def get_exercise_catalog(self) -> List[ExerciseCatalog]:
         return self.session.exec(select(ExerciseCatalog)).all()
 
-    def get_exercise_name_map(self) -> Dict[int, str]:
-        return {e.id: e.name for e in self.get_exercise_catalog()}
+    def get_exercise_name_map(self) -> Mapping[int, str]:
+        # Served from the process-wide catalog snapshot, not a query
+        return get_catalog(SYSTEM_DB_PATH).names
+
+    def search_exercises(self, query: str, k: int = search.DEFAULT_K,
+                         among: Optional[Sequence[int]] = None) -> List[search.SearchResult]:
+        return search.search(self.session.connection().connection.dbapi_connection, query, k, among)
 
 class UserService:
     def __init__(self):
-        self.engine = create_engine("sqlite:///user_log.db")
+        self.engine = get_user_engine()
 
     def __enter__(self):
-        self.session = Session(self.engine)
+        self.session = user_session()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.session.close()
 
     def get_all_workouts(self) -> List[Workout]:
-        return self.session.exec(select(Workout)).all()
+        return self.session.exec(select(Workout).order_by(Workout.date)).all()
+
+    def get_workouts_between(self, start: date, end: date) -> List[Workout]:
+        # ISO dates compare correctly as strings, so this is a range scan on ix_workouts_date
+        return self.session.exec(
+            select(Workout)
+            .where(Workout.date.between(start.isoformat(), end.isoformat()))
+            .order_by(Workout.date)
+        ).all()
 
     def get_workout_uuid_to_date_map(self):
         return {w.uuid: w.date for w in self.get_all_workouts()}
@@ -50,84 +105,293 @@ class UserService:
     def get_exercises_for_workout(self, workout_uuid: str) -> List[Exercise]:
         return self.session.exec(select(Exercise).where(Exercise.workout_uuid == workout_uuid)).all()
 
+    def get_workout_exercise_df(self, workout_uuid: str, name_map: Dict[int, str]) -> pd.DataFrame:
+        """One workout's sets, read column-wise without hydrating Exercise objects."""
+        exercise_ids, *sets = columnar.fetch_columns(
+            self.session.connection(),
+            select(Exercise.exercise_id, *SET_FIELDS)
+            .where(Exercise.workout_uuid == workout_uuid)
+            .order_by(Exercise.id),
+        )
+        return pd.DataFrame({
+            "Exercise": columnar.name_column(exercise_ids, name_map, unknown="Unknown"),
+            **set_columns(*sets),
+        })
+
     def get_all_exercises(self) -> List[Exercise]:
         return self.session.exec(select(Exercise)).all()
 
-    def get_plotly_volume_chart(self) -> pd.DataFrame:
-        workouts = self.get_all_workouts()
-        records = []
+    def add_sets(self, sets: Sequence[dict]) -> None:
+        if _write_behind is not None:
+            for row in sets:
+                _write_behind.put(row)
+            return
+        self.apply_log_diff(inserts=sets)
+
+    def apply_log_diff(self,
+                       inserts: Sequence[dict] = (),
+                       updates: Sequence[dict] = (),
+                       deletes: Sequence[int] = ()) -> None:
+        """Apply inserted sets, updates (dicts keyed by "id") and deleted ids in a single commit."""
+        exercises = Exercise.__table__
+        flush_writes()  # keep the diff ordered after any sets still queued
+        try:
+            if inserts:
+                self.session.execute(insert(Exercise), list(inserts))
+            if updates:
+                self.session.execute(update(Exercise), list(updates))
+            if deletes:
+                self.session.connection().execute(
+                    delete(exercises).where(exercises.c.id == bindparam("delete_id")),
+                    [{"delete_id": int(row_id)} for row_id in deletes],
+                )
+            if updates or deletes:
+                # Records can't be decremented in a trigger; recompute the touched exercises before committing
+                records.refresh_dirty_records(self.session.connection())
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+    def get_last_performance(self, exercise_id: int, sessions: int = 1) -> pd.DataFrame:
+        """Sets from the last `sessions` workouts that included `exercise_id`, newest first, cached until the log changes.
+
+        A handful of index seeks whatever the size of the log: the dates come from the
+        end of the rollup's (exercise_id, date) index, the sets from (workout_uuid, exercise_id).
+        """
+        def compute():
+            last_dates = (select(ExerciseRollup.date).where(ExerciseRollup.exercise_id == exercise_id)
+                          .order_by(ExerciseRollup.date.desc()).limit(sessions))
+            # Filtering on workout_uuid rather than the joined date lets SQLite seek the
+            # composite index instead of walking every set of the exercise
+            workout_uuids = select(Workout.uuid).where(Workout.date.in_(last_dates))
+            dates, *sets = columnar.fetch_columns(
+                self.session.connection(),
+                select(Workout.date, *SET_FIELDS)
+                .join(Workout, Workout.uuid == Exercise.workout_uuid)
+                .where(Exercise.exercise_id == exercise_id, Exercise.workout_uuid.in_(workout_uuids))
+                .order_by(Workout.date.desc(), Exercise.set_number, Exercise.id),
+            )
+            return pd.DataFrame({"Date": columnar.date_column(dates), **set_columns(*sets)})
+
+        return _last_performance.get_or_compute((exercise_id, sessions), ("user",), compute)
+
+    def get_log_filter_options(self) -> Tuple[Optional[date], Optional[date], Dict[str, int]]:
+        # MIN/MAX are single seeks on ix_workouts_date; the rollup holds one row per
+        # (date, exercise), so the distinct exercises never touch individual sets
+        first, last = self.session.exec(select(func.min(Workout.date), func.max(Workout.date))).one()
+        exercises = self.session.exec(
+            select(attached_catalog.c.name, attached_catalog.c.id)
+            .where(attached_catalog.c.id.in_(select(ExerciseRollup.exercise_id).distinct()))
+            .order_by(attached_catalog.c.name)
+        ).all()
+        return (
+            date.fromisoformat(first) if first else None,
+            date.fromisoformat(last) if last else None,
+            {name: exercise_id for name, exercise_id in exercises},
+        )
+
+    def get_log_page(self,
+                     start: Optional[date] = None,
+                     end: Optional[date] = None,
+                     exercise_ids: Optional[Sequence[int]] = None,
+                     after: Optional[Tuple[str, str, int]] = None,
+                     limit: int = 100) -> Tuple[pd.DataFrame, Optional[Tuple[str, str, int]]]:
+        """One page of the log ordered by (date, workout, id), plus the cursor for the next page or None."""
+        query = log_query().add_columns(Workout.uuid, Exercise.id)
+        lower = start.isoformat() if start is not None else ""
+        if end is not None:
+            query = query.where(Workout.date <= end.isoformat())
+        if exercise_ids:
+            query = query.where(Exercise.exercise_id.in_(exercise_ids))
+        if after is not None:
+            # Keyset pagination: seek past the last row seen instead of OFFSET
+            lower = max(lower, after[0])
+            query = query.where(tuple_(Workout.date, Workout.uuid, Exercise.id) > tuple_(*after))
+        query = query.where(Workout.date >= lower)
+
+        # The date bound, even "", makes SQLite walk the unique (date, uuid) index on
+        # workouts and then ix_exercises_workout_uuid, whose entries for one workout are
+        # in id order: an unfiltered page reads limit + 1 sets and sorts nothing, however
+        # deep it is. With an exercise filter SQLite starts from ix_exercises_exercise_id
+        # instead and sorts that exercise's sets, so those pages cost more the longer
+        # its history, still not the page depth.
+        rows = self.session.exec(query.order_by(Workout.date, Workout.uuid, Exercise.id).limit(limit + 1)).all()
+        next_cursor = (rows[limit - 1][0], *rows[limit - 1][-2:]) if len(rows) > limit else None
+
+        df = pd.DataFrame([row[:-2] + row[-1:] for row in rows[:limit]], columns=LOG_COLUMNS + ["id"])
+        return df.set_index("id"), next_cursor
+
+    def get_records_df(self) -> pd.DataFrame:
+        """Current records, one row per exercise and kind."""
+        return pd.read_sql(
+            select(ExerciseRecord.exercise_id, attached_catalog.c.name.label("Exercise"), ExerciseRecord.kind,
+                   ExerciseRecord.value, ExerciseRecord.weight, ExerciseRecord.reps, ExerciseRecord.date)
+            .outerjoin(attached_catalog, attached_catalog.c.id == ExerciseRecord.exercise_id)
+            .order_by(attached_catalog.c.name),
+            self.session.connection(),
+        )
+
+    def get_rep_records_df(self, exercise_id: int) -> pd.DataFrame:
+        return pd.read_sql(
+            select(RepRecord.weight.label("Weight"), RepRecord.reps.label("Reps"), RepRecord.date.label("Date"))
+            .where(RepRecord.exercise_id == exercise_id)
+            .order_by(RepRecord.weight),
+            self.session.connection(),
+        )
+
+    def get_record_history_df(self, exercise_id: int) -> pd.DataFrame:
+        return records.record_history(records.fetch_sets(self.session.connection(), [exercise_id]))
+
+    def get_volume_series_df(self, bucket: str = "week", exercises: Optional[Sequence[str]] = None,
+                             top_n: Optional[int] = series.DEFAULT_TOP_N) -> pd.DataFrame:
+        return pd.read_sql(series.volume_series_query(bucket, exercises, top_n), self.session.connection())
 
-        for workout in workouts:
-            exercises = self.get_exercises_for_workout(workout.uuid)
-            volume = sum((e.weight or 0) * (e.reps or 0) for e in exercises)
-            records.append({
-                "Date": workout.date,
-                "Workout": workout.uuid[:8],
-                "Volume": volume
-            })
+    def get_muscle_load_df(self, bucket: str = "week") -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """(volume, sets) per bucket and muscle group."""
+        return muscle_load.muscle_load(self.session.connection(), get_catalog(SYSTEM_DB_PATH), bucket)
 
-        df = pd.DataFrame(records)
+    def get_workout_volume_df(self) -> pd.DataFrame:
+        return aggregates.get_workout_volume_df(self.session)
+
+    def get_daily_exercise_volume_df(self) -> pd.DataFrame:
+        return aggregates.get_daily_exercise_volume_df(self.session)
+
+    def get_daily_volume_df(self) -> pd.DataFrame:
+        return aggregates.get_daily_volume_df(self.session)
+
+    def get_plotly_volume_chart(self) -> pd.DataFrame:
+        df = self.get_workout_volume_df()
 
         return px.line(df, x="Date", y="Volume", title="Training Volume Over Time", markers=True)
 
 
+LOG_COLUMNS = ["Date", "Exercise", "Set", "Weight", "Reps", "Duration", "Rest", "Note"]
 
-def get_exercise_df(exercises: List[Exercise], name_map: Dict[int, str]) -> pd.DataFrame:
-    df = {
-        "Exercise": [],
-        "Set": [],
-        "Weight": [],
-        "Reps": [],
-        "Duration": [],
-        "Rest": [],
-        "Note": []
-    }
-    for e in exercises:
-        df["Exercise"].append(name_map.get(e.exercise_id, "Unknown"))
-        df["Set"].append(e.set_number)
-        df["Weight"].append(e.weight)
-        df["Reps"].append(e.reps)
-        df["Duration"].append(e.duration)
-        df["Rest"].append(e.rest)
-        df["Note"].append(e.note)
+def log_query():
+    # Single cross-database query: system.db is attached to user-engine connections
+    return (
+        select(
+            Workout.date,
+            attached_catalog.c.name,
+            Exercise.set_number,
+            Exercise.weight,
+            Exercise.reps,
+            Exercise.duration,
+            Exercise.rest,
+            Exercise.note,
+        )
+        .join(Workout, Workout.uuid == Exercise.workout_uuid)
+        .outerjoin(attached_catalog, attached_catalog.c.id == Exercise.exercise_id)
+    )
 
-    return pd.DataFrame(df)
+SET_FIELDS = (Exercise.set_number, Exercise.weight, Exercise.reps, Exercise.duration, Exercise.rest, Exercise.note)
 
-def get_all_exercises_df() -> pd.DataFrame:
+def set_columns(set_number, weight, reps, duration, rest, note) -> Dict[str, object]:
+    return {
+        "Set": columnar.int_column(set_number, "int16"),
+        "Weight": columnar.float_column(weight),
+        "Reps": columnar.int_column(reps, "int16"),
+        "Duration": columnar.int_column(duration, "int32"),
+        "Rest": columnar.int_column(rest, "int16"),
+        "Note": np.array(note, dtype=object),
+    }
 
-    with UserService() as usr_svc, SystemService() as sys_svc:
-        exercises = usr_svc.get_all_exercises()
-        # Map workout UUID to date
-        workout_map = usr_svc.get_workout_uuid_to_date_map()
+def get_all_exercises_df() -> pd.DataFrame:
+    with SystemService() as sys_svc:
         name_map = sys_svc.get_exercise_name_map()
+    with UserService() as usr_svc:
+        dates, exercise_ids, *sets = columnar.fetch_columns(
+            usr_svc.session.connection(),
+            select(Workout.date, Exercise.exercise_id, *SET_FIELDS)
+            .join(Workout, Workout.uuid == Exercise.workout_uuid)
+            .order_by(Exercise.id),
+        )
 
-    # Build DataFrame
-    data = []
-    for e in exercises:
-        data.append({
-            "Date": workout_map[e.workout_uuid],
-            "Exercise": name_map[e.exercise_id],
-            "Set": e.set_number,
-            "Weight": e.weight,
-            "Reps": e.reps,
-            "Duration": e.duration,
-            "Rest": e.rest,
-            "Note": e.note,
-        })
+    return pd.DataFrame({
+        "Date": columnar.date_column(dates),
+        "Exercise": columnar.name_column(exercise_ids, name_map),
+        **set_columns(*sets),
+    })
 
+def get_plotly_volume_chart():
+    with UserService() as usr_svc:
+        volume_df = usr_svc.get_daily_exercise_volume_df()
 
-    return pd.DataFrame(data)
+    volume_df["Date"] = pd.to_datetime(volume_df["Date"], format="%Y-%m-%d")
+    return volume_chart(volume_df)
 
-def get_plotly_volume_chart():
-    exercises_df = get_all_exercises_df()
-    exercises_df["Date"] = pd.to_datetime(exercises_df["Date"], format="%m/%d/%Y")
-    exercises_df["Volume"] = exercises_df["Weight"] * exercises_df["Reps"]
-    volume_df = exercises_df.groupby(["Date", "Exercise"], as_index=False)["Volume"].sum()
+def get_volume_series_chart(bucket: str = "week",
+                            exercises: Optional[Sequence[str]] = None,
+                            top_n: Optional[int] = series.DEFAULT_TOP_N,
+                            max_points: int = series.DEFAULT_MAX_POINTS,
+                            use_snapshot: bool = False):
+    """Bucketed volume for the top-N (or selected) exercises, each trace capped at `max_points`."""
+    if use_snapshot:
+        # Four columns from the Parquet snapshot; no SQLite or ORM involved
+        daily = snapshot.daily_exercise_volume(snapshot.load_snapshot(["date", "exercise", "weight", "reps"]))
+        volume_df = series.bucket_frame(daily, bucket, exercises, top_n)
+    else:
+        with UserService() as usr_svc:
+            volume_df = usr_svc.get_volume_series_df(bucket, exercises, top_n)
+        volume_df["Date"] = pd.to_datetime(volume_df["Date"], format="%Y-%m-%d")
+
+    return volume_chart(series.downsample(volume_df, max_points), title=f"Volume per {bucket}")
+
+def volume_chart(volume_df: pd.DataFrame, title: str = "Volume Over Time (All Exercises)"):
+    volume_df = volume_df.sort_values(["Date", "Exercise"], ignore_index=True)
 
     # Create interactive Plotly chart
     fig = px.line(volume_df, x="Date", y="Volume", color="Exercise",
-                  title="Volume Over Time (All Exercises)",
+                  title=title,
                   markers=True)
     fig.update_layout(legend_title_text="Exercise")
 
     return fig
+
+MUSCLE_METRICS = ("Volume", "Sets")
+
+def get_muscle_heatmap(metric: str = "Volume", weeks: Optional[int] = None):
+    """Muscle group x week heatmap of volume or set count, optionally only the last `weeks` weeks."""
+    with UserService() as usr_svc:
+        volume_df, sets_df = usr_svc.get_muscle_load_df("week")
+
+    df = volume_df if metric == "Volume" else sets_df
+    if weeks:
+        df = df[df.index >= df.index.max() - pd.Timedelta(weeks=weeks - 1)] if len(df) else df
+    fig = px.imshow(df.T, aspect="auto", color_continuous_scale="Viridis",
+                    labels={"x": "Week", "y": "Muscle group", "color": metric},
+                    title=f"{metric} per muscle group per week")
+    fig.update_xaxes(type="date")
+    return fig
+
+RECORD_LABELS = {
+    "weight": "Heaviest",
+    "e1rm_epley": "e1RM (Epley)",
+    "e1rm_brzycki": "e1RM (Brzycki)",
+    "volume": "Best set volume",
+}
+
+def get_records_table() -> pd.DataFrame:
+    """One row per exercise: each record's value and the date it was set."""
+    with UserService() as usr_svc:
+        df = usr_svc.get_records_df()
+
+    # Pivot on the id: two catalog entries may share a display name
+    table = df.pivot(index="exercise_id", columns="kind", values=["value", "date"])
+    columns = {"Exercise": df.drop_duplicates("exercise_id").set_index("exercise_id")["Exercise"]}
+    for kind, label in RECORD_LABELS.items():
+        if ("value", kind) in table:
+            columns[label] = table[("value", kind)].astype(float).round(1)
+            columns[f"{label} date"] = table[("date", kind)]
+    return pd.DataFrame(columns, index=table.index).sort_values("Exercise", kind="stable").reset_index(drop=True)
+
+def get_e1rm_progression_chart(exercise_id: int, name: str):
+    with UserService() as usr_svc:
+        history = usr_svc.get_record_history_df(exercise_id)
+
+    history = history[history["kind"].isin(["e1rm_epley", "e1rm_brzycki"])].copy()
+    history["Date"] = pd.to_datetime(history["date"], format="%Y-%m-%d")
+    history["Formula"] = history["kind"].map(RECORD_LABELS)
+    return px.line(history, x="Date", y="value", color="Formula", markers=True, line_shape="hv",
+                   title=f"Estimated 1RM records: {name}", labels={"value": "e1RM"})
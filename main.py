@@ -1,29 +1,54 @@
+import argparse
 
-import os
-from user_models import create_all_user_tables
-from system_models import create_all_system_tables
-from sqlalchemy import create_engine
+from engines import get_system_engine, get_user_engine
+from migrations import migrate_system_db, migrate_user_db
+from rollups import rebuild_rollups
 
-from seed import seed_all
+from sync import sync_all
+from snapshot import SNAPSHOT_DIR, refresh_snapshot
+from instrumentation import format_report, recorder
 
-system_engine = create_engine("sqlite:///system.db", echo=True)
-user_engine = create_engine("sqlite:///user_log.db", echo=True)
+system_engine = get_system_engine()
+user_engine = get_user_engine()
 
 
 
 if __name__ == "__main__":
-    try:
-        os.remove("user_log.db")
-    except FileNotFoundError:
-        pass  # or log it if needed
-
-    try:
-        os.remove("system.db")
-    except FileNotFoundError:
-        pass  # or log it if needed
-
-    create_all_system_tables(system_engine)
-    create_all_user_tables(user_engine)
-
-    seed_all(system_engine=system_engine,user_engine=user_engine)
-    print()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Workout tracker database maintenance")
+    parser.add_argument("command", nargs="?", default="seed", choices=["seed", "rebuild-rollups", "snapshot"])
+    parser.add_argument("--full", action="store_true",
+                        help="seed: re-check every row even if a source file is unchanged; "
+                             "snapshot: rewrite every month, not just changed ones")
+    parser.add_argument("--profile", nargs="?", const="profile.json", metavar="OUT_JSON",
+                        help="time every statement, print a summary and write it as JSON")
+    args = parser.parse_args()
+
+    if args.profile:
+        recorder.enable()
+
+    with recorder.span(args.command):
+        migrate_system_db(system_engine)
+        migrate_user_db(user_engine)
+
+        if args.command == "seed":
+            stats = sync_all(system_engine=system_engine, user_engine=user_engine, force=args.full)
+            for name, counts in stats["system"].items():
+                print(f"{name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+                      f"{counts['deleted']} deleted, {counts['kept']} kept because still in use")
+            log = stats["log"]
+            print(f"log: {log['inserted']} inserted, {log['updated']} updated, {log['deleted']} deleted, "
+                  f"{log['unchanged']} adopted unchanged, {log['skipped']} skipped in {log['seconds']:.2f}s")
+            for name, count in sorted(log["unknown"].items()):
+                print(f"  skipped {count} rows for {name!r}, which is not in the exercise catalog")
+        elif args.command == "rebuild-rollups":
+            with user_engine.begin() as conn:
+                rebuild_rollups(conn)
+        elif args.command == "snapshot":
+            manifest = refresh_snapshot(full=args.full)
+            print(f"Snapshot generation {manifest['generation']}: rewrote {len(manifest['written'])} of "
+                  f"{len(manifest['months'])} months in {SNAPSHOT_DIR}/")
+
+    if args.profile:
+        print(format_report(recorder.snapshot()))
+        print(f"Wrote {recorder.dump(args.profile)}")
+    print()
@@ -0,0 +1,258 @@
+from datetime import datetime
+from user_models import ExerciseRollup, ExerciseRecord, RepRecord, ExerciseRecordDirty, LogMonth
+from user_models import SyncFingerprint as UserFingerprint
+import json
+import uuid
+from rollups import install_rollup_triggers, rebuild_rollups
+from records import install_record_triggers, rebuild_records, refresh_dirty_records
+from system_models import SyncFingerprint as SystemFingerprint
+from search import install_search_index
+from snapshot import install_change_triggers, rebuild_log_months
+from engines import get_system_engine, get_user_engine
+
+# Each database tracks the last applied step in SQLite's `PRAGMA user_version`.
+# Steps are append-only: never edit or reorder a step once it has shipped,
+# add a new one at the end of the list instead.
+
+
+# The schemas as first released, frozen here rather than created from the models,
+# which keep moving; IF NOT EXISTS adopts databases created before versioning.
+USER_BASELINE = [
+    """CREATE TABLE IF NOT EXISTS workouts (
+        uuid VARCHAR NOT NULL,
+        date VARCHAR NOT NULL,
+        PRIMARY KEY (uuid)
+    )""",
+    """CREATE TABLE IF NOT EXISTS workout_sequence (
+        workout_uuid VARCHAR NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        sequence_number INTEGER NOT NULL,
+        PRIMARY KEY (workout_uuid, exercise_id),
+        FOREIGN KEY(workout_uuid) REFERENCES workouts (uuid)
+    )""",
+    """CREATE TABLE IF NOT EXISTS exercises (
+        id INTEGER NOT NULL,
+        workout_uuid VARCHAR NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        set_number INTEGER NOT NULL,
+        weight FLOAT,
+        reps INTEGER,
+        duration INTEGER,
+        rest INTEGER,
+        note VARCHAR,
+        PRIMARY KEY (id),
+        FOREIGN KEY(workout_uuid) REFERENCES workouts (uuid)
+    )""",
+]
+
+SYSTEM_BASELINE = [
+    """CREATE TABLE IF NOT EXISTS equipment (
+        id INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        default_weight FLOAT NOT NULL,
+        track_weight BOOLEAN NOT NULL,
+        has_resistance_levels BOOLEAN NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS muscle_groups (
+        id INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS exercise_catalog (
+        id INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        equipment_id INTEGER,
+        weight FLOAT,
+        measured_by VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(equipment_id) REFERENCES equipment (id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS exercise_muscle_link (
+        exercise_id INTEGER NOT NULL,
+        muscle_group_id INTEGER NOT NULL,
+        PRIMARY KEY (exercise_id, muscle_group_id),
+        FOREIGN KEY(exercise_id) REFERENCES exercise_catalog (id),
+        FOREIGN KEY(muscle_group_id) REFERENCES muscle_groups (id)
+    )""",
+]
+
+
+def _rewrite_us_dates(conn) -> list:
+    """M/D/YYYY workout dates, zero-padded or not, -> YYYY-MM-DD; returns the rewritten workouts' uuids."""
+    rows = []
+    for workout_uuid, us_date in conn.exec_driver_sql("SELECT uuid, date FROM workouts WHERE date LIKE '%/%/%'"):
+        try:
+            rows.append((datetime.strptime(us_date, "%m/%d/%Y").date().isoformat(), workout_uuid))
+        except ValueError:
+            continue
+    if rows:
+        conn.exec_driver_sql("UPDATE workouts SET date = ? WHERE uuid = ?", rows)
+    return [workout_uuid for _, workout_uuid in rows]
+
+
+def _user_baseline(conn):
+    for ddl in USER_BASELINE:
+        conn.exec_driver_sql(ddl)
+
+
+def _user_indexes_and_iso_dates(conn):
+    # ISO dates sort and range-filter as plain strings
+    _rewrite_us_dates(conn)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_workouts_date ON workouts (date)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_exercises_workout_uuid ON exercises (workout_uuid)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_exercises_exercise_id ON exercises (exercise_id)")
+
+
+def _user_rollups(conn):
+    ExerciseRollup.__table__.create(conn, checkfirst=True)
+    install_rollup_triggers(conn)
+    rebuild_rollups(conn)
+
+
+def _user_records(conn):
+    for model in (ExerciseRecord, RepRecord, ExerciseRecordDirty):
+        model.__table__.create(conn, checkfirst=True)
+    install_record_triggers(conn)
+    rebuild_records(conn)
+
+
+def _user_sync_fingerprints(conn):
+    UserFingerprint.__table__.create(conn, checkfirst=True)
+
+
+def _user_last_performance_indexes(conn):
+    # Last N dates an exercise was done are the tail of the rollup's (exercise_id, date)
+    # index; each date's sets are then one seek into (workout_uuid, exercise_id)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_exercise_rollup_exercise_date ON exercise_rollup (exercise_id, date)")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_exercises_workout_exercise ON exercises (workout_uuid, exercise_id, set_number)")
+
+
+def _user_set_provenance(conn):
+    columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(exercises)")}
+    if "seeded" not in columns:
+        conn.exec_driver_sql("ALTER TABLE exercises ADD COLUMN seeded BOOLEAN NOT NULL DEFAULT 0")
+
+    _flag_seeded(conn, [row[0] for row in conn.exec_driver_sql("SELECT uuid FROM workouts")])
+
+
+def _flag_seeded(conn, workout_uuids):
+    # Sets logged before provenance existed: every importer named its workouts
+    # uuid5(the CSV's MM/DD/YYYY date), so sets in those workouts came from the CSV
+    seeded = []
+    for workout_uuid, iso_date in conn.exec_driver_sql(
+            "SELECT uuid, date FROM workouts WHERE uuid IN (SELECT value FROM json_each(?))",
+            (json.dumps(workout_uuids),)):
+        if iso_date.count("-") != 2:
+            continue
+        year, month, day = iso_date.split("-")
+        csv_dates = {f"{month}/{day}/{year}", f"{int(month)}/{int(day)}/{year}"}
+        if workout_uuid in {str(uuid.uuid5(uuid.NAMESPACE_DNS, d)) for d in csv_dates}:
+            seeded.append((workout_uuid,))
+    if seeded:
+        # Only a flag changes: keep the rollup and record triggers from redoing every set
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS exercise_rollup_update")
+        conn.exec_driver_sql("DROP TRIGGER IF EXISTS exercise_records_update")
+        conn.exec_driver_sql("UPDATE exercises SET seeded = 1 WHERE workout_uuid = ?", seeded)
+        install_rollup_triggers(conn)
+        install_record_triggers(conn)
+
+
+def _user_log_page_index(conn):
+    # Unique, so the planner knows each (date, uuid) is one workout and can take the
+    # log's (date, uuid, id) page order straight from the indexes without a sort
+    conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ix_workouts_date_uuid ON workouts (date, uuid)")
+
+
+def _user_unpadded_iso_dates(conn):
+    # Step 2 only matched zero-padded MM/DD/YYYY, leaving dates like 4/7/2025 behind;
+    # the workout triggers move their rollups and mark their records dirty
+    rewritten = _rewrite_us_dates(conn)
+    if rewritten:
+        refresh_dirty_records(conn)
+        _flag_seeded(conn, rewritten)
+
+
+def _user_log_months(conn):
+    LogMonth.__table__.create(conn, checkfirst=True)
+    install_change_triggers(conn)
+    rebuild_log_months(conn)
+
+
+def _system_baseline(conn):
+    for ddl in SYSTEM_BASELINE:
+        conn.exec_driver_sql(ddl)
+
+
+def _system_search_index(conn):
+    # search.py speaks DB-API so db.py can share it; this is the same transaction
+    install_search_index(conn.connection.dbapi_connection)
+
+
+def _system_sync_fingerprints(conn):
+    SystemFingerprint.__table__.create(conn, checkfirst=True)
+
+
+def _system_search_muscle_group_delete(conn):
+    # Re-running the install adds the trigger that step 2 lacked; existing rows are kept
+    install_search_index(conn.connection.dbapi_connection)
+
+
+USER_MIGRATIONS = [
+    _user_baseline,
+    _user_indexes_and_iso_dates,
+    _user_rollups,
+    _user_records,
+    _user_sync_fingerprints,
+    _user_last_performance_indexes,
+    _user_set_provenance,
+    _user_log_page_index,
+    _user_unpadded_iso_dates,
+    _user_log_months,
+]
+
+SYSTEM_MIGRATIONS = [
+    _system_baseline,
+    _system_search_index,
+    _system_sync_fingerprints,
+    _system_search_muscle_group_delete,
+]
+
+
+def get_schema_version(conn) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate(engine, migrations) -> int:
+    with engine.connect() as conn:
+        version = get_schema_version(conn)
+
+    for target, step in enumerate(migrations[version:], start=version + 1):
+        with engine.begin() as conn:
+            # pysqlite only opens a transaction before DML; without this a step's DDL
+            # would autocommit, and a failure could leave it half-applied
+            conn.exec_driver_sql("BEGIN")
+            step(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+        version = target
+
+    return version
+
+
+def migrate_user_db(engine) -> int:
+    return migrate(engine, USER_MIGRATIONS)
+
+
+def migrate_system_db(engine) -> int:
+    return migrate(engine, SYSTEM_MIGRATIONS)
+
+
+def migrate_databases():
+    migrate_system_db(get_system_engine())
+    migrate_user_db(get_user_engine())
+
+
+if __name__ == "__main__":
+    migrate_databases()
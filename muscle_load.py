@@ -0,0 +1,86 @@
+import threading
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sqlalchemy import func
+from sqlmodel import select
+
+import columnar
+from catalog import CatalogSnapshot
+from series import bucket_start
+from user_models import ExerciseRollup
+
+# Weekly training load per muscle group as one sparse product:
+#   (weeks x exercises) volume  @  (exercises x muscle groups) incidence
+# Every muscle group an exercise works is credited with the full set, the
+# usual way of counting "sets per muscle group".
+
+
+class Incidence:
+    """Sparse exercise x muscle-group matrix for one catalog snapshot."""
+
+    def __init__(self, catalog: CatalogSnapshot):
+        self.exercise_ids = np.array(sorted(catalog.by_id), dtype=np.int64)
+        # Catalog order (config/muscle_groups.yaml), so the heatmap rows read anatomically
+        self.muscle_groups = [m.name for _, m in sorted(catalog.muscle_groups_by_id.items())]
+        muscle_pos = {name: i for i, name in enumerate(self.muscle_groups)}
+
+        rows, cols = [], []
+        for row, exercise_id in enumerate(self.exercise_ids):
+            for name in catalog.exercise_muscles[exercise_id]:
+                rows.append(row)
+                cols.append(muscle_pos[name])
+        self.matrix = sp.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(self.exercise_ids), len(self.muscle_groups)),
+        )
+
+    def positions(self, exercise_ids: np.ndarray) -> np.ndarray:
+        """Row of each exercise id in the matrix, or -1 for ids not in the catalog."""
+        if not len(self.exercise_ids):
+            return np.full(len(exercise_ids), -1)
+        pos = np.minimum(np.searchsorted(self.exercise_ids, exercise_ids), len(self.exercise_ids) - 1)
+        return np.where(self.exercise_ids[pos] == exercise_ids, pos, -1)
+
+
+_incidence = None  # (catalog snapshot, Incidence); rebuilt only when the catalog reloads
+_incidence_lock = threading.Lock()
+
+
+def get_incidence(catalog: CatalogSnapshot) -> Incidence:
+    global _incidence
+    with _incidence_lock:
+        if _incidence is None or _incidence[0] is not catalog:
+            _incidence = (catalog, Incidence(catalog))
+        return _incidence[1]
+
+
+def weekly_exercise_query(bucket: str = "week"):
+    start = bucket_start(ExerciseRollup.date, bucket).label("Date")
+    return (
+        select(start, ExerciseRollup.exercise_id, func.total(ExerciseRollup.volume),
+               func.sum(ExerciseRollup.set_count))
+        .group_by(start, ExerciseRollup.exercise_id)
+    )
+
+
+def muscle_load(conn, catalog: CatalogSnapshot, bucket: str = "week") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(volume, sets) frames indexed by bucket start date with one column per muscle group."""
+    incidence = get_incidence(catalog)
+    dates, exercise_ids, volume, sets = columnar.fetch_columns(conn, weekly_exercise_query(bucket))
+
+    rows = incidence.positions(np.array(exercise_ids, dtype=np.int64))
+    known = rows >= 0
+    periods, period_idx = np.unique(np.array(dates, dtype=object)[known], return_inverse=True)
+    shape = (len(periods), incidence.matrix.shape[0])
+
+    frames = []
+    for values in (volume, sets):
+        by_exercise = sp.csr_matrix(
+            (np.array(values, dtype=np.float64)[known], (period_idx, rows[known])), shape=shape)
+        load = (by_exercise @ incidence.matrix).toarray()
+        frames.append(pd.DataFrame(load, index=pd.to_datetime(periods, format="%Y-%m-%d"),
+                                   columns=incidence.muscle_groups))
+    return frames[0], frames[1]
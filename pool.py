@@ -0,0 +1,91 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from instrumentation import TracedConnection
+
+# WAL lets readers keep going while another connection writes; NORMAL is
+# durable across application crashes in WAL mode and skips an fsync per commit.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -20000",  # KiB, ~20 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MB
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def apply_pragmas(conn):
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+
+
+class ConnectionPool:
+    """Lends each thread its own connection to one SQLite file for the duration of a request."""
+
+    def __init__(self, path: str, max_idle: int = 8, timeout: float = 5.0):
+        self.path = path
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        # Connections are handed between threads through the idle list, but a
+        # connection is only ever used by the thread that currently holds it.
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False,
+                               factory=TracedConnection)
+        apply_pragmas(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # Nested use on the same thread shares the outer connection
+            yield held
+            return
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            if getattr(self._local, "in_transaction", False):
+                # Join the caller's transaction; the outermost block commits
+                yield conn
+                return
+
+            self._local.in_transaction = True
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._local.in_transaction = False
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Tuple
+from transcode import CACHE_DIR, MAX_CACHE_BYTES, TranscodeCache, encoding_params
+
+
+def _transcode_one(gif_path: str, cache_dir: str, max_bytes: int) -> Tuple[str, int]:
+    # Runs in a worker process; same cache layout and defaults as gif_app.py.
+    # Eviction waits for the whole batch, see pretranscode()
+    path = TranscodeCache(cache_dir, max_bytes).get_or_transcode(gif_path, evict=False)
+    return path, os.path.getsize(gif_path)
+
+
+def pretranscode(exercises_json="exercises.json", cache_dir=CACHE_DIR,
+                 max_bytes=MAX_CACHE_BYTES, workers=None) -> dict:
+    with open(exercises_json) as f:
+        exercises = json.load(f)
+
+    gif_paths = sorted({e["gif_path"] for e in exercises if e.get("gif_path")})
+    cache = TranscodeCache(cache_dir, max_bytes)
+
+    failures = []
+    pending = []
+    outputs = []
+    skipped = 0
+    for gif_path in gif_paths:
+        try:
+            if cache.contains(gif_path):
+                # key_for memoizes the hash, so this doesn't read the GIF twice
+                outputs.append(cache.path_for(cache.key_for(gif_path, encoding_params())))
+                skipped += 1
+            else:
+                pending.append(gif_path)
+        except OSError as e:
+            failures.append((gif_path, str(e)))
+
+    started = time.perf_counter()
+    transcoded = 0
+    input_bytes = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futures = {pool.submit(_transcode_one, p, cache_dir, max_bytes): p for p in pending}
+            for future in as_completed(futures):
+                try:
+                    path, size = future.result()
+                    outputs.append(path)
+                    input_bytes += size
+                    transcoded += 1
+                except Exception as e:
+                    failures.append((futures[future], f"{type(e).__name__}: {e}"))
+    # Once, after every worker has finished: the batch's own clips are never evicted
+    cache.evict(keep=outputs)
+    seconds = time.perf_counter() - started
+
+    return {
+        "total": len(gif_paths),
+        "skipped": skipped,
+        "transcoded": transcoded,
+        "failures": failures,
+        "seconds": seconds,
+        "clips_per_sec": transcoded / seconds if seconds else 0.0,
+        "input_mb_per_sec": input_bytes / seconds / 1e6 if seconds else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transcode every exercise GIF into the MP4 cache")
+    parser.add_argument("--exercises", default="exercises.json")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the number of CPUs")
+    args = parser.parse_args()
+
+    stats = pretranscode(args.exercises, args.cache_dir, workers=args.workers)
+    print(f"{stats['transcoded']} transcoded, {stats['skipped']} already current, "
+          f"{len(stats['failures'])} failed out of {stats['total']} "
+          f"in {stats['seconds']:.1f}s ({stats['clips_per_sec']:.2f} clips/sec, "
+          f"{stats['input_mb_per_sec']:.2f} MB/sec of GIF input)")
+    for gif_path, error in stats["failures"]:
+        print(f"  FAILED {gif_path}: {error}")
+    raise SystemExit(1 if stats["failures"] else 0)
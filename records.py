@@ -0,0 +1,161 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert
+from sqlmodel import select
+
+import columnar
+from user_models import Workout, Exercise, ExerciseRecord, RepRecord, ExerciseRecordDirty
+
+# Personal records per exercise. New sets update exercise_records and
+# rep_records in O(1) through the insert triggers below, one primary-key upsert
+# per record kind. Maxima cannot be decremented, so updates and deletes only mark
+# the exercise dirty; every write path that updates or deletes sets calls
+# refresh_dirty_records() before committing, which recomputes those exercises
+# from their sets with the vectorized code in this module. Reads never write.
+# A tie keeps the earliest date.
+
+KINDS = ("weight", "e1rm_epley", "e1rm_brzycki", "volume")
+
+# Same arithmetic, in the same order, as the SQL in the triggers so both paths agree exactly
+EPLEY = "CASE WHEN NEW.reps = 1 THEN NEW.weight WHEN NEW.reps > 1 THEN NEW.weight * (1 + NEW.reps / 30.0) END"
+BRZYCKI = "CASE WHEN NEW.reps BETWEEN 1 AND 36 THEN NEW.weight * 36.0 / (37 - NEW.reps) END"
+
+_MARK_DIRTY = "INSERT OR IGNORE INTO exercise_records_dirty (exercise_id)"
+
+RECORD_TRIGGERS = {
+    "exercise_records_insert": f"""
+    CREATE TRIGGER IF NOT EXISTS exercise_records_insert AFTER INSERT ON exercises
+    WHEN NEW.weight IS NOT NULL BEGIN
+        INSERT INTO exercise_records (exercise_id, kind, value, weight, reps, date, set_id)
+        SELECT NEW.exercise_id, k.kind, k.value, NEW.weight, NEW.reps, w.date, NEW.id
+        FROM workouts w,
+             (SELECT 'weight' AS kind, NEW.weight AS value
+              UNION ALL SELECT 'e1rm_epley', {EPLEY}
+              UNION ALL SELECT 'e1rm_brzycki', {BRZYCKI}
+              UNION ALL SELECT 'volume', NEW.weight * NEW.reps) k
+        WHERE w.uuid = NEW.workout_uuid AND k.value IS NOT NULL
+        ON CONFLICT (exercise_id, kind) DO UPDATE SET
+            value = excluded.value, weight = excluded.weight, reps = excluded.reps,
+            date = excluded.date, set_id = excluded.set_id
+        WHERE excluded.value > exercise_records.value
+           OR (excluded.value = exercise_records.value AND excluded.date < exercise_records.date);
+
+        INSERT INTO rep_records (exercise_id, weight, reps, date, set_id)
+        SELECT NEW.exercise_id, NEW.weight, NEW.reps, w.date, NEW.id
+        FROM workouts w
+        WHERE w.uuid = NEW.workout_uuid AND NEW.reps IS NOT NULL
+        ON CONFLICT (exercise_id, weight) DO UPDATE SET
+            reps = excluded.reps, date = excluded.date, set_id = excluded.set_id
+        WHERE excluded.reps > rep_records.reps
+           OR (excluded.reps = rep_records.reps AND excluded.date < rep_records.date);
+    END
+    """,
+    "exercise_records_update": f"""
+    CREATE TRIGGER IF NOT EXISTS exercise_records_update AFTER UPDATE ON exercises BEGIN
+        {_MARK_DIRTY} VALUES (OLD.exercise_id), (NEW.exercise_id);
+    END
+    """,
+    "exercise_records_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS exercise_records_delete AFTER DELETE ON exercises BEGIN
+        {_MARK_DIRTY} VALUES (OLD.exercise_id);
+    END
+    """,
+    "workout_records_update": f"""
+    CREATE TRIGGER IF NOT EXISTS workout_records_update AFTER UPDATE OF date ON workouts BEGIN
+        {_MARK_DIRTY} SELECT exercise_id FROM exercises WHERE workout_uuid = NEW.uuid;
+    END
+    """,
+    "workout_records_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS workout_records_delete AFTER DELETE ON workouts BEGIN
+        {_MARK_DIRTY} SELECT exercise_id FROM exercises WHERE workout_uuid = OLD.uuid;
+    END
+    """,
+}
+
+
+def install_record_triggers(conn):
+    for ddl in RECORD_TRIGGERS.values():
+        conn.exec_driver_sql(ddl)
+
+
+def fetch_sets(conn, exercise_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+    query = (
+        select(Exercise.id, Workout.date, Exercise.exercise_id, Exercise.weight, Exercise.reps)
+        .join(Workout, Workout.uuid == Exercise.workout_uuid)
+        .where(Exercise.weight.is_not(None))
+    )
+    if exercise_ids is not None:
+        query = query.where(Exercise.exercise_id.in_(exercise_ids))
+    ids, dates, exercise_id, weight, reps = columnar.fetch_columns(conn, query)
+    return pd.DataFrame({
+        "set_id": np.array(ids, dtype=np.int64),
+        "date": np.array(dates, dtype=object),
+        "exercise_id": np.array(exercise_id, dtype=np.int64),
+        "weight": columnar.float_column(weight),
+        "reps": columnar.float_column(reps),
+    })
+
+
+def set_metrics(sets: pd.DataFrame) -> pd.DataFrame:
+    """One row per (set, kind) with that set's value for the kind; NaN where it doesn't apply."""
+    w, r = sets["weight"].to_numpy(), sets["reps"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = {
+            "weight": w,
+            "e1rm_epley": np.where(r == 1, w, np.where(r > 1, w * (1 + r / 30.0), np.nan)),
+            "e1rm_brzycki": np.where((r >= 1) & (r <= 36), w * 36.0 / (37 - r), np.nan),
+            "volume": w * r,
+        }
+    long = pd.concat([sets.assign(kind=kind, value=v) for kind, v in values.items()], ignore_index=True)
+    return long[long["value"].notna()]
+
+
+def record_history(sets: pd.DataFrame) -> pd.DataFrame:
+    """Every set that beat the running best for its exercise and kind, in date order."""
+    long = set_metrics(sets).sort_values(["date", "set_id"], kind="stable")
+    keys = [long["exercise_id"], long["kind"]]
+    best_before = long["value"].groupby(keys).cummax().groupby(keys).shift()
+    is_record = best_before.isna() | (long["value"] > best_before)
+    return long[is_record].reset_index(drop=True)
+
+
+def current_records(sets: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    history = record_history(sets)
+    records = history.groupby(["exercise_id", "kind"], sort=False).tail(1)
+
+    reps = sets[sets["reps"].notna()].sort_values(["date", "set_id"], kind="stable")
+    best = reps.groupby(["exercise_id", "weight"])["reps"].idxmax()  # first occurrence: earliest date
+    rep_records = reps.loc[best]
+
+    return (
+        records[["exercise_id", "kind", "value", "weight", "reps", "date", "set_id"]].reset_index(drop=True),
+        rep_records[["exercise_id", "weight", "reps", "date", "set_id"]].reset_index(drop=True),
+    )
+
+
+def _rows(df: pd.DataFrame):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def rebuild_records(conn, exercise_ids: Optional[Sequence[int]] = None):
+    """Recompute records from the sets, for `exercise_ids` or for everything."""
+    records, rep_records = current_records(fetch_sets(conn, exercise_ids))
+    for model in (ExerciseRecord, RepRecord):
+        stmt = delete(model)
+        if exercise_ids is not None:
+            stmt = stmt.where(model.exercise_id.in_(exercise_ids))
+        conn.execute(stmt)
+    if not records.empty:
+        conn.execute(insert(ExerciseRecord), _rows(records))
+    if not rep_records.empty:
+        conn.execute(insert(RepRecord), _rows(rep_records.astype({"reps": "int64"})))
+
+
+def refresh_dirty_records(conn) -> int:
+    dirty = conn.execute(select(ExerciseRecordDirty.exercise_id)).scalars().all()
+    if dirty:
+        rebuild_records(conn, dirty)
+        conn.execute(delete(ExerciseRecordDirty).where(ExerciseRecordDirty.exercise_id.in_(dirty)))
+    return len(dirty)
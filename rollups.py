@@ -0,0 +1,96 @@
+# exercise_rollup holds one row per (workout date, exercise_id). SQLite triggers
+# keep it current inside the same transaction as the write that changed the
+# underlying sets, so the ORM, Core and raw sqlite3 paths are all covered.
+# Inserts apply a delta; updates and deletes recompute only the affected keys
+# because top_weight cannot be decremented.
+
+ROLLUP_COLUMNS = "date, exercise_id, volume, set_count, rep_count, top_weight, total_duration"
+
+ROLLUP_SELECT = """
+    SELECT w.date, e.exercise_id,
+           TOTAL(e.weight * e.reps), COUNT(*), COALESCE(SUM(e.reps), 0),
+           MAX(e.weight), COALESCE(SUM(e.duration), 0)
+    FROM workouts w
+    JOIN exercises e ON e.workout_uuid = w.uuid
+"""
+
+
+def _refresh_key(date_expr, exercise_expr):
+    return f"""
+    DELETE FROM exercise_rollup WHERE date = {date_expr} AND exercise_id = {exercise_expr};
+    INSERT INTO exercise_rollup ({ROLLUP_COLUMNS})
+    {ROLLUP_SELECT}
+    WHERE w.date = {date_expr} AND e.exercise_id = {exercise_expr}
+    GROUP BY w.date, e.exercise_id;
+    """
+
+
+def _refresh_dates(*date_exprs):
+    dates = ", ".join(date_exprs)
+    return f"""
+    DELETE FROM exercise_rollup WHERE date IN ({dates});
+    INSERT INTO exercise_rollup ({ROLLUP_COLUMNS})
+    {ROLLUP_SELECT}
+    WHERE w.date IN ({dates})
+    GROUP BY w.date, e.exercise_id;
+    """
+
+
+OLD_DATE = "(SELECT date FROM workouts WHERE uuid = OLD.workout_uuid)"
+NEW_DATE = "(SELECT date FROM workouts WHERE uuid = NEW.workout_uuid)"
+
+ROLLUP_TRIGGERS = {
+    "exercise_rollup_insert": """
+    CREATE TRIGGER IF NOT EXISTS exercise_rollup_insert AFTER INSERT ON exercises BEGIN
+        INSERT INTO exercise_rollup (date, exercise_id, volume, set_count, rep_count, top_weight, total_duration)
+        SELECT date, NEW.exercise_id, COALESCE(NEW.weight * NEW.reps, 0), 1,
+               COALESCE(NEW.reps, 0), NEW.weight, COALESCE(NEW.duration, 0)
+        FROM workouts WHERE uuid = NEW.workout_uuid
+        ON CONFLICT (date, exercise_id) DO UPDATE SET
+            volume = volume + excluded.volume,
+            set_count = set_count + 1,
+            rep_count = rep_count + excluded.rep_count,
+            top_weight = CASE
+                WHEN top_weight IS NULL OR excluded.top_weight > top_weight THEN excluded.top_weight
+                ELSE top_weight
+            END,
+            total_duration = total_duration + excluded.total_duration;
+    END
+    """,
+    "exercise_rollup_update": f"""
+    CREATE TRIGGER IF NOT EXISTS exercise_rollup_update AFTER UPDATE ON exercises BEGIN
+        {_refresh_key(OLD_DATE, "OLD.exercise_id")}
+        {_refresh_key(NEW_DATE, "NEW.exercise_id")}
+    END
+    """,
+    "exercise_rollup_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS exercise_rollup_delete AFTER DELETE ON exercises BEGIN
+        {_refresh_key(OLD_DATE, "OLD.exercise_id")}
+    END
+    """,
+    "workout_rollup_update": f"""
+    CREATE TRIGGER IF NOT EXISTS workout_rollup_update AFTER UPDATE OF date ON workouts BEGIN
+        {_refresh_dates("OLD.date", "NEW.date")}
+    END
+    """,
+    "workout_rollup_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS workout_rollup_delete AFTER DELETE ON workouts BEGIN
+        {_refresh_dates("OLD.date")}
+    END
+    """,
+}
+
+
+def install_rollup_triggers(conn):
+    for ddl in ROLLUP_TRIGGERS.values():
+        conn.exec_driver_sql(ddl)
+
+
+def rebuild_rollups(conn):
+    conn.exec_driver_sql("DELETE FROM exercise_rollup")
+    conn.exec_driver_sql(f"""
+        INSERT INTO exercise_rollup ({ROLLUP_COLUMNS})
+        {ROLLUP_SELECT}
+        GROUP BY w.date, e.exercise_id
+    """)
+
@@ -0,0 +1,262 @@
+import json
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Collection, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from catalog import detect_schema
+
+# Exercise search over name, equipment and muscle groups. An FTS5 table with
+# the trigram tokenizer lives next to the catalog in system.db and is kept in
+# sync by triggers on every table it draws from, so seeding through the ORM,
+# Core or db.py's raw sqlite3 all keep it current.
+#
+# Names containing the query's words are ranked in SQL, the index serving the
+# LIKEs. Only when that finds fewer than k does a fuzzy pass run, OR-ing the
+# query's trigrams and matching its letters in order (a dropped letter); each
+# query word then scores its best of prefix, trigram overlap, one typo in a
+# word's prefix and letters in order, names counting for more than equipment
+# and muscle groups.
+
+SEARCH_TABLE = "exercise_search"
+DEFAULT_K = 20
+CANDIDATES = 100
+MIN_SCORE = 0.4
+BM25_WEIGHTS = (10.0, 2.0, 1.0)  # name, equipment, muscle_groups
+
+
+class SearchResult(NamedTuple):
+    id: int
+    name: str
+    equipment: str
+    muscle_groups: str
+    score: float
+
+
+def _document_select(name_col: str, link_table: str) -> str:
+    return f"""
+    SELECT c.id AS id, c.{name_col} AS name, COALESCE(e.name, '') AS equipment,
+           COALESCE((SELECT group_concat(m.name, ' ')
+                     FROM {link_table} l JOIN muscle_groups m ON m.id = l.muscle_group_id
+                     WHERE l.exercise_id = c.id), '') AS muscle_groups
+    FROM exercise_catalog c LEFT JOIN equipment e ON e.id = c.equipment_id
+    """
+
+
+def _refresh(schema, where: str) -> str:
+    return f"""
+        DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT c.id FROM exercise_catalog c WHERE {where});
+        INSERT INTO {SEARCH_TABLE} (rowid, name, equipment, muscle_groups)
+        {_document_select(*schema)} WHERE {where};
+    """
+
+
+def search_triggers(schema) -> dict:
+    link_table = schema[1]
+    linked = f"c.id IN (SELECT exercise_id FROM {link_table} WHERE muscle_group_id = NEW.id)"
+    return {
+        "exercise_search_catalog_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_catalog_insert AFTER INSERT ON exercise_catalog BEGIN
+            {_refresh(schema, "c.id = NEW.id")}
+        END""",
+        "exercise_search_catalog_update": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_catalog_update AFTER UPDATE ON exercise_catalog BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+            {_refresh(schema, "c.id = NEW.id")}
+        END""",
+        "exercise_search_catalog_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_catalog_delete AFTER DELETE ON exercise_catalog BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+        END""",
+        "exercise_search_link_insert": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_link_insert AFTER INSERT ON {link_table} BEGIN
+            {_refresh(schema, "c.id = NEW.exercise_id")}
+        END""",
+        "exercise_search_link_update": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_link_update AFTER UPDATE ON {link_table} BEGIN
+            {_refresh(schema, "c.id IN (OLD.exercise_id, NEW.exercise_id)")}
+        END""",
+        "exercise_search_link_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_link_delete AFTER DELETE ON {link_table} BEGIN
+            {_refresh(schema, "c.id = OLD.exercise_id")}
+        END""",
+        "exercise_search_equipment_update": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_equipment_update AFTER UPDATE OF name ON equipment BEGIN
+            {_refresh(schema, "c.equipment_id = NEW.id")}
+        END""",
+        "exercise_search_equipment_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_equipment_delete AFTER DELETE ON equipment BEGIN
+            {_refresh(schema, "c.equipment_id = OLD.id")}
+        END""",
+        "exercise_search_muscle_group_update": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_muscle_group_update AFTER UPDATE OF name ON muscle_groups BEGIN
+            {_refresh(schema, linked)}
+        END""",
+        # Links to the deleted group may remain; the document's join drops its name
+        "exercise_search_muscle_group_delete": f"""
+        CREATE TRIGGER IF NOT EXISTS exercise_search_muscle_group_delete AFTER DELETE ON muscle_groups BEGIN
+            {_refresh(schema, linked.replace("NEW.id", "OLD.id"))}
+        END""",
+    }
+
+
+def has_search_index(conn) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)).fetchone() is not None
+
+
+def install_search_index(conn) -> bool:
+    """Create the index and its triggers on a sqlite3 connection or cursor, filling it if new.
+
+    Returns False, leaving search() to score the catalog in Python, when this SQLite
+    build has no FTS5 trigram tokenizer or there is no catalog yet.
+    """
+    schema = detect_schema(conn)
+    if schema is None:
+        return False
+    created = not has_search_index(conn)
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+                     f"USING fts5(name, equipment, muscle_groups, tokenize='trigram')")
+    except sqlite3.OperationalError as e:
+        if "no such module" in str(e) or "no such tokenizer" in str(e):
+            return False
+        raise
+    for ddl in search_triggers(schema).values():
+        conn.execute(ddl)
+    if created:
+        rebuild_search_index(conn)
+    return True
+
+
+def rebuild_search_index(conn):
+    conn.execute(f"DELETE FROM {SEARCH_TABLE}")
+    conn.execute(f"INSERT INTO {SEARCH_TABLE} (rowid, name, equipment, muscle_groups) "
+                 f"{_document_select(*detect_schema(conn))}")
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def _trigrams(words) -> set:
+    return {word[i:i + 3] for word in words for i in range(len(word) - 2)}
+
+
+@lru_cache(maxsize=32768)
+def _tokens(text: str) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    # Catalog rows come back keystroke after keystroke; tokenize each once
+    words = tuple(_words(text))
+    return words, frozenset(_trigrams(words))
+
+
+def _is_subsequence(query_word: str, word: str) -> bool:
+    chars = iter(word)
+    return all(c in chars for c in query_word)
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """True if `a` becomes `b` with at most one substitution, insertion, deletion or swap of neighbours."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or a[i:i + 2] == b[i:i + 2][::-1] and a[i + 2:] == b[i + 2:]
+    return a[i:] == b[i + 1:] if len(a) < len(b) else a[i + 1:] == b[i:]
+
+
+def _typo_of_prefix(query_word: str, word: str) -> bool:
+    n = len(query_word)
+    return any(_one_edit(query_word, word[:m]) for m in (n - 1, n, n + 1) if m <= len(word))
+
+
+def _word_match(query_word: str, query_grams: set, words, grams: set, fuzzy: bool) -> float:
+    if any(w.startswith(query_word) for w in words):
+        return 1.0
+    score = 0.8 * len(query_grams & grams) / len(query_grams) if query_grams else 0.0
+    if fuzzy and score < 0.7 and len(query_word) > 3 and any(_typo_of_prefix(query_word, w) for w in words):
+        return 0.7
+    if fuzzy and score < 0.5 and len(query_word) > 2 and any(_is_subsequence(query_word, w) for w in words):
+        return 0.5
+    return score
+
+
+def _match(query, text: str, fuzzy=False) -> float:
+    """0..1: mean over query words of the best of word prefix, shared trigrams and, if `fuzzy`,
+    one typo in a word prefix or the letters in order."""
+    words, grams = _tokens(text)
+    return sum(_word_match(q, q_grams, words, grams, fuzzy) for q, q_grams in query) / len(query)
+
+
+def _rank(rows, query_words) -> List[SearchResult]:
+    query = [(q, _trigrams([q])) for q in query_words]
+    phrase = " ".join(query_words)
+    results = []
+    for id, name, equipment, muscle_groups in rows:
+        score = _match(query, name, fuzzy=True)
+        score += 0.7 * _match(query, f"{equipment} {muscle_groups}")
+        if " ".join(_tokens(name)[0]).startswith(phrase):
+            score += 1.0
+        if score >= MIN_SCORE:
+            results.append(SearchResult(id, name, equipment, muscle_groups, round(score, 3)))
+    results.sort(key=lambda r: (-r.score, len(r.name), r.name))
+    return results
+
+
+def search(conn, query: str, k: int = DEFAULT_K, among: Optional[Collection[int]] = None) -> List[SearchResult]:
+    """Top `k` catalog exercises for `query`, best first; an empty query lists names alphabetically.
+
+    `among` restricts the results to those catalog ids.
+    """
+    schema = detect_schema(conn)
+    if schema is None:
+        return []
+    indexed = has_search_index(conn)
+    table = SEARCH_TABLE if indexed else f"({_document_select(*schema)})"
+    id_col = "rowid" if indexed else "id"
+    columns = f"{id_col}, name, equipment, muscle_groups"
+    if among is None:
+        only, only_params = "", ()
+    else:
+        only, only_params = f" AND {id_col} IN (SELECT value FROM json_each(?))", (json.dumps(sorted(among)),)
+
+    query_words = _words(query)
+    if not query_words:
+        rows = conn.execute(f"SELECT {columns} FROM {table} WHERE 1{only} ORDER BY name COLLATE NOCASE LIMIT ?",
+                            (*only_params, k)).fetchall()
+        return [SearchResult(*row, 0.0) for row in rows]
+    query_grams = _trigrams(query_words)
+
+    # Names containing every word, ranked in SQL: whole-phrase prefix, then words
+    # that start a word of the name, then shorter names. The trigram index serves
+    # the LIKEs of words of three letters or more.
+    word_starts = " + ".join("(name LIKE ? OR name LIKE ?)" for _ in query_words)
+    rows = conn.execute(
+        f"SELECT {columns} FROM {table} WHERE {' AND '.join('name LIKE ?' for _ in query_words)}{only} "
+        f"ORDER BY name LIKE ? DESC, {word_starts} DESC, length(name), name LIMIT ?",
+        (*(f"%{w}%" for w in query_words), *only_params, " ".join(query_words) + "%",
+         *(p for w in query_words for p in (f"{w}%", f"% {w}%")), k),
+    ).fetchall()
+    results = _rank(rows, query_words)
+    if len(results) >= k:
+        return results
+
+    # Typos and matches on equipment or muscle group: candidates sharing a trigram,
+    # best by bm25, and names holding each word's letters in order, re-ranked here
+    seen = {row[0] for row in rows}
+    if indexed and query_grams:
+        rows = conn.execute(
+            f"SELECT {columns} FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?{only} "
+            f"ORDER BY bm25({SEARCH_TABLE}, {', '.join(map(str, BM25_WEIGHTS))}) LIMIT ?",
+            (" OR ".join(f'"{gram}"' for gram in sorted(query_grams)), *only_params, CANDIDATES),
+        ).fetchall()
+        results += _rank([row for row in rows if row[0] not in seen], query_words)
+        seen.update(row[0] for row in rows)
+    rows = conn.execute(
+        f"SELECT {columns} FROM {table} WHERE {' AND '.join('name LIKE ?' for _ in query_words)}{only} LIMIT ?",
+        (*("%" + "%".join(w) + "%" for w in query_words), *only_params, CANDIDATES),
+    ).fetchall()
+    results += _rank([row for row in rows if row[0] not in seen], query_words)
+    results.sort(key=lambda r: (-r.score, len(r.name), r.name))
+    return results[:k]
@@ -68,6 +68,7 @@ def seed_system_db(
 def seed_user_db(    user_engine,system_engine,
                      csv_path="exercises_clean.csv"):
     df = pd.read_csv(csv_path)
+    df["iso_date"] = pd.to_datetime(df["date"], format="%m/%d/%Y").dt.strftime("%Y-%m-%d")
     grouped_by_date = df.groupby("date")
 
     # Build catalog name → id map from system DB
@@ -75,10 +76,12 @@ def seed_user_db(    user_engine,system_engine,
         catalog_map = { c.name: c.id for c in sys_session.exec(select(ExerciseCatalog)).all() }
 
     with Session(user_engine) as session:
+        if session.exec(select(Workout)).first():
+            return
 
         for date, group in grouped_by_date:
             workout_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, date))
-            workout = Workout(uuid=workout_uuid, date=date)
+            workout = Workout(uuid=workout_uuid, date=group["iso_date"].iloc[0])
             session.add(workout)
             session.commit()
 
@@ -100,7 +103,8 @@ def seed_user_db(    user_engine,system_engine,
                     reps=row.get("reps"),
                     duration=row.get("duration"),
                     rest=row.get("rest"),
-                    note=row.get("note")
+                    note=row.get("note"),
+                    seeded=True
                 )
                 session.add(ex)
 
@@ -0,0 +1,118 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlmodel import select
+
+from user_models import ExerciseRollup
+from engines import attached_catalog
+
+# Volume series for the charts, bounded in size no matter how long the history:
+# at most `top_n` (or the selected) exercises, aggregated into day/week/month
+# buckets, and each trace downsampled to `max_points` with LTTB.
+
+BUCKETS = ("day", "week", "month")
+DEFAULT_TOP_N = 8
+DEFAULT_MAX_POINTS = 300
+
+
+def bucket_start(date_col, bucket: str):
+    """SQL expression for the first day of the bucket holding an ISO date; weeks start on Monday."""
+    if bucket == "day":
+        return date_col
+    if bucket == "week":
+        return func.date(date_col, "-6 days", "weekday 1")
+    if bucket == "month":
+        return func.date(date_col, "start of month")
+    raise ValueError(f"unknown bucket {bucket!r}, expected one of {BUCKETS}")
+
+
+def top_exercises_query(top_n: int):
+    return (
+        select(ExerciseRollup.exercise_id)
+        .group_by(ExerciseRollup.exercise_id)
+        .order_by(func.total(ExerciseRollup.volume).desc())
+        .limit(top_n)
+    )
+
+
+def volume_series_query(bucket: str = "week",
+                        exercises: Optional[Sequence[str]] = None,
+                        top_n: Optional[int] = DEFAULT_TOP_N):
+    start = bucket_start(ExerciseRollup.date, bucket).label("Date")
+    query = (
+        select(
+            start,
+            attached_catalog.c.name.label("Exercise"),
+            func.total(ExerciseRollup.volume).label("Volume"),
+            func.sum(ExerciseRollup.set_count).label("Sets"),
+        )
+        .join(attached_catalog, attached_catalog.c.id == ExerciseRollup.exercise_id)
+        .group_by(start, attached_catalog.c.name)
+        .order_by(attached_catalog.c.name, start)
+    )
+    if exercises:
+        query = query.where(attached_catalog.c.name.in_(exercises))
+    elif top_n:
+        query = query.where(ExerciseRollup.exercise_id.in_(top_exercises_query(top_n)))
+    return query
+
+
+def bucket_frame(daily: pd.DataFrame, bucket: str = "week",
+                 exercises: Optional[Sequence[str]] = None,
+                 top_n: Optional[int] = DEFAULT_TOP_N) -> pd.DataFrame:
+    """The same series from an in-memory Date/Exercise/Volume frame (e.g. the Parquet snapshot)."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"unknown bucket {bucket!r}, expected one of {BUCKETS}")
+    daily = daily.assign(Exercise=daily["Exercise"].astype(str))
+    if exercises:
+        daily = daily[daily["Exercise"].isin(exercises)]
+    elif top_n:
+        top = daily.groupby("Exercise")["Volume"].sum().nlargest(top_n).index
+        daily = daily[daily["Exercise"].isin(top)]
+
+    dates = pd.to_datetime(daily["Date"])
+    if bucket == "week":
+        dates = dates.dt.to_period("W-SUN").dt.start_time
+    elif bucket == "month":
+        dates = dates.dt.to_period("M").dt.start_time
+    return (
+        daily.assign(Date=dates)
+        .groupby(["Exercise", "Date"], as_index=False)["Volume"].sum()
+    )
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    # Interior points split into threshold - 2 buckets; the first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def downsample(series: pd.DataFrame, max_points: int = DEFAULT_MAX_POINTS,
+               x: str = "Date", y: str = "Volume", by: str = "Exercise") -> pd.DataFrame:
+    """Apply LTTB to each trace separately, keeping at most `max_points` rows per `by` group."""
+    parts = []
+    for _, trace in series.groupby(by, sort=False):
+        trace = trace.sort_values(x)
+        xs = pd.to_datetime(trace[x]).to_numpy().astype("datetime64[ns]").astype(np.int64)
+        parts.append(trace.iloc[lttb(xs, trace[y].to_numpy(), max_points)])
+    return pd.concat(parts, ignore_index=True) if parts else series.iloc[:0]
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+import time
+from typing import Optional, Sequence
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import delete, func, insert, literal
+from sqlmodel import select
+
+from engines import get_system_engine, get_user_engine
+from system_models import ExerciseCatalog, ExerciseMuscleLink, MuscleGroup
+from user_models import LogMonth, Workout, Exercise
+
+# The joined log as one Parquet file per month, plus a manifest recording what
+# each file was built from. Readable with pyarrow/pandas directly from notebooks.
+SNAPSHOT_DIR = os.environ.get("LOG_SNAPSHOT_DIR", "log_snapshot")
+MANIFEST = "manifest.json"
+
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("date", pa.date32()),
+    ("exercise_id", pa.int32()),
+    ("exercise", pa.dictionary(pa.int32(), pa.string())),
+    ("muscle_groups", pa.dictionary(pa.int32(), pa.string())),
+    ("set_number", pa.int16()),
+    ("weight", pa.float64()),
+    ("reps", pa.int16()),
+    ("duration", pa.int32()),
+    ("rest", pa.int16()),
+    ("note", pa.string()),
+])
+
+# Keep integer columns with NULLs as small nullable ints rather than float64
+NULLABLE_INTS = {pa.int16(): pd.Int16Dtype(), pa.int32(): pd.Int32Dtype(), pa.int64(): pd.Int64Dtype()}
+
+month_of = func.substr(Workout.date, 1, 7)
+
+# log_months counts the sets in each workout month and bumps the month's version
+# on every insert, update (of any column, the note included) or delete touching
+# it, so a refresh compares one small row per month instead of scanning the log.
+# `refresh_snapshot(full=True)` rebuilds unconditionally.
+
+
+def _bump(month_expr: str, delta: str, source: str = "") -> str:
+    return f"""
+        INSERT INTO log_months (month, sets, version)
+        SELECT {month_expr}, {delta}, 1 {source}
+        ON CONFLICT (month) DO UPDATE SET sets = sets + excluded.sets, version = version + 1;
+    """
+
+
+def _bump_set(workout_uuid: str, delta: int) -> str:
+    return _bump("substr(date, 1, 7)", str(delta), f"FROM workouts WHERE uuid = {workout_uuid}")
+
+
+def _workout_sets(workout_uuid: str) -> str:
+    return f"(SELECT COUNT(*) FROM exercises WHERE workout_uuid = {workout_uuid})"
+
+
+CHANGE_TRIGGERS = {
+    "log_months_set_insert": f"""
+    CREATE TRIGGER IF NOT EXISTS log_months_set_insert AFTER INSERT ON exercises BEGIN
+        {_bump_set("NEW.workout_uuid", 1)}
+    END
+    """,
+    "log_months_set_update": f"""
+    CREATE TRIGGER IF NOT EXISTS log_months_set_update AFTER UPDATE ON exercises BEGIN
+        {_bump_set("OLD.workout_uuid", -1)}
+        {_bump_set("NEW.workout_uuid", 1)}
+    END
+    """,
+    "log_months_set_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS log_months_set_delete AFTER DELETE ON exercises BEGIN
+        {_bump_set("OLD.workout_uuid", -1)}
+    END
+    """,
+    # Workouts only matter once they have sets joined to them
+    "log_months_workout_insert": f"""
+    CREATE TRIGGER IF NOT EXISTS log_months_workout_insert AFTER INSERT ON workouts
+    WHEN EXISTS (SELECT 1 FROM exercises WHERE workout_uuid = NEW.uuid) BEGIN
+        {_bump("substr(NEW.date, 1, 7)", _workout_sets("NEW.uuid"))}
+    END
+    """,
+    "log_months_workout_update": f"""
+    CREATE TRIGGER IF NOT EXISTS log_months_workout_update AFTER UPDATE OF date ON workouts
+    WHEN EXISTS (SELECT 1 FROM exercises WHERE workout_uuid = NEW.uuid) BEGIN
+        {_bump("substr(OLD.date, 1, 7)", "-" + _workout_sets("OLD.uuid"))}
+        {_bump("substr(NEW.date, 1, 7)", _workout_sets("NEW.uuid"))}
+    END
+    """,
+    "log_months_workout_delete": f"""
+    CREATE TRIGGER IF NOT EXISTS log_months_workout_delete AFTER DELETE ON workouts
+    WHEN EXISTS (SELECT 1 FROM exercises WHERE workout_uuid = OLD.uuid) BEGIN
+        {_bump("substr(OLD.date, 1, 7)", "-" + _workout_sets("OLD.uuid"))}
+    END
+    """,
+}
+
+
+def install_change_triggers(conn):
+    for ddl in CHANGE_TRIGGERS.values():
+        conn.exec_driver_sql(ddl)
+
+
+def rebuild_log_months(conn):
+    """Recount every month from the sets; the new random id makes the next refresh rewrite everything."""
+    conn.execute(delete(LogMonth))
+    conn.execute(insert(LogMonth).values(month="", sets=0, version=secrets.randbits(62)))
+    conn.execute(insert(LogMonth).from_select(
+        ["month", "sets", "version"],
+        select(month_of, func.count(Exercise.id), literal(1))
+        .join(Workout, Workout.uuid == Exercise.workout_uuid)
+        .group_by(month_of),
+    ))
+
+
+def month_fingerprints(conn) -> dict:
+    """Fingerprint of each month that has sets: this database's id and the month's change counter."""
+    rows = conn.execute(select(LogMonth.month, LogMonth.sets, LogMonth.version)).all()
+    log_id = next((version for month, _, version in rows if month == ""), None)
+    return {month: f"{log_id}:{version}" for month, sets, version in rows if month and sets > 0}
+
+
+def catalog_frame(conn) -> pd.DataFrame:
+    catalog = pd.read_sql(select(ExerciseCatalog.id, ExerciseCatalog.name), conn)
+    links = pd.read_sql(
+        select(ExerciseMuscleLink.exercise_id, MuscleGroup.name.label("muscle_group"))
+        .join(MuscleGroup, MuscleGroup.id == ExerciseMuscleLink.muscle_group_id)
+        .order_by(ExerciseMuscleLink.exercise_id, MuscleGroup.name),
+        conn,
+    )
+    groups = links.groupby("exercise_id")["muscle_group"].agg(", ".join)
+    catalog["muscle_groups"] = catalog["id"].map(groups)
+    return catalog.set_index("id")
+
+
+def _catalog_fingerprint(catalog: pd.DataFrame) -> str:
+    return hashlib.sha1(pd.util.hash_pandas_object(catalog).to_numpy().tobytes()).hexdigest()
+
+
+def _month_table(conn, month: str, catalog: pd.DataFrame) -> pa.Table:
+    df = pd.read_sql(
+        select(Exercise.id, Workout.date, Exercise.exercise_id, Exercise.set_number, Exercise.weight,
+               Exercise.reps, Exercise.duration, Exercise.rest, Exercise.note)
+        .join(Workout, Workout.uuid == Exercise.workout_uuid)
+        .where(Workout.date.between(f"{month}-01", f"{month}-31"))
+        .order_by(Workout.date, Exercise.id),
+        conn,
+    )
+    df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d").dt.date
+    df["exercise"] = df["exercise_id"].map(catalog["name"])
+    df["muscle_groups"] = df["exercise_id"].map(catalog["muscle_groups"])
+    for col in ("exercise", "muscle_groups"):
+        df[col] = df[col].astype("category")
+    return pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+
+def _write_atomic(snapshot_dir: str, name: str, write):
+    fd, tmp_path = tempfile.mkstemp(prefix=".partial-", dir=snapshot_dir)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, os.path.join(snapshot_dir, name))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_manifest(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[dict]:
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def refresh_snapshot(snapshot_dir: str = SNAPSHOT_DIR, full: bool = False) -> dict:
+    """Rewrite only the month files whose sets changed since the last refresh; returns the manifest."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest = read_manifest(snapshot_dir) or {}
+    generation = manifest.get("generation", 0)
+
+    with get_system_engine().connect() as conn:
+        catalog = catalog_frame(conn)
+    catalog_fp = _catalog_fingerprint(catalog)
+    if full or manifest.get("catalog") != catalog_fp:
+        manifest = {}  # names or muscle groups changed; every month embeds them
+
+    previous = manifest.get("months", {})
+    months = {}
+    written = []
+    with get_user_engine().connect() as conn:
+        for month, fp in sorted(month_fingerprints(conn).items()):
+            name = f"month={month}.parquet"
+            entry = previous.get(month)
+            if entry is None or entry["fingerprint"] != fp or not os.path.exists(os.path.join(snapshot_dir, name)):
+                table = _month_table(conn, month, catalog)
+                _write_atomic(snapshot_dir, name, lambda path: pq.write_table(table, path))
+                entry = {"file": name, "fingerprint": fp, "rows": table.num_rows}
+                written.append(month)
+            months[month] = entry
+
+    manifest = {
+        "generation": generation + (1 if written or months.keys() != previous.keys() else 0),
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "catalog": catalog_fp,
+        "months": months,
+        "written": written,
+    }
+    _write_atomic(snapshot_dir, MANIFEST, lambda path: _dump_json(manifest, path))
+
+    # Drop months that no longer have any sets
+    for month, entry in previous.items():
+        if month not in months:
+            try:
+                os.remove(os.path.join(snapshot_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+    return manifest
+
+
+def _dump_json(obj, path):
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=2)
+
+
+def load_snapshot(columns: Optional[Sequence[str]] = None,
+                  start: Optional[date] = None,
+                  end: Optional[date] = None,
+                  snapshot_dir: str = SNAPSHOT_DIR) -> pd.DataFrame:
+    """Read the snapshot memory-mapped, touching only `columns` and the months overlapping [start, end]."""
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"no log snapshot in {snapshot_dir}; run `python main.py snapshot`")
+
+    first = start.strftime("%Y-%m") if start else None
+    last = end.strftime("%Y-%m") if end else None
+    tables = [
+        pq.read_table(os.path.join(snapshot_dir, entry["file"]), columns=columns, memory_map=True)
+        for month, entry in sorted(manifest["months"].items())
+        if (first is None or month >= first) and (last is None or month <= last)
+    ]
+    if not tables:
+        return _to_pandas(SCHEMA.empty_table().select(columns or SCHEMA.names))
+
+    # Month files carry their own dictionaries; unify so categoricals line up
+    table = pa.concat_tables(tables).unify_dictionaries()
+    if "date" in table.column_names:
+        if start is not None:
+            table = table.filter(pc.field("date") >= pa.scalar(start, pa.date32()))
+        if end is not None:
+            table = table.filter(pc.field("date") <= pa.scalar(end, pa.date32()))
+    return _to_pandas(table)
+
+
+def _to_pandas(table: pa.Table) -> pd.DataFrame:
+    return table.to_pandas(date_as_object=False, types_mapper=NULLABLE_INTS.get)
+
+
+def daily_exercise_volume(df: pd.DataFrame) -> pd.DataFrame:
+    """The snapshot equivalent of aggregates.daily_exercise_volume_query, from date/exercise/weight/reps."""
+    volume = (df["weight"] * df["reps"]).fillna(0)
+    return (
+        volume.groupby([df["date"], df["exercise"]], observed=True).sum()
+        .rename("Volume")
+        .reset_index()
+        .rename(columns={"date": "Date", "exercise": "Exercise"})
+    )
@@ -0,0 +1,427 @@
+import hashlib
+import json
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlalchemy.dialects.sqlite import insert as upsert
+from sqlmodel import select
+
+import columnar
+from bulk_import import SET_COLUMNS, _records
+from records import refresh_dirty_records
+from system_models import Equipment, MuscleGroup, ExerciseCatalog, ExerciseMuscleLink
+from system_models import SyncFingerprint as SystemFingerprint
+from user_models import Workout, Exercise, WorkoutSequence
+from user_models import SyncFingerprint as UserFingerprint
+
+# Incremental import of the YAML configs into system.db and the CSV log into
+# user_log.db. Each source row is fingerprinted by a hash of its content and the
+# hashes are stored next to the data in sync_fingerprints, so a run only inserts,
+# updates or deletes the rows whose hash is new, changed or gone; a hash of the
+# whole file short-circuits an unchanged source. Sync only touches rows it created
+# or adopted from an earlier seed (sets flagged `seeded`, config rows by name),
+# never sets entered in the app, and never deletes a config row something still
+# references. Rollups and records follow through their triggers.
+
+FILE_KEY = ""
+LOG_COLUMNS = ["date", "exercise"] + SET_COLUMNS
+CHUNK = 500
+
+
+def content_digest(value) -> int:
+    """Signed 64-bit hash of a JSON-serializable value, the width SQLite stores as INTEGER."""
+    data = json.dumps(value, sort_keys=True, default=str).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True)
+
+
+def file_digest(path: str) -> int:
+    h = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return int.from_bytes(h.digest(), "big", signed=True)
+
+
+def _chunks(values):
+    for start in range(0, len(values), CHUNK):
+        yield values[start:start + CHUNK]
+
+
+def _stored(conn, model, source: str) -> pd.DataFrame:
+    keys, digests, row_ids = columnar.fetch_columns(
+        conn, select(model.key, model.digest, model.row_id)
+        .where(model.source == source, model.key != FILE_KEY))
+    return pd.DataFrame({"key": pd.Series(keys, dtype=object),
+                         "stored_digest": np.array(digests, dtype=np.int64),
+                         "row_id": columnar.float_column(row_ids)})
+
+
+def _file_unchanged(conn, model, source: str, digest: int) -> bool:
+    stored = conn.execute(select(model.digest).where(model.source == source, model.key == FILE_KEY)).scalar()
+    return stored == digest
+
+
+def _save(conn, model, source: str, rows: pd.DataFrame, deleted_keys, digest: Optional[int]):
+    """Upsert (key, digest, row_id) fingerprints, drop deleted keys and record the file hash."""
+    for chunk in _chunks(deleted_keys):
+        conn.execute(delete(model).where(model.source == source, model.key.in_(chunk)))
+    rows = _records(rows.assign(source=source)[["source", "key", "digest", "row_id"]])
+    if digest is not None:
+        rows.append({"source": source, "key": FILE_KEY, "digest": digest, "row_id": None})
+    if rows:
+        stmt = upsert(model)
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=[model.source, model.key],
+            set_={"digest": stmt.excluded.digest, "row_id": stmt.excluded.row_id}), rows)
+
+
+def _diff(current: pd.DataFrame, stored: pd.DataFrame):
+    """(new or changed rows with their stored row_id, keys no longer in the source)."""
+    merged = current.merge(stored, on="key", how="left")
+    changed = merged[merged["stored_digest"].isna() | (merged["digest"] != merged["stored_digest"])]
+    deleted = stored.loc[~stored["key"].isin(current["key"]), ["key", "row_id"]]
+    return changed.drop(columns="stored_digest"), deleted
+
+
+# ---------------- system.db ----------------
+
+def _sync_entries(conn, source: str, entries: List[dict], key_field: str, model, row_values,
+                  after_write=None, force=False) -> Tuple[dict, pd.DataFrame]:
+    """Upsert one config file's entries into `model` by name; `row_values(entry)` gives the row's columns.
+
+    Returns the counts and the (key, row_id) of entries gone from the file, for
+    _delete_entries to remove once every file has been applied.
+    """
+    digest = file_digest(source)
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "kept": 0}
+    if not force and _file_unchanged(conn, SystemFingerprint, source, digest):
+        return stats, pd.DataFrame({"key": [], "row_id": []})
+
+    current = pd.DataFrame({
+        "key": [entry[key_field] for entry in entries],
+        "digest": np.array([content_digest(entry) for entry in entries], dtype=np.int64),
+    }).drop_duplicates("key", keep="last")
+    stored = _stored(conn, SystemFingerprint, source)
+    changed, deleted = _diff(current, stored)
+
+    # Entries seeded before sync existed are adopted by name instead of duplicated
+    by_name = dict(conn.execute(select(model.name, model.id)).all())
+    by_key = {entry[key_field]: entry for entry in entries}
+    row_ids = []
+    for key, row_id in zip(changed["key"], changed["row_id"]):
+        row_id = int(row_id) if pd.notna(row_id) else by_name.get(key)
+        values = row_values(by_key[key])
+        if row_id is None:
+            row_id = conn.execute(insert(model).values(name=key, **values)).inserted_primary_key[0]
+            stats["inserted"] += 1
+        else:
+            conn.execute(update(model).where(model.id == row_id).values(name=key, **values))
+            stats["updated"] += 1
+        if after_write:
+            after_write(conn, row_id, by_key[key])
+        row_ids.append(row_id)
+
+    _save(conn, SystemFingerprint, source, changed[["key", "digest"]].assign(row_id=row_ids), [], digest)
+    return stats, deleted
+
+
+def _delete_entries(conn, source: str, model, deleted: pd.DataFrame, in_use, stats: dict):
+    """Delete rows whose entries left the config, except those `in_use(ids)` says are still referenced.
+
+    A referenced row is kept as it is and stops being managed by sync; putting the
+    entry back in the file adopts it again by name.
+    """
+    gone = [int(r) for r in deleted["row_id"].dropna()]
+    kept = set()
+    for chunk in _chunks(gone):
+        kept.update(in_use(chunk))
+        chunk = [row_id for row_id in chunk if row_id not in kept]
+        if model is ExerciseCatalog:
+            conn.execute(delete(ExerciseMuscleLink).where(ExerciseMuscleLink.exercise_id.in_(chunk)))
+        elif model is MuscleGroup:
+            conn.execute(delete(ExerciseMuscleLink).where(ExerciseMuscleLink.muscle_group_id.in_(chunk)))
+        conn.execute(delete(model).where(model.id.in_(chunk)))
+    for chunk in _chunks(deleted["key"].tolist()):
+        conn.execute(delete(SystemFingerprint).where(SystemFingerprint.source == source,
+                                                     SystemFingerprint.key.in_(chunk)))
+    stats["kept"] = len(kept)
+    stats["deleted"] = len(deleted) - len(kept)
+
+
+def sync_system_db(system_engine,
+                   equipment_yaml="config/equipment.yaml",
+                   muscle_groups_yaml="config/muscle_groups.yaml",
+                   catalog_yaml="config/default_catalog.yaml",
+                   force=False,
+                   user_engine=None) -> dict:
+    """Bring equipment, muscle groups and the catalog in line with the YAML configs.
+
+    Entries removed from a file are deleted only when nothing references them:
+    equipment still used by a catalog entry, or (given `user_engine`) an exercise
+    with logged sets, is kept. Without `user_engine` removed exercises are always kept.
+    """
+    def load(path):
+        with open(path) as f:
+            return yaml.safe_load(f) or []
+
+    def logged(ids):
+        if user_engine is None:
+            return set(ids)
+        with user_engine.connect() as user_conn:
+            return set(user_conn.execute(
+                select(Exercise.exercise_id).distinct().where(Exercise.exercise_id.in_(ids))).scalars())
+
+    stats = {}
+    with system_engine.begin() as conn:
+        stats["equipment"], equipment_gone = _sync_entries(
+            conn, equipment_yaml, load(equipment_yaml), "name", Equipment,
+            lambda item: {
+                "default_weight": item.get("default_weight", 0.0),
+                "track_weight": item.get("track_weight", True),
+                "has_resistance_levels": item.get("has_resistance_levels", False),
+            },
+            force=force)
+
+        stats["muscle_groups"], muscle_groups_gone = _sync_entries(
+            conn, muscle_groups_yaml, [{"name": name} for name in load(muscle_groups_yaml)], "name",
+            MuscleGroup, lambda item: {}, force=force)
+
+        equipment_ids = dict(conn.execute(select(Equipment.name, Equipment.id)).all())
+        muscle_ids = dict(conn.execute(select(MuscleGroup.name, MuscleGroup.id)).all())
+
+        def replace_links(conn, exercise_id, entry):
+            conn.execute(delete(ExerciseMuscleLink).where(ExerciseMuscleLink.exercise_id == exercise_id))
+            links = [{"exercise_id": exercise_id, "muscle_group_id": muscle_ids[muscle]}
+                     for muscle in dict.fromkeys(entry.get("muscle_groups", [])) if muscle in muscle_ids]
+            if links:
+                conn.execute(insert(ExerciseMuscleLink), links)
+
+        stats["catalog"], catalog_gone = _sync_entries(
+            conn, catalog_yaml, load(catalog_yaml), "exercise", ExerciseCatalog,
+            lambda entry: {
+                "equipment_id": equipment_ids.get(entry.get("equipment")),
+                "weight": entry.get("weight", 0.0),
+                "measured_by": entry.get("measured_by", "Reps"),
+            },
+            after_write=replace_links, force=force)
+
+        # Deletes last and dependents first, so equipment the new catalog stopped using can go
+        _delete_entries(conn, catalog_yaml, ExerciseCatalog, catalog_gone, logged, stats["catalog"])
+        _delete_entries(conn, muscle_groups_yaml, MuscleGroup, muscle_groups_gone, lambda ids: set(),
+                        stats["muscle_groups"])
+        _delete_entries(conn, equipment_yaml, Equipment, equipment_gone,
+                        lambda ids: set(conn.execute(select(ExerciseCatalog.equipment_id).distinct()
+                                                     .where(ExerciseCatalog.equipment_id.in_(ids))).scalars()),
+                        stats["equipment"])
+    return stats
+
+
+# ---------------- user_log.db ----------------
+
+def read_log(csv_path: str) -> pd.DataFrame:
+    """The CSV as text with a content digest per row, keyed by its id column if it has one.
+
+    Without ids a row is keyed by date, exercise, set number and which repeat of
+    those it is, so inserting or deleting a line doesn't shift every key after it.
+    """
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    df = df.reindex(columns=["id"] + LOG_COLUMNS, fill_value="")
+    keys = df["id"]
+    if (keys == "").any():
+        occurrence = df.groupby(["date", "exercise", "set_number"]).cumcount().astype(str)
+        natural = df["date"] + "|" + df["exercise"] + "|" + df["set_number"] + "|" + occurrence
+        keys = keys.where(keys != "", natural)
+    digests = pd.util.hash_pandas_object(df[LOG_COLUMNS], index=False).to_numpy().view(np.int64)
+    return df[LOG_COLUMNS].assign(key=keys.to_numpy(), digest=digests).drop_duplicates("key", keep="last")
+
+
+def _typed_sets(rows: pd.DataFrame, catalog_ids: Dict[str, int]) -> pd.DataFrame:
+    """CSV text -> the values bulk_import would store; unknown exercises get a NaN exercise_id."""
+    def number(col):
+        return pd.to_numeric(rows[col].replace("", np.nan), errors="coerce")
+
+    csv_dates = rows["date"].drop_duplicates()
+    iso = dict(zip(csv_dates, pd.to_datetime(csv_dates, format="%m/%d/%Y").dt.strftime("%Y-%m-%d")))
+    return pd.DataFrame({
+        "key": rows["key"].to_numpy(),
+        "digest": rows["digest"].to_numpy(),
+        "row_id": rows["row_id"].to_numpy() if "row_id" in rows else np.nan,
+        "csv_date": rows["date"].to_numpy(),
+        "date": rows["date"].map(iso).to_numpy(),
+        "exercise": rows["exercise"].to_numpy(),
+        "exercise_id": rows["exercise"].map(catalog_ids).to_numpy(dtype=np.float64),
+        **{col: number(col).to_numpy() for col in ["set_number", "weight", "reps", "duration", "rest"]},
+        "note": rows["note"].replace("", None).to_numpy(dtype=object),
+    })
+
+
+def _existing_sets(conn) -> pd.DataFrame:
+    ids, dates, exercise_ids, set_numbers, *values = columnar.fetch_columns(
+        conn, select(Exercise.id, Workout.date, Exercise.exercise_id, Exercise.set_number,
+                     Exercise.weight, Exercise.reps, Exercise.duration, Exercise.rest, Exercise.note)
+        .join(Workout, Workout.uuid == Exercise.workout_uuid).where(Exercise.seeded).order_by(Exercise.id))
+    return pd.DataFrame({
+        "row_id": np.array(ids, dtype=np.float64),
+        "date": pd.Series(dates, dtype=object),
+        "exercise_id": np.array(exercise_ids, dtype=np.float64),
+        "set_number": columnar.float_column(set_numbers),
+        **{col: (pd.Series(v, dtype=object) if col == "note" else columnar.float_column(v))
+           for col, v in zip(["weight", "reps", "duration", "rest", "note"], values)},
+    })
+
+
+def _adopt(conn, sets: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Match sets to rows a seed imported before sync existed, by date, exercise and set number.
+
+    Only sets flagged `seeded` are candidates; sets entered in the app are never adopted.
+
+    Returns the sets with `row_id` filled in where matched, and a mask of the
+    matched sets whose stored values already equal the source's.
+    """
+    existing = _existing_sets(conn)
+    natural = ["date", "exercise_id", "set_number"]
+    existing["occurrence"] = existing.groupby(natural, dropna=False).cumcount()
+    sets = sets.assign(occurrence=sets.groupby(natural, dropna=False).cumcount())
+    matched = sets.drop(columns="row_id").merge(existing, on=natural + ["occurrence"], how="left",
+                                                suffixes=("", "_stored"))
+
+    same = matched["row_id"].notna().to_numpy().copy()
+    for col in ["weight", "reps", "duration", "rest"]:
+        a = matched[col].to_numpy(dtype=np.float64)
+        b = matched[f"{col}_stored"].to_numpy(dtype=np.float64)
+        same &= (a == b) | (np.isnan(a) & np.isnan(b))
+    notes = [matched[col].astype(object).where(matched[col].notna(), "") for col in ("note", "note_stored")]
+    same &= (notes[0] == notes[1]).to_numpy()
+    return matched[sets.columns.drop("occurrence")], same
+
+
+def _workout_uuids(conn, sets: pd.DataFrame) -> pd.Series:
+    """Workout uuid for each set's date, creating missing workouts as bulk_import does."""
+    known = dict(conn.execute(select(Workout.date, Workout.uuid)).all())
+    new = sets.drop_duplicates("date")
+    new = new[~new["date"].isin(known.keys())]
+    if not new.empty:
+        workouts = pd.DataFrame({
+            "uuid": [str(uuid.uuid5(uuid.NAMESPACE_DNS, d)) for d in new["csv_date"]],
+            "date": new["date"].to_numpy(),
+        })
+        conn.execute(insert(Workout), _records(workouts))
+        known.update(zip(workouts["date"], workouts["uuid"]))
+    return sets["date"].map(known)
+
+
+def _sequence_new_pairs(conn, sets: pd.DataFrame):
+    """Give (workout, exercise) pairs not yet sequenced the next numbers, by name as bulk_import does."""
+    sequenced = pd.DataFrame(conn.execute(
+        select(WorkoutSequence.workout_uuid, WorkoutSequence.exercise_id, WorkoutSequence.sequence_number)
+        .where(WorkoutSequence.workout_uuid.in_(sets["workout_uuid"].unique().tolist()))).all(),
+        columns=["workout_uuid", "exercise_id", "sequence_number"])
+    pairs = (sets[["workout_uuid", "exercise", "exercise_id"]]
+             .drop_duplicates(["workout_uuid", "exercise_id"])
+             .merge(sequenced[["workout_uuid", "exercise_id"]], how="left", indicator=True))
+    pairs = pairs[pairs["_merge"] == "left_only"].sort_values(["workout_uuid", "exercise"])
+    if pairs.empty:
+        return
+    offsets = pairs["workout_uuid"].map(sequenced.groupby("workout_uuid")["sequence_number"].max()).fillna(0)
+    pairs["sequence_number"] = offsets.astype(int) + pairs.groupby("workout_uuid").cumcount() + 1
+    conn.execute(insert(WorkoutSequence), _records(pairs[["workout_uuid", "exercise_id", "sequence_number"]]))
+
+
+def _prune(conn, workout_uuids):
+    """Drop sequence entries and workouts left without sets by updates and deletes."""
+    for chunk in _chunks(workout_uuids):
+        has_sets = (select(Exercise.id).where(Exercise.workout_uuid == WorkoutSequence.workout_uuid,
+                                              Exercise.exercise_id == WorkoutSequence.exercise_id).exists())
+        conn.execute(delete(WorkoutSequence).where(WorkoutSequence.workout_uuid.in_(chunk), ~has_sets))
+        conn.execute(delete(Workout).where(
+            Workout.uuid.in_(chunk), ~select(Exercise.id).where(Exercise.workout_uuid == Workout.uuid).exists()))
+
+
+def sync_user_log(user_engine, system_engine, csv_path="exercises_clean.csv", force=False) -> dict:
+    """Apply the CSV's new, changed and removed rows to the log."""
+    started = time.perf_counter()
+    digest = file_digest(csv_path)
+    stats = {"inserted": 0, "updated": 0, "deleted": 0, "skipped": 0, "unchanged": 0, "unknown": {}}
+
+    with user_engine.begin() as conn:
+        # Take the write lock up front: pysqlite would only begin at the first DML,
+        # after the diff was read, and the id bookkeeping below relies on no other
+        # writer inserting sets in between
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if not force and _file_unchanged(conn, UserFingerprint, csv_path, digest):
+            return {**stats, "seconds": time.perf_counter() - started}
+
+        with system_engine.connect() as system_conn:
+            catalog_ids = dict(system_conn.execute(select(ExerciseCatalog.name, ExerciseCatalog.id)).all())
+
+        source = read_log(csv_path)
+        stored = _stored(conn, UserFingerprint, csv_path)
+        changed, deleted = _diff(source, stored)
+        sets = _typed_sets(changed, catalog_ids)
+
+        # Rows naming an exercise the catalog doesn't have are skipped, and removed
+        # if an edit is what made them unknown
+        unknown = sets["exercise_id"].isna()
+        stats["skipped"] = int(unknown.sum())
+        stats["unknown"] = {name: int(n) for name, n in sets.loc[unknown, "exercise"].value_counts().items()}
+        deleted = pd.concat([deleted, sets.loc[unknown & sets["row_id"].notna(), ["key", "row_id"]]])
+        sets = sets[~unknown].reset_index(drop=True)
+
+        same = np.zeros(len(sets), dtype=bool)
+        if stored.empty and len(sets):
+            sets, same = _adopt(conn, sets)
+            stats["unchanged"] = int(same.sum())
+
+        old_workouts = []
+        if len(sets):
+            sets["workout_uuid"] = _workout_uuids(conn, sets).to_numpy()
+            sets["exercise_id"] = sets["exercise_id"].astype(int)
+            _sequence_new_pairs(conn, sets)
+
+            to_update = sets[sets["row_id"].notna() & ~same]
+            if len(to_update):
+                for chunk in _chunks(to_update["row_id"].astype(int).tolist()):
+                    old_workouts += conn.execute(
+                        select(Exercise.workout_uuid).distinct().where(Exercise.id.in_(chunk))).scalars().all()
+                rows = _records(to_update[["row_id", "workout_uuid", "exercise_id"] + SET_COLUMNS]
+                                .rename(columns={"row_id": "b_id"}).astype({"b_id": int}))
+                conn.execute(update(Exercise).where(Exercise.id == bindparam("b_id"), Exercise.seeded), rows)
+                stats["updated"] = len(to_update)
+
+            to_insert = sets["row_id"].isna()
+            if to_insert.any():
+                # SQLite assigns the ids; the BEGIN IMMEDIATE above holds the write lock,
+                # so the new rows are exactly those past the old maximum, in insertion order
+                # (RETURNING in parameter order would cost one statement per row)
+                rows = sets.loc[to_insert, ["workout_uuid", "exercise_id"] + SET_COLUMNS].assign(seeded=True)
+                last_id = conn.execute(select(func.max(Exercise.id))).scalar() or 0
+                conn.execute(insert(Exercise), _records(rows))
+                new_ids = conn.execute(select(Exercise.id).where(Exercise.id > last_id).order_by(Exercise.id)).scalars().all()
+                if len(new_ids) != len(rows):
+                    raise RuntimeError(f"expected {len(rows)} new sets, found {len(new_ids)}")
+                sets.loc[to_insert, "row_id"] = new_ids
+                stats["inserted"] = len(rows)
+
+        for chunk in _chunks(deleted["row_id"].dropna().astype(int).tolist()):
+            old_workouts += conn.execute(
+                select(Exercise.workout_uuid).distinct().where(Exercise.id.in_(chunk))).scalars().all()
+            conn.execute(delete(Exercise).where(Exercise.id.in_(chunk), Exercise.seeded))
+        stats["deleted"] = len(deleted)
+        _prune(conn, list(dict.fromkeys(old_workouts)))
+
+        _save(conn, UserFingerprint, csv_path, sets[["key", "digest", "row_id"]].astype({"row_id": int}),
+              deleted["key"].tolist(), digest)
+        # Updates and deletes only mark records dirty; settle them here rather than on the first read
+        refresh_dirty_records(conn)
+
+    return {**stats, "seconds": time.perf_counter() - started}
+
+
+def sync_all(system_engine, user_engine, force=False) -> dict:
+    return {"system": sync_system_db(system_engine, force=force, user_engine=user_engine),
+            "log": sync_user_log(user_engine, system_engine, force=force)}
@@ -0,0 +1,96 @@
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# Exercises trained one side at a time are logged as alternating Left/Right sets
+UNILATERAL_MARKERS = ("One Arm", "Single", "Bulgarian", "Lunge")
+
+BASE_WEIGHTS = {"Barbell": 95.0, "Dumbbell": 20.0, "Machine": 50.0, "Cable": 30.0, "Bodyweight": 0.0}
+
+
+def generate_log(n_sets: int,
+                 catalog_yaml: str = "config/default_catalog.yaml",
+                 start: date = date(2020, 1, 6),
+                 exercises_per_workout=(3, 6),
+                 sets_per_exercise=(2, 5),
+                 max_years: float = 10.0,
+                 seed: int = 0) -> pd.DataFrame:
+    """A multi-year synthetic log with exactly `n_sets` rows, in the exercises_clean.csv layout."""
+    rng = np.random.default_rng(seed)
+    with open(catalog_yaml) as f:
+        catalog = yaml.safe_load(f)
+
+    names = np.array([e["exercise"] for e in catalog])
+    by_duration = np.array([e.get("measured_by", "Reps") == "Duration" for e in catalog])
+    unilateral = np.array([any(m in e["exercise"] for m in UNILATERAL_MARKERS) for e in catalog])
+    base_weight = np.array([BASE_WEIGHTS.get(e["equipment"], 0.0) for e in catalog])
+
+    # Exercise blocks (one exercise within one workout) until we have enough sets
+    block_sizes = rng.integers(sets_per_exercise[0], sets_per_exercise[1] + 1,
+                               size=n_sets // sets_per_exercise[0] + 1)
+    n_blocks = int(np.searchsorted(np.cumsum(block_sizes), n_sets)) + 1
+    block_sizes = block_sizes[:n_blocks]
+    block_sizes[-1] -= block_sizes.sum() - n_sets
+    block_exercise = rng.integers(0, len(catalog), size=n_blocks)
+
+    # Group blocks into workouts, one every 1-3 days. Very large logs are squeezed
+    # into `max_years`, so several sessions can land on (and merge into) one date.
+    workout_sizes = rng.integers(exercises_per_workout[0], exercises_per_workout[1] + 1, size=n_blocks)
+    block_workout = np.repeat(np.arange(n_blocks), workout_sizes)[:n_blocks]
+    n_workouts = int(block_workout[-1]) + 1
+    day_offsets = np.cumsum(rng.integers(1, 4, size=n_workouts)) - 1
+    max_days = int(max_years * 365)
+    if day_offsets[-1] > max_days:
+        day_offsets = day_offsets * max_days // day_offsets[-1]
+    workout_dates = (pd.Timestamp(start) + pd.to_timedelta(day_offsets, unit="D")).strftime("%m/%d/%Y")
+
+    row_block = np.repeat(np.arange(n_blocks), block_sizes)
+    block_start = np.cumsum(block_sizes) - block_sizes
+    set_number = np.arange(n_sets) - block_start[row_block] + 1
+    exercise = block_exercise[row_block]
+    workout = block_workout[row_block]
+
+    # Slow linear progression over the whole log, rounded to 2.5 lb plates
+    progress = 1.0 + workout / max(n_workouts, 1)
+    weight = np.round(base_weight[exercise] * progress * rng.uniform(0.85, 1.05, size=n_sets) / 2.5) * 2.5
+
+    is_duration = by_duration[exercise]
+    reps = np.where(is_duration, np.nan, rng.integers(5, 13, size=n_sets))
+    duration = np.where(is_duration, rng.integers(20, 91, size=n_sets), np.nan)
+
+    note = np.full(n_sets, None, dtype=object)
+    rir = rng.random(n_sets) < 0.1
+    note[rir] = np.char.add("RIR = ", rng.integers(0, 4, size=int(rir.sum())).astype(str))
+    side = unilateral[exercise]
+    note[side] = np.where(set_number[side] % 2 == 1, "Left", "Right")
+
+    return pd.DataFrame({
+        "id": np.arange(1, n_sets + 1),
+        "date": workout_dates[workout],
+        "exercise": names[exercise],
+        "set_number": set_number,
+        "weight": weight,
+        "reps": pd.array(reps, dtype="Int64"),
+        "duration": pd.array(duration, dtype="Int64"),
+        "rest": rng.choice([30, 60, 90, 120], size=n_sets),
+        "note": note,
+    })
+
+
+def write_log_csv(path: str, n_sets: int, **kwargs) -> str:
+    generate_log(n_sets, **kwargs).to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic workout log CSV")
+    parser.add_argument("n_sets", type=int)
+    parser.add_argument("--out", default="synthetic_log.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_log_csv(args.out, args.n_sets, seed=args.seed)
+    print(f"Wrote {args.n_sets} sets to {args.out}")
@@ -54,5 +54,15 @@ class ExerciseCatalog(SystemBase, table=True):
     muscle_links: List[ExerciseMuscleLink] = Relationship(back_populates="exercise")
 
 
+class SyncFingerprint(SystemBase, table=True):
+    __tablename__ = "sync_fingerprints"
+    # Content hash of each config entry imported by sync.py and the row it became;
+    # key "" holds the hash of the whole config file
+    source: str = Field(primary_key=True)
+    key: str = Field(primary_key=True)
+    digest: int
+    row_id: Optional[int] = None
+
+
 def create_all_system_tables(engine):
     system_metadata.create_all(engine)
\ No newline at end of file
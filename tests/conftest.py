@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cache  # noqa: E402
+import catalog  # noqa: E402
+import db  # noqa: E402
+import engines  # noqa: E402
+from instrumentation import recorder as _recorder  # noqa: E402
+
+
+@pytest.fixture
+def recorder():
+    _recorder.reset()
+    _recorder.enable()
+    yield _recorder
+    _recorder.disable()
+    _recorder.reset()
+
+
+def _release():
+    # Engines, pools and data_version watchers hold connections to whichever
+    # directory was current when they opened, as in benchmark.Workspace
+    engines.dispose_all()
+    db.user_pool.close_all()
+    db.system_pool.close_all()
+    cache.reset_all()
+    catalog.reset()
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """An empty directory with the config files, where the app's relative database paths resolve."""
+    shutil.copytree(os.path.join(ROOT, "config"), tmp_path / "config")
+    _release()
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    _release()
+
+
+@pytest.fixture
+def small_log(workspace):
+    """A migrated log of eight sets over three workouts, two in the same month, written through apply_log_diff."""
+    import migrations
+    from logic import UserService
+
+    migrations.migrate_databases()
+    with engines.get_user_engine().begin() as conn:
+        conn.exec_driver_sql("INSERT INTO workouts VALUES ('a', '2025-03-30'), ('b', '2025-04-07'), ('c', '2025-04-09')")
+    sets = [
+        ("a", 1, 1, 100.0, 5), ("a", 1, 2, 110.0, 3), ("a", 2, 1, 60.0, 10),
+        ("b", 1, 1, 115.0, 3), ("b", 1, 2, 100.0, 8), ("b", 2, 1, 62.5, 8),
+        ("c", 2, 1, 65.0, 1), ("c", 3, 1, None, None),
+    ]
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(inserts=[
+            {"workout_uuid": w, "exercise_id": e, "set_number": n, "weight": weight, "reps": reps}
+            for w, e, n, weight, reps in sets])
+    with engines.get_user_engine().connect() as conn:
+        return [row_id for (row_id,) in conn.exec_driver_sql("SELECT id FROM exercises ORDER BY id")]
+
+
+@pytest.fixture
+def make_gif(tmp_path):
+    """Writes an animated GIF of `frames` solid-colour frames and returns its path."""
+    from PIL import Image
+
+    def make(name="clip.gif", frames=6, size=(32, 24), shade=0):
+        images = [Image.new("RGB", size, color=(40 * i % 256, 25 * shade % 256, 128)) for i in range(frames)]
+        path = str(tmp_path / name)
+        images[0].save(path, save_all=True, append_images=images[1:], duration=100, loop=0)
+        return path
+    return make
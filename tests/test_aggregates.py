@@ -0,0 +1,69 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import engines
+import logic
+from bulk_import import bulk_import_user_log, bulk_seed_system_db
+from migrations import migrate_databases
+from synthetic import write_log_csv
+
+
+@pytest.fixture
+def log(workspace):
+    migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    # Enough sets for duration-only exercises (NULL reps) and several sets per date
+    bulk_import_user_log(engines.get_user_engine(), engines.get_system_engine(),
+                         write_log_csv("log.csv", 600, seed=3))
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("INSERT INTO workouts VALUES ('no-sets', '2030-01-01')")
+    return workspace
+
+
+def test_workout_volume_matches_the_per_workout_loop(log):
+    # The N+1 loop get_plotly_volume_chart used to run
+    with logic.UserService() as usr_svc:
+        expected = pd.DataFrame([
+            {"Date": w.date, "Workout": w.uuid[:8],
+             "Volume": sum((e.weight or 0) * (e.reps or 0) for e in usr_svc.get_exercises_for_workout(w.uuid))}
+            for w in usr_svc.get_all_workouts()])
+        actual = usr_svc.get_workout_volume_df()
+
+    key = ["Date", "Workout"]
+    actual = actual[key + ["Volume"]].sort_values(key, ignore_index=True)
+    expected = expected.sort_values(key, ignore_index=True)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    assert actual.loc[actual["Date"] == "2030-01-01", "Volume"].tolist() == [0]
+
+
+def test_daily_exercise_volume_matches_a_groupby_over_every_set(log):
+    sets = logic.get_all_exercises_df()
+    sets["Exercise"] = sets["Exercise"].astype(str)
+    sets["Volume"] = sets["Weight"] * sets["Reps"].astype("float64")
+    expected = sets.groupby(["Date", "Exercise"], as_index=False).agg(
+        Volume=("Volume", "sum"), Sets=("Set", "size"), Reps=("Reps", "sum"))
+
+    with logic.UserService() as usr_svc:
+        actual = usr_svc.get_daily_exercise_volume_df()
+    actual["Date"] = pd.to_datetime(actual["Date"], format="%Y-%m-%d")
+
+    key = ["Date", "Exercise"]
+    actual = actual[key + ["Volume", "Sets", "Reps"]].sort_values(key, ignore_index=True)
+    expected = expected.sort_values(key, ignore_index=True)
+    np.testing.assert_allclose(actual["Volume"], expected["Volume"])
+    pd.testing.assert_frame_equal(actual[key + ["Sets", "Reps"]], expected[key + ["Sets", "Reps"]],
+                                  check_dtype=False)
+
+
+def test_volume_chart_plots_the_daily_totals(log):
+    with logic.UserService() as usr_svc:
+        daily = usr_svc.get_daily_exercise_volume_df()
+
+    figure = logic.get_plotly_volume_chart()
+
+    assert {trace.name for trace in figure.data} == set(daily["Exercise"])
+    assert sum(len(trace.x) for trace in figure.data) == len(daily)
+    assert sum(trace.y.sum() for trace in figure.data) == pytest.approx(daily["Volume"].sum())
@@ -0,0 +1,52 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import db
+from logic import UserService
+
+
+def log_rows(sql):
+    with sqlite3.connect("user_log.db") as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_a_log_diff_is_applied_in_one_commit(small_log):
+    ids = small_log
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(inserts=[{"workout_uuid": "c", "exercise_id": 3, "set_number": 2}],
+                               updates=[{"id": ids[0], "reps": 6}],
+                               deletes=[ids[7]])
+
+    assert log_rows(f"SELECT reps FROM exercises WHERE id = {ids[0]}") == [(6,)]
+    assert log_rows("SELECT exercise_id, set_number FROM exercises WHERE workout_uuid = 'c' ORDER BY id") == [
+        (2, 1), (3, 2)]
+
+
+def test_a_failing_log_diff_changes_nothing(small_log):
+    ids = small_log
+    before = log_rows("SELECT * FROM exercises ORDER BY id")
+    rollup = log_rows("SELECT * FROM exercise_rollup ORDER BY date, exercise_id")
+
+    with UserService() as usr_svc, pytest.raises(IntegrityError):
+        usr_svc.apply_log_diff(inserts=[{"workout_uuid": "c", "exercise_id": 3, "set_number": None}],
+                               updates=[{"id": ids[0], "reps": 6}],
+                               deletes=[ids[1]])
+
+    assert log_rows("SELECT * FROM exercises ORDER BY id") == before
+    assert log_rows("SELECT * FROM exercise_rollup ORDER BY date, exercise_id") == rollup
+
+
+def test_legacy_log_changes_are_all_or_nothing(workspace):
+    db.create_tables()
+    db.insert_exercises([("04/07/2025", "Bench Press", n, 100.0, 5, None, 90, "") for n in (1, 2)])
+    log = db.get_exercise_log()
+    before = log_rows("SELECT * FROM exercises ORDER BY id")
+
+    # Inserts run last: a malformed one fails after the update and delete went through
+    with pytest.raises(sqlite3.ProgrammingError):
+        db.apply_log_changes(updates=[{**log.iloc[0], "Reps": 6}], deletes=[int(log["id"].iloc[1])],
+                             inserts=[("04/07/2025", "Bench Press")])
+
+    assert log_rows("SELECT * FROM exercises ORDER BY id") == before
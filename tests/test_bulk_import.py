@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+import engines
+import migrations
+from bulk_import import bulk_import_user_log, bulk_seed_system_db
+from seed import seed_user_db
+from synthetic import write_log_csv
+
+TABLES = {
+    "workouts": "SELECT uuid, date FROM workouts ORDER BY uuid",
+    "workout_sequence": "SELECT * FROM workout_sequence ORDER BY workout_uuid, exercise_id",
+    "exercises": "SELECT workout_uuid, exercise_id, set_number, weight, reps, duration, rest, note "
+                 "FROM exercises ORDER BY workout_uuid, exercise_id, set_number, id",
+}
+
+
+def contents():
+    with sqlite3.connect("user_log.db") as conn:
+        return {table: conn.execute(sql).fetchall() for table, sql in TABLES.items()}
+
+
+@pytest.fixture
+def catalog(workspace):
+    migrations.migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    return workspace
+
+
+def import_log(csv_path, **kwargs):
+    return bulk_import_user_log(engines.get_user_engine(), engines.get_system_engine(), csv_path, **kwargs)
+
+
+def test_bulk_import_matches_the_row_by_row_seed(catalog):
+    write_log_csv("log.csv", 300, seed=1)
+    seed_user_db(engines.get_user_engine(), engines.get_system_engine(), "log.csv")
+    seeded = contents()
+    with sqlite3.connect("user_log.db") as conn:
+        for table in ("exercises", "workout_sequence", "workouts"):
+            conn.execute(f"DELETE FROM {table}")
+
+    # Small chunks, so workouts and sequences span chunk boundaries
+    stats = import_log("log.csv", chunksize=7)
+
+    assert stats["rows"] == 300
+    assert contents() == seeded
+
+
+def test_a_populated_log_is_left_alone(catalog):
+    write_log_csv("log.csv", 50)
+    import_log("log.csv")
+    before = contents()
+
+    assert import_log("log.csv")["rows"] == 0
+    assert contents() == before
+
+
+def test_rows_for_unknown_exercises_are_skipped_and_named(catalog):
+    with open("log.csv", "w") as f:
+        f.write("id,date,exercise,set_number,weight,reps,duration,rest,note\n"
+                "1,04/07/2025,Barbell Bench Press,1,95,8,,90,\n"
+                "2,04/07/2025,Zercher Squat,1,135,5,,120,\n"
+                "3,04/07/2025,Zercher Squat,2,135,5,,120,\n"
+                "4,04/09/2025,Jefferson Curl,1,45,10,,60,\n")
+
+    stats = import_log("log.csv", chunksize=2)
+
+    assert (stats["rows"], stats["skipped"]) == (1, 3)
+    assert stats["unknown"] == {"Zercher Squat": 2, "Jefferson Curl": 1}
+    assert len(contents()["exercises"]) == 1
+
+
+def test_a_failed_import_writes_nothing(catalog):
+    with open("log.csv", "w") as f:
+        f.write("id,date,exercise,set_number,weight,reps,duration,rest,note\n"
+                "1,04/07/2025,Barbell Bench Press,1,95,8,,90,\n"
+                "2,not a date,Barbell Bench Press,1,95,8,,90,\n")
+
+    with pytest.raises(ValueError):
+        import_log("log.csv", chunksize=1)
+
+    assert contents() == {table: [] for table in TABLES}
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from cache import DataVersionCache, DataVersionWatcher, cached
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = str(tmp_path / "log.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (a INTEGER)")
+    cache = DataVersionCache({"log": DataVersionWatcher(path)}, max_entries=2)
+    yield path, cache
+    cache.reset()
+
+
+def write(path, value):
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO t VALUES (?)", (value,))
+
+
+def count(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+def test_entries_are_reused_until_the_database_changes(log):
+    path, cache = log
+    lookup = lambda: cache.get_or_compute("count", ("log",), lambda: count(path))  # noqa: E731
+
+    assert lookup() == 0
+    assert lookup() == 0
+    write(path, 1)
+    assert lookup() == 1
+
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_least_recently_used_entries_are_evicted(log):
+    _, cache = log
+    for key in ("a", "b", "a", "c"):
+        cache.get_or_compute(key, ("log",), lambda: key)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.evictions == 1
+    cache.get_or_compute("b", ("log",), lambda: "b again")
+    assert cache.misses == 4
+
+
+def test_reset_follows_a_relative_path_to_another_database(tmp_path, monkeypatch):
+    for name, rows in (("one", 1), ("two", 2)):
+        (tmp_path / name).mkdir()
+        with sqlite3.connect(str(tmp_path / name / "log.db")) as conn:
+            conn.execute("CREATE TABLE t (a INTEGER)")
+            conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(rows)])
+    cache = DataVersionCache({"log": DataVersionWatcher("log.db")})
+    lookup = lambda: cache.get_or_compute("count", ("log",), lambda: count("log.db"))  # noqa: E731
+
+    monkeypatch.chdir(tmp_path / "one")
+    assert lookup() == 1
+    monkeypatch.chdir(tmp_path / "two")
+    cache.reset()
+    assert lookup() == 2
+    cache.reset()
+
+
+def test_cached_keys_on_the_arguments(log):
+    path, cache = log
+    calls = []
+
+    @cached("log", cache=cache)
+    def rows_above(n):
+        calls.append(n)
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM t WHERE a > ?", (n,)).fetchone()[0]
+
+    write(path, 5)
+    assert [rows_above(1), rows_above(1), rows_above(9)] == [1, 1, 0]
+    write(path, 10)
+    assert rows_above(9) == 1
+    assert calls == [1, 9, 9]
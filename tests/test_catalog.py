@@ -0,0 +1,71 @@
+import os
+import sqlite3
+
+import pytest
+
+import catalog
+import engines
+from bulk_import import bulk_seed_system_db
+from migrations import migrate_databases
+
+
+@pytest.fixture
+def system(workspace, monkeypatch):
+    migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    engines.dispose_all()
+    monkeypatch.setattr(catalog, "CHECK_INTERVAL", 0)
+    return "system.db"
+
+
+def rename(old, new):
+    with sqlite3.connect("system.db") as conn:
+        conn.execute("UPDATE exercise_catalog SET name = ? WHERE name = ?", (new, old))
+
+
+def test_snapshots_are_shared_until_the_database_changes(system):
+    snapshot = catalog.get_catalog(system)
+    assert catalog.get_catalog(system) is snapshot
+    assert "Plank" in snapshot.by_name
+
+    rename("Plank", "Front Plank")
+    reloaded = catalog.get_catalog(system)
+
+    assert reloaded is not snapshot
+    assert "Front Plank" in reloaded.by_name and "Plank" not in reloaded.by_name
+    assert "Plank" in snapshot.by_name  # snapshots already handed out never change
+
+
+def test_lookups_within_the_interval_skip_the_freshness_check(system, monkeypatch):
+    version = catalog._version
+    monkeypatch.setattr(catalog, "CHECK_INTERVAL", 60)
+    snapshot = catalog.get_catalog(system)
+    monkeypatch.setattr(catalog, "_version", lambda path: pytest.fail("checked within the interval"))
+
+    rename("Plank", "Front Plank")
+    assert catalog.get_catalog(system) is snapshot
+
+    catalog.reset()
+    monkeypatch.setattr(catalog, "_version", version)
+    assert "Front Plank" in catalog.get_catalog(system).by_name
+
+
+def test_a_recreated_database_is_reloaded_and_its_old_watcher_closed(system):
+    catalog.get_catalog(system)
+    _, watcher = catalog._watchers[os.path.abspath(system)]
+
+    os.replace(system, "old.db")
+    with sqlite3.connect("old.db") as src, sqlite3.connect(system) as dst:
+        src.backup(dst)
+        dst.execute("DELETE FROM exercise_catalog WHERE name = 'Plank'")
+
+    assert "Plank" not in catalog.get_catalog(system).by_name
+    assert watcher._conn is None
+    assert catalog._watchers[os.path.abspath(system)][1] is not watcher
+
+
+def test_a_missing_database_is_an_empty_catalog(workspace):
+    snapshot = catalog.get_catalog("nowhere.db")
+
+    assert dict(snapshot.names) == {}
+    assert not os.path.exists("nowhere.db")
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from sqlmodel import select
+
+import columnar
+import engines
+import logic
+from user_models import Exercise
+
+NAMES = {1: "Bench Press", 2: "Squat", 3: "Plank"}
+
+
+def test_int_columns_stay_small_and_become_nullable_with_gaps():
+    assert columnar.int_column([1, 2, 3]).dtype == np.int16
+    with_gaps = columnar.int_column([60, None, 90], "int32")
+
+    assert with_gaps.dtype == pd.Int32Dtype()
+    assert with_gaps.tolist() == [60, pd.NA, 90]
+
+
+def test_name_column_maps_ids_and_marks_the_rest_unknown():
+    names = columnar.name_column([2, 1, 7, None, 2], NAMES, unknown="Unknown")
+
+    assert list(names) == ["Squat", "Bench Press", "Unknown", "Unknown", "Squat"]
+    assert list(columnar.name_column([3, 9], NAMES)) == ["Plank", np.nan]
+
+
+def test_fetch_columns_transposes_the_rows(small_log):
+    with engines.get_user_engine().connect() as conn:
+        ids, weights = columnar.fetch_columns(
+            conn, select(Exercise.exercise_id, Exercise.weight).where(Exercise.workout_uuid == "a")
+            .order_by(Exercise.id))
+        empty = columnar.fetch_columns(conn, select(Exercise.id, Exercise.note).where(Exercise.id < 0))
+
+    assert ids == (1, 1, 2)
+    assert weights == (100.0, 110.0, 60.0)
+    assert empty == [(), ()]
+
+
+def test_workout_sets_match_the_hydrated_objects(small_log):
+    with logic.UserService() as usr_svc:
+        exercises = usr_svc.get_exercises_for_workout("c")
+        df = usr_svc.get_workout_exercise_df("c", NAMES)
+
+    assert df.shape == (len(exercises), 7)
+    assert df.dtypes.astype(str).to_dict() == {
+        "Exercise": "category", "Set": "int16", "Weight": "float64", "Reps": "Int16",
+        "Duration": "Int32", "Rest": "Int16", "Note": "object"}
+    assert list(df["Exercise"]) == [NAMES[e.exercise_id] for e in exercises]
+    assert df["Weight"].tolist()[0] == exercises[0].weight
+    assert np.isnan(df["Weight"].iloc[1])
+    assert df["Reps"].tolist() == [1, pd.NA]
+
+
+def test_an_empty_workout_keeps_the_columns(small_log):
+    with logic.UserService() as usr_svc:
+        df = usr_svc.get_workout_exercise_df("missing", NAMES)
+
+    assert df.shape == (0, 7)
+    assert df["Set"].dtype == np.int16
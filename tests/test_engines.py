@@ -0,0 +1,30 @@
+import engines
+import migrations
+from logic import SystemService, UserService
+
+
+def test_services_share_one_engine_per_database(workspace):
+    with UserService() as first, UserService() as second:
+        assert first.session.get_bind() is second.session.get_bind()
+    assert engines.get_user_engine() is engines.get_user_engine()
+    assert engines.get_system_engine() is not engines.get_user_engine()
+
+
+def test_dispose_all_starts_a_new_registry(workspace):
+    engine = engines.get_user_engine()
+    engines.dispose_all()
+
+    assert engines.get_user_engine() is not engine
+
+
+def test_user_connections_see_the_catalog(workspace):
+    migrations.migrate_databases()
+    with engines.get_system_engine().begin() as conn:
+        conn.exec_driver_sql("INSERT INTO exercise_catalog (name, measured_by) VALUES ('Bench Press', 'Reps')")
+
+    with engines.get_user_engine().connect() as conn:
+        assert conn.exec_driver_sql(f"SELECT name FROM {engines.SYSTEM_SCHEMA}.exercise_catalog").all() == [
+            ("Bench Press",)]
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    with SystemService() as sys_svc:
+        assert list(sys_svc.get_exercise_name_map().values()) == ["Bench Press"]
@@ -0,0 +1,77 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import instrumentation
+from instrumentation import TracedConnection
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", factory=TracedConnection)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    yield conn
+    conn.close()
+
+
+def recorded(recorder):
+    return {q["sql"]: q for q in recorder.snapshot()["queries"]}
+
+
+def test_connection_execute_is_recorded(conn, recorder):
+    conn.execute("INSERT INTO t VALUES (?)", (1,))
+    rows = conn.execute("SELECT a FROM t").fetchall()
+
+    queries = recorded(recorder)
+    assert rows == [(1,)]
+    assert queries["INSERT INTO t VALUES (?)"]["count"] == 1
+    assert queries["SELECT a FROM t"]["rows"] == 1
+
+
+def test_connection_executemany_is_recorded(conn, recorder):
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+
+    assert recorded(recorder)["INSERT INTO t VALUES (?)"]["rows"] == 3
+
+
+def test_connection_executescript_is_recorded(conn, recorder):
+    script = "INSERT INTO t VALUES (1); INSERT INTO t VALUES (2);"
+    conn.executescript(script)
+
+    assert recorded(recorder)[script]["count"] == 1
+    assert conn.execute("SELECT count(*) FROM t").fetchone() == (2,)
+
+
+def test_cursor_execute_is_recorded(conn, recorder):
+    conn.cursor().execute("SELECT a FROM t").fetchall()
+
+    assert "SELECT a FROM t" in recorded(recorder)
+
+
+def test_nothing_recorded_while_disabled(conn, recorder):
+    recorder.disable()
+    conn.execute("SELECT a FROM t").fetchall()
+
+    assert recorded(recorder) == {}
+
+
+def test_fetches_are_not_timed_while_disabled(conn, recorder, monkeypatch):
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    cursor = conn.execute("SELECT a FROM t")  # traced, then recording stops mid-fetch
+    recorder.disable()
+    monkeypatch.setattr(instrumentation, "time", SimpleNamespace(perf_counter=lambda: pytest.fail("timed while disabled")))
+
+    assert cursor.fetchone() == (1,)
+    assert cursor.fetchmany(1) == [(2,)]
+    assert cursor.fetchall() == [(3,)]
+    assert conn.execute("SELECT a FROM t").fetchall() == [(1,), (2,), (3,)]
+
+
+def test_fetched_rows_are_added_to_the_query(conn, recorder):
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    cursor = conn.execute("SELECT a FROM t")
+    cursor.fetchone()
+    cursor.fetchall()
+
+    assert recorded(recorder)["SELECT a FROM t"]["rows"] == 3
@@ -0,0 +1,57 @@
+import os
+
+import benchmark
+import db
+import logic
+from logic import UserService
+
+
+def last_sets(exercise_id, sessions=1):
+    with UserService() as usr_svc:
+        df = usr_svc.get_last_performance(exercise_id, sessions)
+    return list(zip(df["Date"].dt.strftime("%Y-%m-%d"), df["Set"], df["Weight"]))
+
+
+def test_the_latest_sessions_come_newest_first(small_log):
+    assert last_sets(1) == [("2025-04-07", 1, 115.0), ("2025-04-07", 2, 100.0)]
+    assert last_sets(2, sessions=2) == [("2025-04-09", 1, 65.0), ("2025-04-07", 1, 62.5)]
+    assert last_sets(99) == []
+
+
+def test_a_write_invalidates_the_cached_sets(small_log):
+    assert last_sets(1)[0] == ("2025-04-07", 1, 115.0)
+    assert last_sets(1)[0] == ("2025-04-07", 1, 115.0)
+    assert logic._last_performance.hits == 1
+
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(
+            updates=[{"id": small_log[3], "weight": 117.5}],
+            inserts=[{"workout_uuid": "c", "exercise_id": 1, "set_number": 1, "weight": 120.0, "reps": 2}])
+
+    assert last_sets(1) == [("2025-04-09", 1, 120.0)]
+    assert last_sets(1, sessions=2)[1] == ("2025-04-07", 1, 117.5)
+
+
+def test_a_legacy_write_invalidates_the_cached_sets(workspace):
+    db.create_tables()
+    db.insert_exercises([("04/07/2025", "Bench Press", 1, 100.0, 5, None, 90, "")])
+    assert db.get_last_performance("Bench Press")["weight"].tolist() == [100.0]
+
+    db.insert_exercise("04/09/2025", "Bench Press", 1, 105.0, 5, None, 90)
+
+    last = db.get_last_performance("Bench Press")
+    assert last["weight"].tolist() == [105.0]
+    assert db.get_last_performance("Bench Press", 2)["weight"].tolist() == [105.0, 100.0]
+
+
+def test_entering_a_benchmark_workspace_drops_the_previous_results(workspace):
+    bench = benchmark.Workspace(str(workspace))
+    seen = []
+    for weight in (100.0, 200.0):
+        bench.fresh("legacy")
+        db.create_tables()
+        db.insert_exercises([("04/07/2025", "Bench Press", 1, weight, 5, None, 90, "")])
+        seen.append(db.get_last_performance("Bench Press")["weight"].tolist())
+
+    assert seen == [[100.0], [200.0]]
+    assert os.getcwd().endswith("002-legacy")
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from library_index import LibraryIndex, load_library_index
+
+EXERCISES = [
+    {"name": "Bench Press", "muscle_group": "Chest", "equipment": "Barbell", "difficulty": "Intermediate"},
+    {"name": "Push Up", "muscle_group": "Chest", "equipment": "Bodyweight", "difficulty": "Beginner"},
+    {"name": "Back Squat", "muscle_group": "Legs", "equipment": "Barbell", "difficulty": "Intermediate"},
+    {"name": "Goblet Squat", "muscle_group": "Legs", "equipment": "Dumbbell", "difficulty": "Beginner"},
+]
+
+
+def linear_filter(exercises, **selected):
+    return [e["name"] for e in exercises
+            if all(value is None or e[facet] == value for facet, value in selected.items())]
+
+
+@pytest.mark.parametrize("selected", [
+    {},
+    {"muscle_group": "Chest"},
+    {"equipment": "Barbell", "difficulty": "Intermediate"},
+    {"muscle_group": "Legs", "equipment": "Barbell", "difficulty": None},
+    {"muscle_group": "Legs", "equipment": "Kettlebell"},
+])
+def test_filter_matches_a_linear_scan_in_file_order(selected):
+    assert LibraryIndex(EXERCISES).filter(**selected) == linear_filter(EXERCISES, **selected)
+
+
+def test_options_and_lookup():
+    index = LibraryIndex(EXERCISES)
+
+    assert index.options["equipment"] == ["Barbell", "Bodyweight", "Dumbbell"]
+    assert index.get("Push Up")["difficulty"] == "Beginner"
+
+
+def test_the_index_is_rebuilt_only_when_the_file_changes(tmp_path):
+    path = tmp_path / "exercises.json"
+    path.write_text(json.dumps(EXERCISES))
+
+    first = load_library_index(str(path))
+    assert load_library_index(str(path)) is first
+
+    path.write_text(json.dumps(EXERCISES[:2]))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    reloaded = load_library_index(str(path))
+
+    assert reloaded is not first
+    assert reloaded.names == ["Bench Press", "Push Up"]
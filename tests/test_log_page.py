@@ -0,0 +1,76 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import engines
+import logic
+from bulk_import import bulk_import_user_log, bulk_seed_system_db
+from migrations import migrate_databases
+from synthetic import write_log_csv
+
+
+@pytest.fixture
+def log(workspace):
+    migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    bulk_import_user_log(engines.get_user_engine(), engines.get_system_engine(),
+                         write_log_csv("log.csv", 500, seed=2))
+    return workspace
+
+
+def every_set():
+    query = logic.log_query().add_columns(logic.Workout.uuid, logic.Exercise.id, logic.Exercise.exercise_id)
+    with logic.UserService() as usr_svc:
+        rows = usr_svc.session.exec(query).all()
+    df = pd.DataFrame(rows, columns=logic.LOG_COLUMNS + ["uuid", "id", "exercise_id"])
+    return df.sort_values(["Date", "uuid", "id"])
+
+
+def all_pages(limit, **filters):
+    pages, cursor = [], None
+    with logic.UserService() as usr_svc:
+        while True:
+            page, cursor = usr_svc.get_log_page(after=cursor, limit=limit, **filters)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+
+def test_pages_cover_the_log_once_in_order(log):
+    pages = all_pages(37)
+
+    assert all(len(page) == 37 for page in pages[:-1])
+    assert pd.concat(pages).index.tolist() == every_set()["id"].tolist()
+
+
+def test_filters_apply_to_every_page(log):
+    expected = every_set()
+    exercise_ids = expected["exercise_id"].value_counts().index[:3].tolist()
+    expected = expected[expected["exercise_id"].isin(exercise_ids)
+                        & expected["Date"].between("2020-03-01", "2020-09-30")]
+
+    pages = all_pages(10, start=date(2020, 3, 1), end=date(2020, 9, 30), exercise_ids=exercise_ids)
+
+    assert pd.concat(pages).index.tolist() == expected["id"].tolist()
+
+
+def test_an_exact_final_page_has_no_cursor(log):
+    with logic.UserService() as usr_svc:
+        page, cursor = usr_svc.get_log_page(limit=500)
+
+    assert len(page) == 500
+    assert cursor is None
+
+
+def test_sets_written_behind_the_cursor_do_not_shift_later_pages(log):
+    expected = every_set()["id"].tolist()[50:100]
+    with logic.UserService() as usr_svc:
+        first, cursor = usr_svc.get_log_page(limit=50)
+        # A set logged into a workout already paged past: OFFSET paging would repeat a row
+        workout_uuid = usr_svc.session.get(logic.Exercise, int(first.index[0])).workout_uuid
+        usr_svc.apply_log_diff(inserts=[{"workout_uuid": workout_uuid, "exercise_id": 1,
+                                         "set_number": 9, "weight": 1.0, "reps": 1}])
+        second, _ = usr_svc.get_log_page(after=cursor, limit=50)
+
+    assert second.index.tolist() == expected
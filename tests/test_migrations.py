@@ -0,0 +1,126 @@
+import sqlite3
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+
+import engines
+import migrations
+import system_models
+import user_models
+
+
+def columns(conn, table):
+    return [(name, type_, notnull, pk) for _, name, type_, notnull, _, pk in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def user_version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def legacy_user_db(path, workouts):
+    """A user_log.db as the app left it before versioning: baseline tables, MM/DD/YYYY dates."""
+    conn = sqlite3.connect(path)
+    for ddl in migrations.USER_BASELINE:
+        conn.execute(ddl)
+    for csv_date in workouts:
+        workout_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, csv_date))
+        conn.execute("INSERT INTO workouts VALUES (?, ?)", (workout_uuid, csv_date))
+        conn.execute("INSERT INTO exercises (workout_uuid, exercise_id, set_number, weight, reps) "
+                     "VALUES (?, 1, 1, 100, 5)", (workout_uuid,))
+    conn.commit()
+    conn.close()
+
+
+def test_fresh_databases_reach_the_latest_version(workspace):
+    migrations.migrate_databases()
+
+    assert user_version("user_log.db") == len(migrations.USER_MIGRATIONS)
+    assert user_version("system.db") == len(migrations.SYSTEM_MIGRATIONS)
+
+
+def test_migrated_schema_matches_the_models(workspace):
+    migrations.migrate_databases()
+
+    for metadata, path in ((user_models.user_metadata, "user_log.db"),
+                           (system_models.system_metadata, "system.db")):
+        reference = create_engine("sqlite://")
+        metadata.create_all(reference)
+        expected = reference.raw_connection()
+        with sqlite3.connect(path) as migrated:
+            for table in metadata.tables:
+                assert columns(migrated, table) == columns(expected, table), table
+
+
+def test_migrating_twice_is_a_no_op(workspace):
+    migrations.migrate_databases()
+    with sqlite3.connect("user_log.db") as conn:
+        schema = conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall()
+
+    assert migrations.migrate_user_db(engines.get_user_engine()) == len(migrations.USER_MIGRATIONS)
+    with sqlite3.connect("user_log.db") as conn:
+        assert conn.execute("SELECT sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+
+def test_baseline_dates_become_iso_padded_or_not(workspace):
+    legacy_user_db("user_log.db", ["04/07/2025", "4/8/2025", "12/31/2024"])
+
+    migrations.migrate_user_db(engines.get_user_engine())
+
+    with sqlite3.connect("user_log.db") as conn:
+        assert conn.execute("SELECT date FROM workouts ORDER BY date").fetchall() == [
+            ("2024-12-31",), ("2025-04-07",), ("2025-04-08",)]
+        assert conn.execute("SELECT date, set_count FROM exercise_rollup ORDER BY date").fetchall() == [
+            ("2024-12-31", 1), ("2025-04-07", 1), ("2025-04-08", 1)]
+        # Workouts named by the importers' uuid5(CSV date) came from the CSV
+        assert conn.execute("SELECT COUNT(*) FROM exercises WHERE NOT seeded").fetchone() == (0,)
+
+
+def test_unpadded_dates_left_by_step_2_are_rewritten(workspace):
+    migrations.migrate_user_db(engines.get_user_engine())
+    workout_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, "4/9/2025"))
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("INSERT INTO workouts VALUES (?, '4/9/2025')", (workout_uuid,))
+        conn.execute("INSERT INTO exercises (workout_uuid, exercise_id, set_number, weight, reps) "
+                     "VALUES (?, 1, 1, 200, 5)", (workout_uuid,))
+        conn.execute("PRAGMA user_version = 8")
+
+    migrations.migrate_user_db(engines.get_user_engine())
+
+    with sqlite3.connect("user_log.db") as conn:
+        assert conn.execute("SELECT date FROM workouts").fetchall() == [("2025-04-09",)]
+        assert conn.execute("SELECT seeded FROM exercises").fetchall() == [(1,)]
+        assert conn.execute("SELECT value, date FROM exercise_records WHERE kind = 'weight'").fetchall() == [
+            (200.0, "2025-04-09")]
+        assert conn.execute("SELECT COUNT(*) FROM exercise_records_dirty").fetchone() == (0,)
+
+
+def test_app_entered_workouts_are_not_flagged_seeded(workspace):
+    migrations.migrate_user_db(engines.get_user_engine())
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("INSERT INTO workouts VALUES ('entered-in-app', '2025-04-07')")
+        conn.execute("INSERT INTO exercises (workout_uuid, exercise_id, set_number) VALUES ('entered-in-app', 1, 1)")
+        conn.execute("PRAGMA user_version = 6")
+
+    migrations.migrate_user_db(engines.get_user_engine())
+
+    with sqlite3.connect("user_log.db") as conn:
+        assert conn.execute("SELECT seeded FROM exercises").fetchall() == [(0,)]
+
+
+def test_a_failed_step_is_rolled_back_with_its_version(workspace):
+    engine = engines.get_user_engine()
+    migrations.migrate_user_db(engine)
+
+    def half_applied(conn):
+        conn.exec_driver_sql("CREATE TABLE half_applied (a INTEGER)")
+        conn.exec_driver_sql("CREATE INDEX ix_half_applied ON half_applied (a)")
+        raise RuntimeError("step failed")
+
+    with pytest.raises(RuntimeError):
+        migrations.migrate(engine, migrations.USER_MIGRATIONS + [half_applied])
+
+    assert user_version("user_log.db") == len(migrations.USER_MIGRATIONS)
+    with sqlite3.connect("user_log.db") as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%half_applied'").fetchall() == []
@@ -0,0 +1,84 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import engines
+import logic
+import muscle_load
+from engines import SYSTEM_DB_PATH
+from bulk_import import bulk_import_user_log, bulk_seed_system_db
+from catalog import CatalogExercise, CatalogSnapshot, Equipment, MuscleGroup, get_catalog
+from migrations import migrate_databases
+from synthetic import write_log_csv
+
+
+@pytest.fixture
+def log(workspace):
+    migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    bulk_import_user_log(engines.get_user_engine(), engines.get_system_engine(),
+                         write_log_csv("log.csv", 500, seed=7))
+    return workspace
+
+
+BUCKET_START = {
+    "day": "w.date",
+    "week": "date(w.date, '-6 days', 'weekday 1')",
+    "month": "date(w.date, 'start of month')",
+}
+
+
+def per_muscle_loop(catalog, bucket):
+    # Credit every muscle group of each set's exercise, one set at a time
+    with sqlite3.connect("user_log.db") as conn:
+        sets = conn.execute(f"SELECT {BUCKET_START[bucket]}, e.exercise_id, coalesce(e.weight * e.reps, 0) "
+                            "FROM exercises e JOIN workouts w ON w.uuid = e.workout_uuid").fetchall()
+    volume, count = {}, {}
+    for date, exercise_id, set_volume in sets:
+        for muscle in catalog.exercise_muscles.get(exercise_id, ()):
+            volume[date, muscle] = volume.get((date, muscle), 0.0) + set_volume
+            count[date, muscle] = count.get((date, muscle), 0) + 1
+    return volume, count
+
+
+@pytest.mark.parametrize("bucket", list(BUCKET_START))
+def test_load_matches_crediting_each_set_to_its_muscles(log, bucket):
+    with logic.UserService() as usr_svc:
+        volume, sets = usr_svc.get_muscle_load_df(bucket)
+        catalog = get_catalog(SYSTEM_DB_PATH)
+    expected_volume, expected_sets = per_muscle_loop(catalog, bucket)
+
+    assert list(volume.columns) == [m.name for _, m in sorted(catalog.muscle_groups_by_id.items())]
+    for frame, expected in ((volume, expected_volume), (sets, expected_sets)):
+        stacked = frame.stack()
+        actual = {(date.strftime("%Y-%m-%d"), muscle): value for (date, muscle), value in stacked.items() if value}
+        assert actual.keys() == {key for key, value in expected.items() if value}
+        assert np.allclose([actual[key] for key in actual], [expected[key] for key in actual])
+
+
+def snapshot(exercises):
+    groups = [MuscleGroup(1, "Chest"), MuscleGroup(2, "Triceps"), MuscleGroup(3, "Quads")]
+    bar = Equipment(1, "Barbell", 45, True, False)
+    return CatalogSnapshot([bar], groups, [
+        CatalogExercise(id, name, bar, None, "Reps", tuple(g for g in groups if g.id in group_ids))
+        for id, name, group_ids in exercises])
+
+
+def test_incidence_maps_exercises_to_their_muscle_groups():
+    catalog = snapshot([(3, "Bench Press", (1, 2)), (8, "Squat", (3,))])
+    incidence = muscle_load.get_incidence(catalog)
+
+    assert incidence.matrix.toarray().tolist() == [[1, 1, 0], [0, 0, 1]]
+    assert incidence.positions(np.array([8, 5, 3, 99])).tolist() == [1, -1, 0, -1]
+    assert muscle_load.get_incidence(catalog) is incidence
+    assert muscle_load.get_incidence(snapshot([(3, "Bench Press", (1,))])) is not incidence
+
+
+def test_unknown_exercises_are_left_out(log):
+    with engines.get_user_engine().connect() as conn:
+        volume, sets = muscle_load.muscle_load(conn, snapshot([]))
+
+    assert volume.shape == (0, 3)
+    assert isinstance(sets.index, pd.DatetimeIndex)
@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "log.db"), max_idle=2)
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE t (a INTEGER)")
+    yield pool
+    pool.close_all()
+
+
+def rows(pool):
+    with pool.connection() as conn:
+        return [a for (a,) in conn.execute("SELECT a FROM t ORDER BY a")]
+
+
+def test_connections_are_in_wal_mode(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+        assert conn.execute("PRAGMA busy_timeout").fetchone() == (5000,)
+
+
+def test_connections_are_reused_and_nested_use_shares_one(pool):
+    with pool.connection() as outer:
+        with pool.connection() as inner:
+            assert inner is outer
+    with pool.connection() as again:
+        assert again is outer
+
+
+def test_threads_hold_their_own_connections(pool):
+    held = []
+    ready = threading.Barrier(3)
+
+    def hold():
+        with pool.connection() as conn:
+            held.append(conn)
+            ready.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(conn) for conn in held}) == 3
+    assert len(pool._idle) == 2  # the third is closed rather than kept
+
+
+def test_a_failed_transaction_is_rolled_back(pool):
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            raise RuntimeError("write failed")
+
+    assert rows(pool) == []
+
+
+def test_nested_transactions_commit_with_the_outermost(pool):
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            with pool.transaction() as inner:
+                inner.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("outer failed after the inner block")
+
+    assert rows(pool) == []
+
+
+def test_readers_see_committed_data_while_a_write_is_open(pool):
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    seen = []
+
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO t VALUES (2)")
+        reader = threading.Thread(target=lambda: seen.append(rows(pool)))
+        reader.start()
+        reader.join(timeout=5)
+
+    assert seen == [[1]]
+    assert rows(pool) == [1, 2]
+
+
+def test_a_connection_is_returned_without_an_open_transaction(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")  # never committed
+
+    assert rows(pool) == []
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+
+from pretranscode import pretranscode
+from transcode import TranscodeCache
+
+
+@pytest.fixture
+def library(tmp_path, make_gif):
+    gif_paths = [make_gif(f"{i}.gif", shade=i) for i in range(3)]
+    exercises = [{"name": f"Exercise {i}", "gif_path": path} for i, path in enumerate(gif_paths)]
+    # Two exercises may share a clip, and some have none
+    exercises += [{"name": "Same clip", "gif_path": gif_paths[0]}, {"name": "No clip"}]
+    path = tmp_path / "exercises.json"
+    path.write_text(json.dumps(exercises))
+    return str(path), gif_paths
+
+
+def run(library, tmp_path, **kwargs):
+    return pretranscode(library[0], cache_dir=str(tmp_path / "cache"), workers=2, **kwargs)
+
+
+def test_every_clip_is_transcoded_once(library, tmp_path):
+    stats = run(library, tmp_path)
+
+    assert (stats["total"], stats["transcoded"], stats["skipped"], stats["failures"]) == (3, 3, 0, [])
+    cache = TranscodeCache(str(tmp_path / "cache"))
+    assert all(cache.contains(gif_path) for gif_path in library[1])
+
+    again = run(library, tmp_path)
+    assert (again["transcoded"], again["skipped"]) == (0, 3)
+
+
+def test_failures_are_reported_without_stopping_the_batch(library, tmp_path):
+    exercises_json, gif_paths = library
+    with open(gif_paths[1], "wb") as f:
+        f.write(b"GIF89a but not really")
+    with open(exercises_json) as f:
+        exercises = json.load(f) + [{"name": "Missing", "gif_path": str(tmp_path / "missing.gif")}]
+    with open(exercises_json, "w") as f:
+        json.dump(exercises, f)
+
+    stats = run(library, tmp_path)
+
+    assert stats["transcoded"] == 2
+    assert sorted(path for path, _ in stats["failures"]) == sorted([gif_paths[1], str(tmp_path / "missing.gif")])
+
+
+def test_the_batch_evicts_older_clips_but_never_its_own(library, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    stale = cache_dir / ("0" * 64 + ".mp4")
+    stale.write_bytes(b"x" * 1000)
+    os.utime(stale, (1, 1))
+
+    stats = run(library, tmp_path, max_bytes=1)
+
+    assert stats["transcoded"] == 3
+    assert not stale.exists()
+    cache = TranscodeCache(str(cache_dir))
+    assert all(cache.contains(gif_path) for gif_path in library[1])
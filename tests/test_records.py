@@ -0,0 +1,71 @@
+import sqlite3
+
+import engines
+import records
+from logic import UserService
+
+# set_id is left out: between tied sets, either one is the record
+TABLES = {
+    "exercise_records": "SELECT exercise_id, kind, value, weight, reps, date FROM exercise_records "
+                        "ORDER BY exercise_id, kind",
+    "rep_records": "SELECT exercise_id, weight, reps, date FROM rep_records ORDER BY exercise_id, weight",
+}
+
+
+def maintained():
+    with sqlite3.connect("user_log.db") as conn:
+        return {table: conn.execute(sql).fetchall() for table, sql in TABLES.items()}
+
+
+def rebuilt():
+    with engines.get_user_engine().connect() as conn:
+        records.rebuild_records(conn)
+        tables = {table: conn.exec_driver_sql(sql).all() for table, sql in TABLES.items()}
+        conn.rollback()
+    return tables
+
+
+def dirty():
+    with sqlite3.connect("user_log.db") as conn:
+        return conn.execute("SELECT COUNT(*) FROM exercise_records_dirty").fetchone()[0]
+
+
+def test_inserts_keep_the_records(small_log):
+    tables = maintained()
+
+    assert tables == rebuilt()
+    assert ("weight", 115.0, 115.0, 3, "2025-04-07") in [row[1:] for row in tables["exercise_records"]]
+    # A tie keeps the earliest date
+    assert (1, 100.0, 8, "2025-04-07") in tables["rep_records"]
+    assert dirty() == 0
+
+
+def test_updates_and_deletes_refresh_the_records(small_log):
+    ids = small_log
+    with UserService() as usr_svc:
+        # Lower the best set, move one to another workout, and delete a record holder
+        usr_svc.apply_log_diff(updates=[{"id": ids[3], "weight": 90.0}, {"id": ids[5], "workout_uuid": "c"}],
+                               deletes=[ids[1], ids[6]])
+
+    assert maintained() == rebuilt()
+    assert dirty() == 0
+
+
+def test_workout_changes_refresh_the_records(small_log):
+    with engines.get_user_engine().begin() as conn:
+        conn.exec_driver_sql("UPDATE workouts SET date = '2025-05-01' WHERE uuid = 'a'")
+        conn.exec_driver_sql("DELETE FROM exercises WHERE workout_uuid = 'b'")
+        conn.exec_driver_sql("DELETE FROM workouts WHERE uuid = 'b'")
+        assert records.refresh_dirty_records(conn) == 2
+
+    assert maintained() == rebuilt()
+    assert dirty() == 0
+
+
+def test_history_lists_each_set_that_beat_the_running_best(small_log):
+    with UserService() as usr_svc:
+        history = usr_svc.get_record_history_df(1)
+
+    weights = history[history["kind"] == "weight"]
+    assert list(zip(weights["date"], weights["value"])) == [
+        ("2025-03-30", 100.0), ("2025-03-30", 110.0), ("2025-04-07", 115.0)]
@@ -0,0 +1,93 @@
+import sqlite3
+
+import db
+import engines
+import rollups
+from logic import UserService
+
+ROLLUP = "SELECT * FROM exercise_rollup ORDER BY date, exercise_id"
+NAME_ROLLUP = "SELECT * FROM exercise_name_rollup ORDER BY date, exercise"
+
+
+def rebuilt(sql=ROLLUP):
+    with engines.get_user_engine().connect() as conn:
+        rollups.rebuild_rollups(conn)
+        rows = conn.exec_driver_sql(sql).all()
+        conn.rollback()
+    return rows
+
+
+def maintained(sql=ROLLUP):
+    with sqlite3.connect("user_log.db") as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_inserts_add_to_the_rollup(small_log):
+    rows = maintained()
+
+    assert rows == rebuilt()
+    assert rows[0] == ("2025-03-30", 1, 830.0, 2, 8, 110.0, 0)
+    assert len(rows) == 6
+
+
+def test_updates_and_deletes_recompute_their_keys(small_log):
+    ids = small_log
+    with UserService() as usr_svc:
+        # Lower a top set, move a set to another workout, delete two
+        usr_svc.apply_log_diff(updates=[{"id": ids[3], "weight": 90.0}, {"id": ids[5], "workout_uuid": "c"}],
+                               deletes=[ids[1], ids[6]])
+
+    assert maintained() == rebuilt()
+
+
+def test_workout_changes_move_their_rollups(small_log):
+    with engines.get_user_engine().begin() as conn:
+        conn.exec_driver_sql("UPDATE workouts SET date = '2025-05-01' WHERE uuid = 'a'")
+        conn.exec_driver_sql("DELETE FROM exercises WHERE workout_uuid = 'b'")
+        conn.exec_driver_sql("DELETE FROM workouts WHERE uuid = 'b'")
+
+    assert maintained() == rebuilt()
+    assert {row[0] for row in maintained()} == {"2025-04-09", "2025-05-01"}
+
+
+def legacy_rebuilt():
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("DELETE FROM exercise_name_rollup")
+        conn.execute(f"INSERT INTO exercise_name_rollup {db.ROLLUP_SELECT} GROUP BY date, exercise")
+        rows = conn.execute(NAME_ROLLUP).fetchall()
+        conn.rollback()
+    return rows
+
+
+def test_legacy_writes_maintain_the_name_rollup(workspace):
+    db.create_tables()
+    db.insert_exercises([
+        ("04/07/2025", "Bench Press", 1, 100.0, 5, None, 90, ""),
+        ("04/07/2025", "Bench Press", 2, 110.0, 3, None, 90, ""),
+        ("04/07/2025", "Plank", 1, None, None, 60, 30, ""),
+        ("04/09/2025", "Bench Press", 1, 105.0, 5, None, 90, ""),
+    ])
+    assert maintained(NAME_ROLLUP) == legacy_rebuilt()
+    assert maintained(NAME_ROLLUP)[0] == ("04/07/2025", "Bench Press", 830.0, 2, 8, 110.0, 0)
+
+    log = db.get_exercise_log()
+    top_set = log.loc[log["Weight"] == 110.0].iloc[0]
+    db.update_exercise_row({**top_set, "Date": "04/09/2025", "Weight": 120.0})
+    db.delete_exercise_row(int(log.loc[log["Exercise"] == "Plank", "id"].iloc[0]))
+
+    rows = maintained(NAME_ROLLUP)
+    assert rows == legacy_rebuilt()
+    assert [(date, exercise, top) for date, exercise, _, _, _, top, _ in rows] == [
+        ("04/07/2025", "Bench Press", 100.0), ("04/09/2025", "Bench Press", 120.0)]
+
+
+def test_an_existing_legacy_log_is_backfilled(workspace):
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("CREATE TABLE exercises (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, exercise TEXT, "
+                     "set_number INTEGER, weight REAL, reps INTEGER, duration INTEGER, rest INTEGER, note TEXT)")
+        conn.execute("INSERT INTO exercises (date, exercise, set_number, weight, reps) "
+                     "VALUES ('04/07/2025', 'Bench Press', 1, 100, 5)")
+
+    db.create_tables()
+
+    assert maintained(NAME_ROLLUP) == [("04/07/2025", "Bench Press", 500.0, 1, 5, 100.0, 0)]
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+import db
+import engines
+import search
+from migrations import migrate_databases
+from sync import sync_system_db
+
+DOCUMENTS = f"SELECT rowid, name, equipment, muscle_groups FROM {search.SEARCH_TABLE} ORDER BY rowid"
+
+
+@pytest.fixture
+def system(workspace):
+    migrate_databases()
+    sync_system_db(engines.get_system_engine())
+    with sqlite3.connect("system.db") as conn:
+        yield conn
+
+
+def names(results):
+    return [result.name for result in results]
+
+
+def test_index_follows_catalog_changes(system):
+    system.execute("UPDATE equipment SET name = 'Olympic Barbell' WHERE name = 'Barbell'")
+    system.execute("DELETE FROM muscle_groups WHERE name = 'Core'")
+    system.execute("DELETE FROM exercise_catalog WHERE name = 'Plank'")
+    system.execute("UPDATE exercise_catalog SET name = 'Flat Bench Press' WHERE name = 'Barbell Bench Press'")
+    system.commit()
+
+    maintained = system.execute(DOCUMENTS).fetchall()
+    search.rebuild_search_index(system)
+    assert maintained == system.execute(DOCUMENTS).fetchall()
+    system.rollback()
+    assert any(equipment == "Olympic Barbell" for _, _, equipment, _ in maintained)
+    assert not any("Core" in muscle_groups.split() for _, _, _, muscle_groups in maintained)
+
+
+def test_names_with_the_words_come_first(system):
+    # Two names hold both words; the fuzzy pass tops up k with other presses after them
+    results = names(search.search(system, "bench press", k=5))
+
+    assert results[:2] == ["Barbell Bench Press", "Dumbbell Incline Bench Press"]
+    assert all("Press" in name for name in results[2:])
+
+
+def test_typos_and_dropped_letters_still_match(system):
+    assert "Barbell Bench Press" in names(search.search(system, "bensh pres"))
+    assert "Barbell Bench Press" in names(search.search(system, "brbell bench"))
+
+
+def test_results_can_be_restricted_to_some_exercises(system):
+    ids = [row_id for (row_id,) in system.execute(
+        "SELECT id FROM exercise_catalog WHERE name LIKE '%Squat%' ORDER BY id LIMIT 2")]
+
+    results = search.search(system, "", among=ids)
+
+    assert sorted(result.id for result in results) == ids
+    assert search.search(system, "bench press", among=ids) == []
+
+
+def test_without_the_index_names_are_still_matched(system):
+    queries = ["bench", "squat", ""]
+    indexed = [names(search.search(system, query)) for query in queries]
+
+    system.execute(f"DROP TABLE {search.SEARCH_TABLE}")
+    assert not search.has_search_index(system)
+    assert [names(search.search(system, query)) for query in queries] == indexed
+    # Without trigrams only the letters-in-order pass catches a dropped letter
+    assert names(search.search(system, "brbell bench")) == ["Barbell Bench Press"]
+    system.rollback()
+
+
+def test_legacy_catalog_is_indexed_and_searchable(workspace):
+    # The index is created before the default catalog is inserted, so its triggers fill it
+    db.create_tables()
+
+    with sqlite3.connect("system.db") as conn:
+        assert search.has_search_index(conn)
+    assert "Barbell Bench Press" in db.search_exercises("bensh pres")
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import engines
+import logic
+import series
+from bulk_import import bulk_import_user_log, bulk_seed_system_db
+from migrations import migrate_databases
+from synthetic import write_log_csv
+
+
+@pytest.fixture
+def log(workspace):
+    migrate_databases()
+    bulk_seed_system_db(engines.get_system_engine())
+    bulk_import_user_log(engines.get_user_engine(), engines.get_system_engine(),
+                         write_log_csv("log.csv", 800, seed=5))
+    return workspace
+
+
+def test_lttb_keeps_the_ends_and_the_peaks():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 25.0
+
+    keep = series.lttb(x, y, 50)
+
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 437 in keep
+
+
+def test_lttb_leaves_short_series_alone():
+    x = np.arange(10)
+
+    assert series.lttb(x, x * 2.0, 10).tolist() == list(range(10))
+    assert series.lttb(x, x * 2.0, 2).tolist() == list(range(10))
+
+
+def test_downsample_bounds_each_trace():
+    dates = pd.date_range("2020-01-01", periods=500, freq="D")
+    frame = pd.concat([
+        pd.DataFrame({"Date": dates, "Exercise": "Squat", "Volume": np.arange(500.0)}),
+        pd.DataFrame({"Date": dates[:20], "Exercise": "Plank", "Volume": np.ones(20)}),
+    ])
+
+    thinned = series.downsample(frame, max_points=40)
+
+    assert thinned.groupby("Exercise").size().to_dict() == {"Plank": 20, "Squat": 40}
+    squat = thinned[thinned["Exercise"] == "Squat"]
+    assert (squat["Date"].iloc[0], squat["Date"].iloc[-1]) == (dates[0], dates[-1])
+    assert series.downsample(frame.iloc[:0]).empty
+
+
+@pytest.mark.parametrize("bucket", series.BUCKETS)
+def test_bucket_frame_matches_the_sql_series(log, bucket):
+    with logic.UserService() as usr_svc:
+        daily = usr_svc.get_daily_exercise_volume_df()
+        expected = usr_svc.get_volume_series_df(bucket, top_n=5)
+
+    actual = series.bucket_frame(daily, bucket, top_n=5)
+
+    expected["Date"] = pd.to_datetime(expected["Date"])
+    key = ["Exercise", "Date"]
+    actual = actual.sort_values(key, ignore_index=True)
+    expected = expected[key + ["Volume"]].sort_values(key, ignore_index=True)
+    pd.testing.assert_frame_equal(actual[key], expected[key])
+    np.testing.assert_allclose(actual["Volume"], expected["Volume"])
+
+
+def test_series_can_be_limited_to_chosen_exercises(log):
+    with logic.UserService() as usr_svc:
+        daily = usr_svc.get_daily_exercise_volume_df()
+        chosen = sorted(daily["Exercise"].unique())[:2]
+        sql = usr_svc.get_volume_series_df("month", exercises=chosen)
+
+    assert sorted(sql["Exercise"].unique()) == chosen
+    assert sorted(series.bucket_frame(daily, "month", exercises=chosen)["Exercise"].unique()) == chosen
+    with pytest.raises(ValueError):
+        series.bucket_frame(daily, "year")
@@ -0,0 +1,75 @@
+import sqlite3
+
+import pandas as pd
+
+import engines
+import snapshot
+from logic import UserService
+
+MONTH_COUNTS = ("SELECT substr(w.date, 1, 7), COUNT(*) FROM exercises e "
+                "JOIN workouts w ON w.uuid = e.workout_uuid GROUP BY 1 ORDER BY 1")
+
+
+def counted():
+    with sqlite3.connect("user_log.db") as conn:
+        return conn.execute("SELECT month, sets FROM log_months WHERE month != '' AND sets > 0 "
+                            "ORDER BY month").fetchall()
+
+
+def fingerprints():
+    with engines.get_user_engine().connect() as conn:
+        return snapshot.month_fingerprints(conn)
+
+
+def test_log_months_count_the_sets_of_each_month(small_log):
+    before = fingerprints()
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(deletes=[small_log[0]])
+    with engines.get_user_engine().begin() as conn:
+        conn.exec_driver_sql("UPDATE workouts SET date = '2025-04-08' WHERE uuid = 'c'")
+
+    with sqlite3.connect("user_log.db") as conn:
+        assert counted() == conn.execute(MONTH_COUNTS).fetchall()
+    after = fingerprints()
+    # March lost a set and April's workout moved within the month: both count as changes
+    assert after["2025-03"] != before["2025-03"]
+    assert after["2025-04"] != before["2025-04"]
+
+
+def test_note_edits_change_the_month(small_log):
+    before = fingerprints()
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(updates=[{"id": small_log[3], "note": "paused"}])
+
+    after = fingerprints()
+    assert after["2025-04"] != before["2025-04"]
+    assert after["2025-03"] == before["2025-03"]
+
+
+def test_a_rebuild_changes_every_fingerprint(small_log):
+    before = fingerprints()
+    with engines.get_user_engine().begin() as conn:
+        snapshot.rebuild_log_months(conn)
+
+    assert counted() == [("2025-03", 3), ("2025-04", 5)]
+    after = fingerprints()
+    assert after.keys() == before.keys()
+    assert all(after[month] != before[month] for month in before)
+
+
+def test_refresh_rewrites_only_changed_months(small_log):
+    first = snapshot.refresh_snapshot("snap")
+    assert first["written"] == ["2025-03", "2025-04"]
+    assert snapshot.refresh_snapshot("snap")["written"] == []
+
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(deletes=list(small_log[:3]))
+    manifest = snapshot.refresh_snapshot("snap")
+
+    # March has no sets left, so its file is dropped rather than rewritten
+    assert manifest["written"] == []
+    assert list(manifest["months"]) == ["2025-04"]
+    assert manifest["generation"] == first["generation"] + 1
+    df = snapshot.load_snapshot(snapshot_dir="snap")
+    assert len(df) == 5
+    assert df["reps"].dtype == pd.Int16Dtype()
@@ -0,0 +1,54 @@
+import tracemalloc
+
+import imageio.v2 as imageio
+import numpy as np
+import pytest
+
+import transcode
+
+
+def test_frames_are_decoded_lazily_as_rgb(make_gif):
+    gif_path = make_gif(frames=5, size=(32, 24))
+    frames = transcode.iter_rgb_frames(gif_path)
+
+    first = next(frames)
+    assert first.shape == (24, 32, 3)
+    assert first.dtype == np.uint8
+    assert 1 + sum(1 for _ in frames) == transcode.frame_count(gif_path) == 5
+
+
+def test_every_frame_reaches_the_video(make_gif, tmp_path):
+    gif_path = make_gif(frames=9, size=(32, 24))
+    out_path = str(tmp_path / "clip.mp4")
+
+    transcode.transcode_gif(gif_path, out_path, transcode.encoding_params(target_duration=3.0))
+
+    reader = imageio.get_reader(out_path)
+    try:
+        assert reader.count_frames() == 9
+        assert reader.get_meta_data()["fps"] == pytest.approx(3.0)
+    finally:
+        reader.close()
+
+
+def test_memory_stays_near_one_frame(make_gif, tmp_path):
+    size = (320, 240)
+    gif_path = make_gif(frames=60, size=size)
+    frame_bytes = size[0] * size[1] * 3
+
+    tracemalloc.start()
+    try:
+        transcode.transcode_gif(gif_path, str(tmp_path / "clip.mp4"), transcode.encoding_params())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Decoding every frame up front would need 60 frames' worth
+    assert peak < 10 * frame_bytes
+
+
+def test_a_gif_without_frames_is_a_clear_error(make_gif, tmp_path, monkeypatch):
+    monkeypatch.setattr(transcode, "iter_rgb_frames", lambda gif_path: iter(()))
+
+    with pytest.raises(ValueError, match="has no frames"):
+        transcode.transcode_gif(make_gif(), str(tmp_path / "clip.mp4"), transcode.encoding_params())
@@ -0,0 +1,150 @@
+import sqlite3
+
+import pytest
+import yaml
+
+import engines
+import migrations
+import sync as sync_module
+from bulk_import import bulk_seed_all
+from logic import UserService
+from sync import sync_all, sync_system_db
+
+HEADER = "id,date,exercise,set_number,weight,reps,duration,rest,note\n"
+ROWS = [
+    "1,04/07/2025,Barbell Bench Press,1,95,8,,90,\n",
+    "2,04/07/2025,Barbell Bench Press,2,115,8,,90,\n",
+    "3,04/07/2025,Barbell Back Squat,1,135,5,,120,felt heavy\n",
+    "4,04/09/2025,Barbell Deadlift,1,185,5,,120,\n",
+]
+
+
+def write_log(rows):
+    with open("exercises_clean.csv", "w") as f:
+        f.write(HEADER + "".join(rows))
+
+
+def sync():
+    return sync_all(engines.get_system_engine(), engines.get_user_engine())
+
+
+def log_rows():
+    with sqlite3.connect("user_log.db") as conn:
+        return conn.execute("SELECT w.date, e.exercise_id, e.set_number, e.weight, e.reps, e.note, e.seeded "
+                            "FROM exercises e JOIN workouts w ON w.uuid = e.workout_uuid "
+                            "ORDER BY w.date, e.exercise_id, e.set_number, e.seeded").fetchall()
+
+
+@pytest.fixture
+def synced(workspace):
+    write_log(ROWS)
+    migrations.migrate_databases()
+    sync()
+    return workspace
+
+
+def test_first_sync_inserts_every_row(synced):
+    assert len(log_rows()) == len(ROWS)
+    assert all(row[-1] == 1 for row in log_rows())
+
+
+def test_unchanged_file_is_a_no_op(synced):
+    stats = sync()["log"]
+    assert (stats["inserted"], stats["updated"], stats["deleted"]) == (0, 0, 0)
+
+
+def test_edits_and_removals_touch_only_those_rows(synced):
+    write_log([ROWS[0], ROWS[1].replace(",115,", ",120,"), ROWS[3]])
+
+    stats = sync()["log"]
+
+    assert (stats["inserted"], stats["updated"], stats["deleted"]) == (0, 1, 1)
+    assert [row[3] for row in log_rows()] == [95.0, 120.0, 185.0]
+
+
+def test_bulk_import_is_adopted_not_duplicated(workspace):
+    write_log(ROWS)
+    migrations.migrate_databases()
+    bulk_seed_all(engines.get_system_engine(), engines.get_user_engine())
+    before = log_rows()
+
+    stats = sync()["log"]
+
+    assert stats["unchanged"] == len(ROWS)
+    assert stats["inserted"] == 0
+    assert log_rows() == before
+
+
+def test_sets_entered_in_the_app_are_never_adopted_or_deleted(workspace):
+    migrations.migrate_databases()
+    sync_system_db(engines.get_system_engine())
+    with sqlite3.connect("system.db") as conn:
+        bench_press = conn.execute("SELECT id FROM exercise_catalog WHERE name = 'Barbell Bench Press'").fetchone()[0]
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("INSERT INTO workouts VALUES ('entered-in-app', '2025-04-07')")
+    # The same values as the CSV's first row, but logged in the app
+    with UserService() as usr_svc:
+        usr_svc.apply_log_diff(inserts=[{"workout_uuid": "entered-in-app", "exercise_id": bench_press,
+                                         "set_number": 1, "weight": 95.0, "reps": 8, "rest": 90}])
+
+    write_log(ROWS[:1])
+    assert sync()["log"]["inserted"] == 1
+    write_log([])
+    assert sync()["log"]["deleted"] == 1
+
+    assert [row[-1] for row in log_rows()] == [0]
+
+
+def test_unknown_exercises_are_reported(workspace):
+    write_log(ROWS + ["5,04/09/2025,Mystery Lift,1,10,10,,60,\n"])
+    migrations.migrate_databases()
+
+    stats = sync()["log"]
+
+    assert stats["skipped"] == 1
+    assert stats["unknown"] == {"Mystery Lift": 1}
+
+
+def test_removed_catalog_entries_are_kept_while_logged(synced):
+    with open("config/default_catalog.yaml") as f:
+        catalog = yaml.safe_load(f)
+    removed = {"Barbell Deadlift", "Plank"}  # the first is logged, the second isn't
+    with open("config/default_catalog.yaml", "w") as f:
+        yaml.safe_dump([entry for entry in catalog if entry["exercise"] not in removed], f)
+
+    stats = sync()["system"]["catalog"]
+
+    assert (stats["deleted"], stats["kept"]) == (1, 1)
+    with sqlite3.connect("system.db") as conn:
+        names = {name for (name,) in conn.execute("SELECT name FROM exercise_catalog")}
+    assert "Barbell Deadlift" in names
+    assert "Plank" not in names
+
+
+def test_removed_equipment_is_kept_while_the_catalog_uses_it(synced):
+    with open("config/equipment.yaml") as f:
+        equipment = yaml.safe_load(f)
+    with open("config/equipment.yaml", "w") as f:
+        yaml.safe_dump([item for item in equipment if item["name"] != "Barbell"], f)
+
+    stats = sync()["system"]["equipment"]
+
+    assert (stats["deleted"], stats["kept"]) == (0, 1)
+
+
+def test_the_write_lock_is_held_while_the_diff_is_read(synced, monkeypatch):
+    read_log = sync_module.read_log
+    blocked = []
+
+    def read_log_while_writing(path):
+        with sqlite3.connect("user_log.db", timeout=0) as other:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("INSERT INTO workouts VALUES ('other', '2025-04-10')")
+        blocked.append(path)
+        return read_log(path)
+
+    monkeypatch.setattr(sync_module, "read_log", read_log_while_writing)
+    write_log(ROWS + ["5,04/10/2025,Barbell Deadlift,1,195,3,,120,\n"])
+
+    assert sync()["log"]["inserted"] == 1
+    assert blocked == ["exercises_clean.csv"]
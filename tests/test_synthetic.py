@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+from benchmark import measure
+from synthetic import generate_log, write_log_csv
+
+CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "default_catalog.yaml")
+
+
+@pytest.mark.parametrize("n_sets", [1, 2, 7, 1000])
+def test_exactly_n_sets_in_the_csv_layout(n_sets):
+    log = generate_log(n_sets, catalog_yaml=CATALOG)
+
+    assert len(log) == n_sets
+    assert list(log.columns) == ["id", "date", "exercise", "set_number", "weight", "reps", "duration", "rest", "note"]
+    assert log["id"].tolist() == list(range(1, n_sets + 1))
+
+
+def test_the_same_seed_gives_the_same_log():
+    pd.testing.assert_frame_equal(generate_log(500, catalog_yaml=CATALOG, seed=4),
+                                  generate_log(500, catalog_yaml=CATALOG, seed=4))
+    assert not generate_log(500, catalog_yaml=CATALOG, seed=5).equals(generate_log(500, catalog_yaml=CATALOG, seed=4))
+
+
+def test_sets_look_like_a_real_log():
+    log = generate_log(3000, catalog_yaml=CATALOG)
+    dates = pd.to_datetime(log["date"], format="%m/%d/%Y")
+
+    assert dates.is_monotonic_increasing
+    # Each exercise block numbers its sets from 1
+    block = (log["set_number"] == 1).cumsum()
+    assert (log["set_number"] == log.groupby(block).cumcount() + 1).all()
+    # Reps or a duration, never both
+    assert (log["reps"].isna() != log["duration"].isna()).all()
+    assert (log["weight"] % 2.5 == 0).all()
+
+
+def test_very_large_logs_are_squeezed_into_max_years():
+    log = generate_log(5000, catalog_yaml=CATALOG, max_years=1.0)
+    dates = pd.to_datetime(log["date"], format="%m/%d/%Y")
+
+    assert (dates.max() - dates.min()).days <= 365
+
+
+def test_the_csv_round_trips(tmp_path):
+    path = write_log_csv(str(tmp_path / "log.csv"), 200, catalog_yaml=CATALOG)
+
+    assert len(pd.read_csv(path)) == 200
+
+
+def test_measure_runs_setup_before_every_timed_call():
+    calls = []
+    result = measure(calls.append, repeat=3, setup=lambda: len(calls))
+
+    assert calls == [0, 1, 2, 3]  # three timed runs and one under tracemalloc
+    assert result["repeat"] == 3
+    assert result["min_s"] <= result["median_s"] <= result["max_s"]
@@ -0,0 +1,76 @@
+import os
+
+import imageio.v2 as imageio
+import pytest
+
+import transcode
+from transcode import TranscodeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranscodeCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+
+
+def cached_clips(cache):
+    return sorted(name for name in os.listdir(cache.cache_dir) if name.endswith(".mp4"))
+
+
+def test_a_clip_is_encoded_once(cache, make_gif, monkeypatch):
+    gif_path = make_gif()
+    assert not cache.contains(gif_path)
+
+    path = cache.get_or_transcode(gif_path)
+    assert cache.contains(gif_path)
+    monkeypatch.setattr(transcode, "transcode_gif", lambda *args: pytest.fail("re-encoded a cached clip"))
+
+    assert cache.get_or_transcode(gif_path) == path
+    assert imageio.get_reader(path).count_frames() > 0
+
+
+def test_keys_follow_content_and_encoding(cache, make_gif):
+    first = make_gif("a.gif")
+    same_content = make_gif("b.gif")
+    other_content = make_gif("c.gif", shade=7)
+    params = transcode.encoding_params()
+
+    assert cache.key_for(first, params) == cache.key_for(same_content, params)
+    assert cache.key_for(first, params) != cache.key_for(other_content, params)
+    assert cache.key_for(first, params) != cache.key_for(first, transcode.encoding_params(target_duration=1.0))
+
+
+def test_an_edited_gif_is_re_encoded(cache, make_gif):
+    gif_path = make_gif()
+    first = cache.get_or_transcode(gif_path)
+
+    make_gif(frames=9)
+    os.utime(gif_path, ns=(1, 1))  # a new mtime, as an edit would give it
+
+    assert cache.get_or_transcode(gif_path) != first
+
+
+def test_a_failed_encode_leaves_nothing_behind(cache, make_gif, monkeypatch):
+    def fail(gif_path, out_path, params):
+        with open(out_path, "wb") as f:
+            f.write(b"half a video")
+        raise RuntimeError("ffmpeg died")
+    monkeypatch.setattr(transcode, "transcode_gif", fail)
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_transcode(make_gif())
+
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_least_recently_used_clips_are_evicted(tmp_path, make_gif):
+    cache = TranscodeCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    paths = [cache.get_or_transcode(make_gif(f"{i}.gif", shade=i)) for i in range(3)]
+    for age, path in enumerate(reversed(paths)):
+        os.utime(path, (1000 - age, 1000 - age))  # paths[0] is the oldest
+    cache.get_or_transcode(make_gif("0.gif", shade=0))  # a hit refreshes it to the newest
+    size = os.path.getsize(paths[1])
+
+    cache.max_bytes = sum(os.path.getsize(p) for p in paths) - size
+    cache.evict()
+
+    assert cached_clips(cache) == sorted(os.path.basename(p) for p in (paths[0], paths[2]))
@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+
+import pytest
+
+import logic
+import migrations
+from write_behind import WriteBehindQueue
+
+
+class Flaky:
+    """apply_batch that fails its first `failures` calls, then records what it was given."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.batches = []
+
+    def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        self.batches.append(list(batch))
+
+
+def committed(apply):
+    return [item for batch in apply.batches for item in batch]
+
+
+def test_items_are_group_committed_in_order():
+    apply = Flaky()
+    queue = WriteBehindQueue(apply, max_batch=10, max_latency=1)
+    for i in range(25):
+        queue.put(i)
+    queue.flush()
+    queue.close()
+
+    assert committed(apply) == list(range(25))
+    assert queue.items == 25
+    assert len(apply.batches) < 25
+
+
+def test_close_commits_everything_put_before_it():
+    apply = Flaky()
+    queue = WriteBehindQueue(apply, max_latency=60)
+    for i in range(100):
+        queue.put(i)
+    queue.close()
+
+    assert committed(apply) == list(range(100))
+
+
+def test_a_transient_failure_is_retried():
+    apply = Flaky(failures=2)
+    queue = WriteBehindQueue(apply, retries=3, retry_delay=0)
+    queue.put("set")
+    queue.flush()
+    queue.close()
+
+    assert committed(apply) == ["set"]
+    assert queue.pending == 0
+
+
+def test_a_batch_that_keeps_failing_is_kept_and_reported():
+    apply = Flaky(failures=4)
+    queue = WriteBehindQueue(apply, retries=1, retry_delay=0)
+    queue.put("first")
+    with pytest.raises(sqlite3.OperationalError):
+        queue.flush()
+    assert queue.pending == 1
+
+    # Kept items go ahead of later ones on the next batch
+    queue.put("second")
+    with pytest.raises(sqlite3.OperationalError):
+        queue.flush()
+    assert queue.pending == 2
+    queue.put("third")
+    queue.flush()
+
+    assert committed(apply) == ["first", "second", "third"]
+    assert queue.pending == 0
+    queue.close()
+
+
+def test_close_raises_when_items_could_not_be_committed():
+    queue = WriteBehindQueue(Flaky(failures=100), retries=0)
+    queue.put("set")
+
+    with pytest.raises(RuntimeError, match="1 uncommitted items") as excinfo:
+        queue.close()
+    assert isinstance(excinfo.value.__cause__, sqlite3.OperationalError)
+
+
+def test_a_closed_queue_refuses_writes():
+    queue = WriteBehindQueue(Flaky())
+    queue.close()
+
+    with pytest.raises(RuntimeError):
+        queue.put("set")
+    with pytest.raises(RuntimeError):
+        queue.flush()
+
+
+def test_flush_waits_for_writes_from_other_threads():
+    apply = Flaky()
+    queue = WriteBehindQueue(apply, max_latency=60)
+    writers = [threading.Thread(target=lambda n=n: [queue.put((n, i)) for i in range(50)]) for n in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    queue.flush(timeout=5)
+
+    assert len(committed(apply)) == 200
+    queue.close()
+
+
+def test_queued_sets_reach_the_log(workspace):
+    migrations.migrate_databases()
+    with sqlite3.connect("user_log.db") as conn:
+        conn.execute("INSERT INTO workouts VALUES ('w', '2025-04-07')")
+    logic.enable_write_behind(max_latency=60)
+    try:
+        with logic.UserService() as usr_svc:
+            usr_svc.add_sets([{"workout_uuid": "w", "exercise_id": 1, "set_number": n, "weight": 100.0, "reps": 5}
+                              for n in range(1, 4)])
+    finally:
+        logic.disable_write_behind()
+
+    with sqlite3.connect("user_log.db") as conn:
+        assert conn.execute("SELECT set_number FROM exercises ORDER BY id").fetchall() == [(1,), (2,), (3,)]
+        assert conn.execute("SELECT set_count FROM exercise_rollup").fetchall() == [(3,)]
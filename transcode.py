@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import imageio.v2 as imageio
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from PIL import Image
+import numpy as np
+
+TARGET_DURATION = 3.0
+CODEC = "libx264"
+
+CACHE_DIR = os.environ.get("TRANSCODE_CACHE_DIR", ".transcode_cache")
+MAX_CACHE_BYTES = int(os.environ.get("TRANSCODE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def encoding_params(target_duration: float = TARGET_DURATION, codec: str = CODEC) -> dict:
+    return {"target_duration": target_duration, "codec": codec}
+
+
+def cache_key(gif_path: str, params: dict) -> str:
+    # Any change to the clip or to how it is encoded yields a new cache entry
+    digest = hashlib.sha256()
+    with open(gif_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def frame_count(gif_path: str) -> int:
+    # Walks the frame headers only; no frame is converted to an array
+    with Image.open(gif_path) as im:
+        return getattr(im, "n_frames", 1)
+
+
+def iter_rgb_frames(gif_path: str):
+    reader = imageio.get_reader(gif_path)
+    try:
+        for frame in reader:
+            yield np.asarray(Image.fromarray(frame).convert("RGB"))
+    finally:
+        reader.close()
+
+
+def transcode_gif(gif_path: str, out_path: str, params: dict):
+    # Frames flow one at a time from the decoder into ffmpeg's stdin, so peak
+    # memory is a single frame regardless of clip length. This is the writer
+    # moviepy's write_videofile uses, so the output format is unchanged.
+    fps = frame_count(gif_path) / params["target_duration"]
+
+    frames = iter_rgb_frames(gif_path)
+    # A bare StopIteration would escape as a confusing error (or kill a pool future)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError(f"{gif_path} has no frames to transcode")
+    height, width = first.shape[:2]
+
+    with FFMPEG_VideoWriter(out_path, (width, height), fps, codec=params["codec"]) as writer:
+        writer.write_frame(first)
+        for frame in frames:
+            writer.write_frame(frame)
+
+
+class TranscodeCache:
+    """On-disk MP4 cache keyed by GIF content and encoding parameters, evicted least-recently-used first."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._keys = {}  # (path, mtime_ns, size, params) -> content key, saves re-hashing on warm hits
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def key_for(self, gif_path: str, params: dict) -> str:
+        stat = os.stat(gif_path)
+        stat_key = (gif_path, stat.st_mtime_ns, stat.st_size, json.dumps(params, sort_keys=True))
+        with self._lock:
+            key = self._keys.get(stat_key)
+        if key is None:
+            key = cache_key(gif_path, params)
+            with self._lock:
+                self._keys[stat_key] = key
+        return key
+
+    def contains(self, gif_path: str, **params) -> bool:
+        return os.path.exists(self.path_for(self.key_for(gif_path, encoding_params(**params))))
+
+    def get_or_transcode(self, gif_path: str, evict: bool = True, **params) -> str:
+        """Path of the cached MP4, encoding it first if needed.
+
+        Batch callers running many of these at once pass evict=False and call
+        evict() once at the end, so no worker removes another's fresh output.
+        """
+        params = encoding_params(**params)
+        path = self.path_for(self.key_for(gif_path, params))
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+
+        # Encode next to the final location and rename into place, so readers
+        # never see a partial file and a failed encode leaves nothing behind.
+        fd, tmp_path = tempfile.mkstemp(prefix=".partial-", suffix=".mp4", dir=self.cache_dir)
+        os.close(fd)
+        try:
+            transcode_gif(gif_path, tmp_path, params)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if evict:
+            self.evict(keep=(path,))
+        return path
+
+    def evict(self, keep=()):
+        """Remove the least recently used MP4s until the cache fits, never any path in `keep`."""
+        with self._lock:
+            self._evict(set(keep))
+
+    def _evict(self, keep: set):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".mp4") and not entry.name.startswith(".") and entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # evicted concurrently
+            total -= size
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_transcode_cache() -> TranscodeCache:
+    # Module state outlives Streamlit reruns, so the content-key memo stays warm
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TranscodeCache()
+        return _default_cache
@@ -1,4 +1,4 @@
-from sqlalchemy import MetaData
+from sqlalchemy import MetaData, text
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 
@@ -11,7 +11,7 @@ class UserBase(SQLModel):
 class Workout(UserBase, table=True):
     __tablename__ = "workouts"
     uuid: str = Field(primary_key=True)
-    date: str
+    date: str = Field(index=True)  # ISO 8601, YYYY-MM-DD
 
     exercises: List["Exercise"] = Relationship(back_populates="workout")
     sequence: List["WorkoutSequence"] = Relationship(back_populates="workout")
@@ -27,16 +27,71 @@ class WorkoutSequence(UserBase, table=True):
 class Exercise(UserBase, table=True):
     __tablename__ = "exercises"
     id: Optional[int] = Field(default=None, primary_key=True)
-    workout_uuid: str = Field(foreign_key="workouts.uuid")
-    exercise_id: int = Field()
+    workout_uuid: str = Field(foreign_key="workouts.uuid", index=True)
+    exercise_id: int = Field(index=True)
     set_number: int
     weight: Optional[float]
     reps: Optional[int]
     duration: Optional[int]
     rest: Optional[int]
     note: Optional[str]
+    # True for sets imported from the CSV log (bulk_import, seed, sync), False for sets entered in the app
+    seeded: bool = Field(default=False, sa_column_kwargs={"server_default": text("0")})
 
     workout: Optional[Workout] = Relationship(back_populates="exercises")
 
+class ExerciseRollup(UserBase, table=True):
+    __tablename__ = "exercise_rollup"
+    # Maintained by the triggers in rollups.py, never written directly
+    date: str = Field(primary_key=True)
+    exercise_id: int = Field(primary_key=True)
+    volume: float = 0.0
+    set_count: int = 0
+    rep_count: int = 0
+    top_weight: Optional[float] = None
+    total_duration: int = 0
+
+class ExerciseRecord(UserBase, table=True):
+    __tablename__ = "exercise_records"
+    # Current best per (exercise_id, kind); kept by the triggers in records.py
+    exercise_id: int = Field(primary_key=True)
+    kind: str = Field(primary_key=True)  # weight, e1rm_epley, e1rm_brzycki or volume
+    value: float
+    weight: Optional[float]
+    reps: Optional[int]
+    date: str
+    set_id: int
+
+class RepRecord(UserBase, table=True):
+    __tablename__ = "rep_records"
+    # Most reps ever done at each weight
+    exercise_id: int = Field(primary_key=True)
+    weight: float = Field(primary_key=True)
+    reps: int
+    date: str
+    set_id: int
+
+class ExerciseRecordDirty(UserBase, table=True):
+    __tablename__ = "exercise_records_dirty"
+    # Exercises whose records must be recomputed after an update or delete
+    exercise_id: int = Field(primary_key=True)
+
+class SyncFingerprint(UserBase, table=True):
+    __tablename__ = "sync_fingerprints"
+    # Content hash of each source row imported by sync.py and the row it became;
+    # key "" holds the hash of the whole source file
+    source: str = Field(primary_key=True)
+    key: str = Field(primary_key=True)
+    digest: int
+    row_id: Optional[int] = None
+
+class LogMonth(UserBase, table=True):
+    __tablename__ = "log_months"
+    # Sets per workout month and a counter bumped by every change to them, kept by
+    # the triggers in snapshot.py; month "" holds a random id for this database
+    month: str = Field(primary_key=True)
+    sets: int = 0
+    version: int = 0
+
 def create_all_user_tables(engine):
     user_metadata.create_all(engine)
\ No newline at end of file
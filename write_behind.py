@@ -0,0 +1,129 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+_STOP = object()
+
+log = logging.getLogger(__name__)
+
+
+class _Barrier:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class WriteBehindQueue:
+    """Buffers writes in memory and applies them from one background thread in group commits.
+
+    `apply_batch` receives a list of queued items and must write them in a
+    single transaction. A batch is committed once `max_batch` items are
+    waiting or the oldest item has waited `max_latency` seconds.
+
+    A batch that fails is logged and retried `retries` times with backoff; if it
+    still fails it stays queued, is retried with the next batch, and its error is
+    raised by the next flush() and by close(), so nothing is dropped silently.
+    """
+
+    def __init__(self, apply_batch, max_batch: int = 500, max_latency: float = 0.05, name: str = "write-behind",
+                 retries: int = 3, retry_delay: float = 0.05):
+        self.apply_batch = apply_batch
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.batches = 0
+        self.items = 0
+        self.last_error = None
+        self._pending = []  # items of batches that failed every retry, oldest first
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self) -> int:
+        """Items whose batch failed and that are waiting to be retried."""
+        return len(self._pending)
+
+    def put(self, item):
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        self._queue.put(item)
+
+    def flush(self, timeout: float = None):
+        """Block until everything queued before this call is committed; raises if any of it could not be."""
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        barrier = _Barrier()
+        self._queue.put(barrier)
+        if not barrier.done.wait(timeout):
+            raise TimeoutError("write-behind flush timed out")
+        if barrier.error is not None:
+            raise barrier.error
+
+    def close(self):
+        """Drain and commit everything still queued, then stop the writer thread.
+
+        Raises RuntimeError if some items could not be committed even after retrying.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._pending:
+            raise RuntimeError(f"write-behind closed with {len(self._pending)} uncommitted items") \
+                from self.last_error
+
+    def _commit(self, batch) -> bool:
+        for attempt in range(self.retries + 1):
+            try:
+                self.apply_batch(batch)
+            except Exception as e:
+                self.last_error = e
+                log.warning("write-behind batch of %d items failed (attempt %d of %d): %s",
+                            len(batch), attempt + 1, self.retries + 1, e, exc_info=True)
+                if attempt < self.retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            return True
+        log.error("write-behind kept %d uncommitted items after %d attempts", len(batch), self.retries + 1)
+        return False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, barriers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.max_latency
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _Barrier):
+                    barriers.append(item)
+                else:
+                    batch.append(item)
+
+                remaining = deadline - time.monotonic()
+                if stopping or barriers or len(batch) >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            # Earlier failures go first so commits keep the order items were queued in
+            batch = self._pending + batch
+            if batch:
+                self._pending = [] if self._commit(batch) else batch
+
+            error = self.last_error if self._pending else None
+            for barrier in barriers:
+                barrier.error = error
+                barrier.done.set()